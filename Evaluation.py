@@ -1,19 +1,22 @@
-import tqdm
-def evaluate_agent(game_class, agent, d_agent, num_episodes=100):
+from tqdm import tqdm
+def evaluate_agent(game_class, agent, d_agent, num_episodes=100, verbose=True, max_turns=None):
+    # max_turns caps the plies per game; games cut short count as losses
     wins = 0
     total_steps = 0
     total_cards_drawn = 0
     
-    for episode in tqdm(range(num_episodes)):
+    for episode in tqdm(range(num_episodes), disable=not verbose):
         game = game_class()
         state, player_idx = game.init_game()
         cards_drawn = 0
         steps = 0
+        turns = 0
         
-        while not game.game_over():
+        while not game.game_over() and (max_turns is None or turns < max_turns):
+            turns += 1
             if player_idx == 0:
                 legal_actions = state['legal_actions']
-                action = agent.select_action(state, legal_actions)
+                action = agent.select_action(state, legal_actions, game=game)
                 if action == 60:
                     cards_drawn += 1
                 next_state, next_player_idx = game.step(action)
@@ -22,7 +25,7 @@ def evaluate_agent(game_class, agent, d_agent, num_episodes=100):
                 steps += 1
             else:
                 legal_actions = state['legal_actions']
-                ac = d_agent.select_action(state, legal_actions)
+                ac = d_agent.select_action(state, legal_actions, game=game)
                 next_state, next_player_idx = game.step(ac)
                 state = next_state
                 player_idx = next_player_idx
@@ -37,9 +40,72 @@ def evaluate_agent(game_class, agent, d_agent, num_episodes=100):
     avg_steps = total_steps / num_episodes
     avg_cards_drawn = total_cards_drawn / num_episodes
     
-    print("Evaluation Results:")
-    print(f"Win Rate: {win_rate:.2f}")
-    print(f"Average Steps: {avg_steps:.2f}")
-    print(f"Average Cards Drawn: {avg_cards_drawn:.2f}")
+    if verbose:
+        print("Evaluation Results:")
+        print(f"Win Rate: {win_rate:.2f}")
+        print(f"Average Steps: {avg_steps:.2f}")
+        print(f"Average Cards Drawn: {avg_cards_drawn:.2f}")
     
     return win_rate, avg_steps, avg_cards_drawn
+
+
+def play_game(game, agents, max_turns=None):
+    """
+    Plays a game to the end with agents[i] in seat i.
+    Returns the winning seat, or None if the game hit max_turns.
+    """
+    state, player_idx = game.init_game()
+    turns = 0
+    while not game.game_over() and (max_turns is None or turns < max_turns):
+        turns += 1
+        action = agents[player_idx].select_action(state, state['legal_actions'], game=game)
+        state, player_idx = game.step(action)
+    winner = game.get_winner()
+    return game.players.index(winner) if winner else None
+
+
+def evaluate_duplicate(game_class, agent, d_agent, num_deals=100, seed=0, verbose=True, max_turns=None, z=1.96):
+    # Every seeded deal is played twice with the seats swapped, so the deal luck that
+    # dominates single-game results cancels within each pair.
+    # max_turns caps the plies per game; games cut short count as losses for both sides
+    pair_scores = []
+    margins = []
+    for deal in tqdm(range(num_deals), disable=not verbose):
+        deal_seed = seed + deal
+        first = play_game(game_class(seed=deal_seed), [agent, d_agent], max_turns)
+        second = play_game(game_class(seed=deal_seed), [d_agent, agent], max_turns)
+        agent_wins = (first == 0) + (second == 1)
+        opponent_wins = (first == 1) + (second == 0)
+        pair_scores.append(agent_wins / 2)
+        margins.append((agent_wins - opponent_wins) / 2)
+
+    n = num_deals
+    win_rate = sum(pair_scores) / n
+    margin = sum(margins) / n
+    pair_var = sum((s - win_rate) ** 2 for s in pair_scores) / max(n - 1, 1)
+    margin_var = sum((m - margin) ** 2 for m in margins) / max(n - 1, 1)
+    # variance of a pair's score if its two games were independent deals with the same win rate
+    independent_var = win_rate * (1 - win_rate) / 2
+    variance_reduction = independent_var / pair_var if pair_var > 0 else float('inf')
+
+    results = {
+        'deals': n,
+        'games': 2 * n,
+        'win_rate': win_rate,
+        'win_rate_ci': (win_rate - z * (pair_var / n) ** 0.5, win_rate + z * (pair_var / n) ** 0.5),
+        # per-game (agent wins - opponent wins), the paired difference between the two players
+        'margin': margin,
+        'margin_ci': (margin - z * (margin_var / n) ** 0.5, margin + z * (margin_var / n) ** 0.5),
+        'variance_reduction': variance_reduction,
+        # independent games needed for the same confidence interval width
+        'equivalent_games': 2 * n * variance_reduction,
+    }
+
+    if verbose:
+        print("Duplicate Evaluation Results:")
+        print(f"Win Rate: {win_rate:.3f} [{results['win_rate_ci'][0]:.3f}, {results['win_rate_ci'][1]:.3f}]")
+        print(f"Paired Margin: {margin:+.3f} [{results['margin_ci'][0]:+.3f}, {results['margin_ci'][1]:+.3f}]")
+        print(f"Variance Reduction: {variance_reduction:.2f}x "
+              f"({2 * n} games ~ {results['equivalent_games']:.0f} independent games)")
+
+    return results
@@ -0,0 +1,97 @@
+import numpy as np
+
+from utils import build_deck
+
+NUM_CARD_IDS = 60
+
+
+def full_deck_counts(action_space):
+    """
+    Returns how many copies of each card id (the action id of the card string) a full deck holds.
+    """
+    counts = np.zeros(NUM_CARD_IDS, dtype=np.int16)
+    for card in build_deck():
+        counts[action_space[card.str]] += 1
+    return counts
+
+
+class BeliefTracker:
+    """
+    Tracks, from one player's point of view, how many copies of each card id are
+    unseen, i.e. somewhere in the deck or in an opponent's hand.
+
+    The tracker is kept up to date from UNOGame play/draw/reshuffle events, so every
+    update is O(1) per card moved instead of a rescan of the discard pile.
+    """
+
+    def __init__(self, game, player_index):
+        self.game = game
+        self.player_index = player_index
+        self.action_space = game.action_space
+        self.unseen = full_deck_counts(self.action_space)
+        for card in game.players[player_index].hand:
+            self.unseen[self.action_space[card.str]] -= 1
+        for card in game.discard_pile:
+            self.unseen[self.action_space[card.str]] -= 1
+
+    @classmethod
+    def attach(cls, game):
+        """
+        Creates one tracker per player and subscribes them to the game's events.
+        """
+        trackers = [cls(game, index) for index in range(len(game.players))]
+        for tracker in trackers:
+            game.listeners.append(tracker)
+        return trackers
+
+    def __call__(self, event, game, player_index=None, card=None, cards=None, action=None):
+        if event == 'draw':
+            if player_index == self.player_index:
+                self.unseen[self.action_space[card.str]] -= 1
+        elif event == 'play':
+            if player_index != self.player_index:
+                self.unseen[self.action_space[card.str]] -= 1
+        elif event == 'reshuffle':
+            for moved in cards:
+                self.unseen[self.action_space[moved.str]] += 1
+
+    def opponent_indices(self):
+        return [i for i in range(len(self.game.players)) if i != self.player_index]
+
+    def opponent_hand_estimates(self):
+        """
+        Returns (expected_counts, p_holds) with one row per opponent.
+        expected_counts[j, c] is the expected number of copies of card id c in opponent j's hand,
+        p_holds[j, c] the probability that they hold at least one, both under a uniform
+        hypergeometric deal of the unseen pool.
+        """
+        unseen = self.unseen.astype(np.float64)
+        pool = unseen.sum()
+        sizes = np.array([len(self.game.players[i].hand) for i in self.opponent_indices()], dtype=np.float64)
+        if pool == 0:
+            zeros = np.zeros((len(sizes), NUM_CARD_IDS))
+            return zeros, zeros.copy()
+
+        expected = sizes[:, None] * unseen[None, :] / pool
+
+        # P(no copy) = prod_{i < u_c} (pool - n - i) / (pool - i)
+        p_none = np.ones((len(sizes), NUM_CARD_IDS))
+        for i in range(int(unseen.max())):
+            active = unseen > i
+            factor = np.clip((pool - sizes[:, None] - i) / (pool - i), 0.0, 1.0)
+            p_none = np.where(active[None, :], p_none * factor, p_none)
+        return expected, 1.0 - p_none
+
+    def features(self):
+        """
+        Unseen counts scaled to [0, 1], suitable as extra observation features.
+        """
+        return self.unseen.astype(np.float32) / 2.0
+
+    def sample_opponent_hand(self, rng, opponent_index):
+        """
+        Draws a plausible hand of card ids for one opponent, for determinization in search.
+        """
+        pool = np.repeat(np.arange(NUM_CARD_IDS), self.unseen.clip(min=0))
+        size = len(self.game.players[opponent_index].hand)
+        return rng.choice(pool, size=min(size, len(pool)), replace=False)
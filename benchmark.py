@@ -0,0 +1,584 @@
+"""
+Performance checks for the UNO engine, agents and tooling.
+
+    python benchmark.py startup
+    python benchmark.py serving
+    python benchmark.py duplicate
+    python benchmark.py encode
+    python benchmark.py vector
+    python benchmark.py replay
+    python benchmark.py observation
+    python benchmark.py checkpoints
+    python benchmark.py canonical
+    python benchmark.py endgame
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+ENTRY_POINTS = {
+    'human vs agent.py': 'Enter difficulty',
+    'interface.py': 'Enter the Number of Players',
+}
+
+
+def time_to_prompt(script, prompt, timeout=60):
+    """
+    Starts an interactive script and returns the seconds until its first input prompt is printed.
+    """
+    start = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, '-u', script], cwd=ROOT, stdin=subprocess.PIPE,
+                            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    seen = b''
+    try:
+        while prompt.encode() not in seen:
+            chunk = proc.stdout.read1(4096)
+            if not chunk or time.perf_counter() - start > timeout:
+                return None
+            seen += chunk
+        return time.perf_counter() - start
+    finally:
+        proc.kill()
+        proc.wait()
+
+
+def import_time_breakdown(script, top=8):
+    """
+    Runs a script under `python -X importtime` until it blocks on input and returns
+    the slowest top-level imports as (cumulative_us, module) pairs.
+    """
+    result = subprocess.run([sys.executable, '-X', 'importtime', script], cwd=ROOT,
+                            stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                            stderr=subprocess.PIPE, text=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative_us, name = line.split('|')
+        if not name.startswith('  '):  # top-level imports only
+            rows.append((int(cumulative_us), name.strip()))
+    rows.sort(reverse=True)
+    return rows[:top]
+
+
+def bench_startup(args):
+    for script, prompt in ENTRY_POINTS.items():
+        timings = [time_to_prompt(script, prompt) for _ in range(args.repeat)]
+        timings = [t for t in timings if t is not None]
+        if not timings:
+            print(f"{script}: prompt not reached")
+            continue
+        print(f"{script}: first prompt after {min(timings) * 1000:.0f} ms "
+              f"(best of {len(timings)}, mean {sum(timings) / len(timings) * 1000:.0f} ms)")
+        for cumulative_us, name in import_time_breakdown(script):
+            print(f"    {cumulative_us / 1000:8.1f} ms  {name}")
+
+
+SERVING_PROBE = """
+import json, random, sys, time
+start = time.perf_counter()
+if sys.argv[1] == 'torch':
+    from network import DQNAgent, UnoEnvironment
+    agent = DQNAgent(161, 61, UnoEnvironment(), device='cpu')
+    agent.load_model(sys.argv[2])
+    agent.epsilon = 0.0
+else:
+    from numpy_runtime import NumpyAgent
+    agent = NumpyAgent(sys.argv[2])
+load_s = time.perf_counter() - start
+
+from game_logic import UNOGame
+rng = random.Random(0)
+states = []
+while len(states) < 1000:
+    game = UNOGame()
+    state, _ = game.init_game()
+    while not game.game_over() and len(states) < 1000:
+        states.append(state)
+        state, _ = game.step(rng.choice(state['legal_actions']))
+start = time.perf_counter()
+for state in states:
+    agent.select_action(state, state['legal_actions'])
+move_s = (time.perf_counter() - start) / len(states)
+with open('/proc/self/status') as f:
+    rss_kb = int(next(line for line in f if line.startswith('VmRSS')).split()[1])
+print(json.dumps({'load_s': load_s, 'move_s': move_s, 'rss_kb': rss_kb}))
+"""
+
+
+def bench_serving(args):
+    paths = {'torch': args.checkpoint, 'numpy': os.path.splitext(args.checkpoint)[0] + '.npz'}
+    if not os.path.exists(paths['numpy']):
+        from numpy_runtime import export_npz
+        export_npz(paths['torch'], paths['numpy'])
+    for runtime, path in paths.items():
+        result = subprocess.run([sys.executable, '-c', SERVING_PROBE, runtime, path], cwd=ROOT,
+                                capture_output=True, text=True, check=True)
+        stats = json.loads(result.stdout.strip().splitlines()[-1])
+        print(f"{runtime:5s}: import+load {stats['load_s'] * 1000:7.1f} ms, "
+              f"RSS {stats['rss_kb'] / 1024:7.1f} MiB, {stats['move_s'] * 1e6:7.1f} us/move")
+
+
+def bench_duplicate(args):
+    from Evaluation import evaluate_duplicate
+    from game_logic import UNOGame
+    from training import RuleAgent
+
+    if args.checkpoint:
+        from numpy_runtime import NumpyAgent
+        agent, opponent = NumpyAgent(args.checkpoint, epsilon=args.epsilon), RuleAgent()
+    else:
+        agent, opponent = RuleAgent(low_first_at=2), RuleAgent()
+    results = evaluate_duplicate(UNOGame, agent, opponent, args.deals, seed=args.seed,
+                                 verbose=False, max_turns=args.max_turns)
+    p, games = results['win_rate'], results['games']
+    independent_half = 1.96 * (p * (1 - p) / games) ** 0.5
+    paired_half = (results['win_rate_ci'][1] - results['win_rate_ci'][0]) / 2
+    print(f"{args.deals} deals x 2 seats = {games} games, win rate {p:.3f}")
+    print(f"  independent games: 95% CI +/- {independent_half:.4f}")
+    print(f"  duplicate deals:   95% CI +/- {paired_half:.4f}")
+    print(f"  paired margin {results['margin']:+.3f} "
+          f"[{results['margin_ci'][0]:+.3f}, {results['margin_ci'][1]:+.3f}]")
+    print(f"  variance reduction {results['variance_reduction']:.2f}x: "
+          f"{games} duplicate games ~ {results['equivalent_games']:.0f} independent games")
+
+
+def bench_encode(args):
+    import random
+    from environment import SCHEMAS
+    from game_logic import UNOGame
+
+    rng = random.Random(0)
+    states = []
+    while len(states) < args.states:
+        game = UNOGame(seed=len(states))
+        state, _ = game.init_game()
+        while not game.game_over() and len(states) < args.states:
+            states.append(state)
+            state, _ = game.step(rng.choice(state['legal_actions']))
+    overflow = sum(len(state['hand']) > 7 for state in states) / len(states)
+    print(f"{len(states)} states, {overflow:.1%} with more than 7 cards in hand")
+    for version, schema in SCHEMAS.items():
+        rep = schema()
+        start = time.perf_counter()
+        for state in states:
+            rep.encode(state)
+        elapsed = (time.perf_counter() - start) / len(states)
+        print(f"{version:10s}: {rep.state_size:4d} features, {elapsed * 1e6:6.1f} us/encode")
+
+
+def bench_vector(args):
+    import numpy as np
+    from vector_env import SubprocVectorEnv
+
+    rng = np.random.default_rng(0)
+    net = None
+    if args.checkpoint:
+        from numpy_runtime import NumpyDQN
+        net = NumpyDQN(args.checkpoint)
+    print(f"{args.envs} envs, {args.steps} vector steps, policy {'npz' if net else 'random'}, {os.cpu_count()} cores")
+    for workers in args.workers:
+        with SubprocVectorEnv(args.envs, workers, max_turns=2000, stall_limit=10) as env:
+            obs, masks, _ = env.reset()
+            start = time.perf_counter()
+            for _ in range(args.steps):
+                # one batched decision for every environment from the contiguous arrays
+                scores = net(obs) if net else rng.random(masks.shape, dtype=np.float32)
+                actions = np.where(masks, scores, -np.inf).argmax(axis=1)
+                obs, masks, _, _, _, _ = env.step(actions)
+            elapsed = time.perf_counter() - start
+        label = 'in-process' if workers == 0 else f"{workers} workers"
+        print(f"  {label:11s}: {args.envs * args.steps / elapsed:9.0f} env steps/s")
+
+
+def bench_replay(args):
+    import random
+    import tracemalloc
+    import numpy as np
+    from environment import UnoEnvironment
+    from memory import format_bytes
+    from network import InternedReplayBuffer, ReplayBuffer
+    from training import RandomAgent, play_training_episode
+
+    class Filler:
+        # random seat-0 player that only fills memory, so both buffers see identical transitions
+        def __init__(self, memory, seed):
+            self.memory = memory
+            self.rng = random.Random(seed)
+
+        def select_action(self, state, legal_actions, game=None):
+            return self.rng.choice(legal_actions)
+
+        def train(self):
+            return None
+
+    env = UnoEnvironment(max_turns=2000, stall_limit=10)
+    encode = env.state_rep.encode
+    buffers = {'dicts': lambda: ReplayBuffer(args.capacity),
+               'interned': lambda: InternedReplayBuffer(encode, env.state_rep.state_size, args.capacity)}
+    print(f"{args.episodes} random-play episodes into buffers of capacity {args.capacity}")
+    for name, make in buffers.items():
+        random.seed(0)
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        memory = make()
+        for episode in range(args.episodes):
+            env.reset(seed=episode)
+            play_training_episode(Filler(memory, episode), env, RandomAgent(episode))
+        traced = tracemalloc.get_traced_memory()[0] - before
+        tracemalloc.stop()
+
+        np.random.seed(0)
+        start = time.perf_counter()
+        for _ in range(args.batches):
+            samples, _, _ = memory.sample(args.batch_size)
+            if not memory.encoded:
+                # what DQNAgent.train does with dict transitions
+                np.stack([encode(s[0]) for s in samples]), np.stack([encode(s[3]) for s in samples])
+        per_batch = (time.perf_counter() - start) / args.batches
+
+        stats = memory.memory_stats()
+        line = (f"  {name:8s}: {stats['transitions']} transitions, ledger {format_bytes(stats['bytes'])}, "
+                f"traced {format_bytes(traced)}, batch of {args.batch_size} in {per_batch * 1e3:.2f} ms")
+        if memory.encoded:
+            line += (f"\n            {stats['observations']} unique observations, dedup {stats['dedup_ratio']:.2f}x, "
+                     f"{format_bytes(stats['bytes_saved'])} saved vs two copies per transition, "
+                     f"intern hit rate {stats['intern_hit_rate']:.1%}, arrays allocated {format_bytes(stats['allocated_bytes'])}")
+        print(line)
+
+
+def bench_observation(args):
+    import random
+    import tracemalloc
+    from game_logic import UNOGame
+
+    def play(access, keep, trace=True):
+        # random play; returns (peak bytes allocated inside step(), bytes retained per kept observation, s/step)
+        rng = random.Random(0)
+        game = UNOGame(seed=0)
+        state, _ = game.init_game()
+        kept = []
+        peak = base = 0
+        if trace:
+            tracemalloc.start()
+            base = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        for i in range(args.steps):
+            if game.game_over():
+                game = UNOGame(seed=i)
+                state, _ = game.init_game()
+            if access == 'all':
+                state['target'], state['hand'], state['opponent_hand_sizes']
+            elif access == 'dict':
+                state = state.to_dict()
+            action = rng.choice(state['legal_actions'])
+            if keep:
+                kept.append(state)
+            if not trace:
+                state, _ = game.step(action)
+                continue
+            tracemalloc.reset_peak()
+            current = tracemalloc.get_traced_memory()[0]
+            state, _ = game.step(action)
+            peak += tracemalloc.get_traced_memory()[1] - current
+        elapsed = time.perf_counter() - start
+        if not trace:
+            return 0, 0, elapsed / args.steps
+        retained = (tracemalloc.get_traced_memory()[0] - base) / args.steps
+        tracemalloc.stop()
+        return peak / args.steps, retained, elapsed / args.steps
+
+    print(f"{args.steps} random-play steps")
+    for access, label in (('legal', 'legal_actions only'), ('all', 'every field'), ('dict', 'copied to a dict')):
+        peak, _, _ = play(access, keep=False)
+        _, retained, _ = play(access, keep=True)
+        _, _, per_step = play(access, keep=False, trace=False)
+        print(f"  {label:18s}: {peak:5.0f} B allocated in step(), {retained:5.0f} B retained per kept state, "
+              f"{per_step * 1e6:5.1f} us/step")
+
+
+def bench_checkpoints(args):
+    import random
+    import shutil
+    import tempfile
+    import numpy as np
+    import torch
+    from delta_store import DeltaCheckpointStore, flatten
+    from environment import UnoEnvironment
+    from memory import format_bytes
+    from network import DQNAgent
+    from tables import NUM_ACTIONS
+    from training import RandomAgent, play_training_episode
+
+    random.seed(0)
+    torch.manual_seed(0)
+    env = UnoEnvironment(max_turns=2000, stall_limit=10)
+    agent = DQNAgent(env.state_rep.state_size, NUM_ACTIONS, env, device='cpu', dedup_replay=True)
+    for episode in range(args.episodes):
+        play_training_episode(agent, env, RandomAgent(episode), train_every=0)
+
+    root = tempfile.mkdtemp(prefix='uno-checkpoints-')
+    try:
+        full_dir = os.path.join(root, 'full')
+        os.makedirs(full_dir)
+        stores = {mode: DeltaCheckpointStore(os.path.join(root, mode), args.base_every, mode)
+                  for mode in ('xor', 'fp16')}
+        steps = []
+        save_time = dict.fromkeys(['full', *stores], 0.0)
+        for update in range(1, args.updates + 1):
+            agent.train()
+            if update % args.every:
+                continue
+            steps.append(update)
+            start = time.perf_counter()
+            agent.save(os.path.join(full_dir, f"uno_model_{update}.pt"))
+            save_time['full'] += time.perf_counter() - start
+            for mode, store in stores.items():
+                start = time.perf_counter()
+                store.save(agent, update)
+                save_time[mode] += time.perf_counter() - start
+
+        def restore_full(step):
+            agent.load_checkpoint_state(torch.load(os.path.join(full_dir, f"uno_model_{step}.pt"), map_location='cpu'))
+
+        full_bytes = sum(os.path.getsize(os.path.join(full_dir, name)) for name in os.listdir(full_dir))
+        print(f"{len(steps)} snapshots, one every {args.every} updates, a base every {args.base_every}")
+        start = time.perf_counter()
+        for step in steps:
+            restore_full(step)
+        cold = (time.perf_counter() - start) / len(steps)
+        print(f"  full : {format_bytes(full_bytes)} on disk, save {save_time['full'] / len(steps) * 1e3:.1f} ms, "
+              f"restore {cold * 1e3:.1f} ms")
+
+        for mode, store in stores.items():
+            reopened = DeltaCheckpointStore(store.directory, args.base_every, mode, cache_size=args.cache)
+            start = time.perf_counter()
+            for step in steps:
+                agent.load_checkpoint_state(reopened.load(step))
+            cold = (time.perf_counter() - start) / len(steps)
+            # random access, as league play and rollback do
+            order = random.Random(0).choices(steps, k=4 * len(steps))
+            start = time.perf_counter()
+            for step in order:
+                agent.load_checkpoint_state(reopened.load(step))
+            mixed = (time.perf_counter() - start) / len(order)
+
+            error = 0.0
+            for step in steps:
+                _, expected = flatten(torch.load(os.path.join(full_dir, f"uno_model_{step}.pt"), map_location='cpu'))
+                _, restored = flatten(reopened.load(step))
+                error = max(error, max(float(np.abs(expected[k].astype(np.float64) - restored[k]).max())
+                                       for k in expected if expected[k].size))
+            stats = reopened.stats()
+            print(f"  {mode:5s}: {format_bytes(stats['bytes'])} on disk ({full_bytes / stats['bytes']:.1f}x smaller), "
+                  f"base {format_bytes(stats['mean_base_bytes'])}, delta {format_bytes(stats['mean_delta_bytes'])}, "
+                  f"save {save_time[mode] / len(steps) * 1e3:.1f} ms")
+            print(f"         restore in order {cold * 1e3:.1f} ms, random with a {args.cache}-entry cache "
+                  f"{mixed * 1e3:.1f} ms ({stats['cache_hits']} hits, {stats['cache_misses']} misses), "
+                  f"max abs error {error:.2g}")
+    finally:
+        shutil.rmtree(root)
+
+
+def bench_canonical(args):
+    import contextlib
+    import io
+    import random
+    import shutil
+    import tempfile
+    import torch
+    from torch.utils.data import DataLoader
+    from environment import UnoEnvironment
+    from game_logic import UNOGame
+    from network import DQNAgent
+    from offline_data import GameShardDataset, generate_shards, pretrain
+    from tables import DRAW_ACTION, NUM_ACTIONS
+    from threaded import evaluate
+    from training import RandomAgent, RuleAgent
+
+    # Q-value cache: the same stream of decisions looked up under plain and canonical encodings
+    rng = random.Random(0)
+    states = []
+    for seed in range(args.games):
+        game = UNOGame(seed=seed)
+        state, player = game.init_game()
+        bots = (RuleAgent(), RandomAgent(seed))
+        while not game.game_over() and len(states) < args.games * 100:
+            states.append(state)
+            state, player = game.step(bots[player].select_action(state, state['legal_actions'], game=game))
+    print(f"Q-value cache over {len(states)} decisions from {args.games} rule-vs-random games:")
+    for schema in ('onehot-v1', 'onehot-canon-v1', 'counts-v1', 'counts-canon-v1'):
+        env = UnoEnvironment(schema_version=schema)
+        agent = DQNAgent(env.state_rep.state_size, NUM_ACTIONS, env, device='cpu', q_cache_size=len(states))
+        agent.epsilon = 0.0
+        for state in states:
+            agent.select_action(state, state['legal_actions'])
+        cache = agent.q_cache
+        print(f"  {schema:16s}: {len(cache.entries)} distinct observations, "
+              f"hit rate {cache.hits / (cache.hits + cache.misses):.1%}")
+
+    def accuracies(net, loader):
+        # card accuracy ignores the colour named with a wild: the rule bot always names red, which no
+        # colour-canonical observation can express
+        exact = card = total = 0
+        with torch.no_grad():
+            for obs, masks, actions in loader:
+                predicted = net(obs).masked_fill(~masks, float('-inf')).argmax(dim=1)
+                same = predicted == actions
+                wild = (actions != DRAW_ACTION) & (actions % 15 >= 13) & (predicted != DRAW_ACTION)
+                exact += same.sum().item()
+                card += (same | (wild & (predicted % 15 == actions % 15))).sum().item()
+                total += len(actions)
+        return exact / total, card / total
+
+    # sample efficiency: behaviour cloning of the rule bot from the same few games
+    root = tempfile.mkdtemp(prefix='uno-canonical-')
+    try:
+        holdout = generate_shards(os.path.join(root, 'holdout'), ['rule', 'rule'], args.holdout_games,
+                                  seed=10 ** 6)
+        variants = [('onehot-v1', 0), ('onehot-v1', args.augment), ('onehot-canon-v1', 0),
+                    ('counts-v1', 0), ('counts-v1', args.augment), ('counts-canon-v1', 0)]
+        print(f"behaviour cloning of the rule bot, {args.epochs} epochs, accuracy on {args.holdout_games} "
+              f"held-out games, win rate vs random over {args.eval_games} deals x 2 seats:")
+        for games in args.train_games:
+            paths = generate_shards(os.path.join(root, f"train_{games}"), ['rule', 'rule'], games)
+            for schema, augment in variants:
+                out = os.path.join(root, 'student.pt')
+                with contextlib.redirect_stdout(io.StringIO()):
+                    agent = pretrain(paths, out, schema, epochs=args.epochs, num_workers=0, report_every=0,
+                                     augment=augment)
+                loader = DataLoader(GameShardDataset(holdout, schema, shuffle_buffer=0), batch_size=512)
+                accuracy, card_accuracy = accuracies(agent.policy_net, loader)
+                random.seed(0)
+                torch.manual_seed(0)
+                win_rate = evaluate(out, 'random', range(args.eval_games), threads=1)['win_rate']
+                label = f"{schema}{f' +{augment} relabelled' if augment else ''}"
+                print(f"  {games:5d} games, {label:26s}: held-out accuracy {accuracy:.3f} "
+                      f"(card {card_accuracy:.3f}), win rate {win_rate:.3f}", flush=True)
+    finally:
+        shutil.rmtree(root)
+
+
+def bench_endgame(args):
+    from Evaluation import play_game
+    from environment import UnoEnvironment
+    from game_logic import UNOGame
+    from memory import format_bytes
+    from network import DQNAgent
+    from tables import NUM_ACTIONS
+    from training import RandomAgent, RuleAgent
+
+    class SolverBot:
+        # the rule bot, except where DQNAgent's endgame search returns a move for the live game
+        def __init__(self, agent):
+            self.agent = agent
+            self.rule = RuleAgent()
+            self.solved = 0
+
+        def select_action(self, state, legal_actions, game=None):
+            action = self.agent.endgame_action(state, legal_actions, game)
+            if action is None:
+                return self.rule.select_action(state, legal_actions)
+            self.solved += 1
+            return action
+
+    env = UnoEnvironment()
+    agent = DQNAgent(env.state_rep.state_size, NUM_ACTIONS, env, device='cpu',
+                     endgame_hand_threshold=args.threshold, endgame_node_budget=args.budget)
+    opponent = (lambda seed: RuleAgent()) if args.opponent == 'rule' else RandomAgent
+    print(f"vs {args.opponent}, {args.deals} deals x 2 seats:")
+    for label, player in (('rule bot', RuleAgent()), (f"rule bot + solver at <= {args.threshold} cards",
+                                                      SolverBot(agent))):
+        wins = 0
+        start = time.perf_counter()
+        for seed in range(args.deals):
+            for seat in (0, 1):
+                agents = [player, opponent(seed)] if seat == 0 else [opponent(seed), player]
+                wins += play_game(UNOGame(seed=seed), agents, args.max_turns) == seat
+        elapsed = time.perf_counter() - start
+        print(f"  {label:34s}: win rate {wins / (2 * args.deals):.3f}, {elapsed:.1f}s")
+    stats = agent.endgame.stats()
+    print(f"  solver moves played {player.solved}, {stats['solves']} solves, {stats['nodes']} nodes at "
+          f"{stats['nodes_per_sec']:.0f} nodes/s, TT hit rate {stats['tt_hit_rate']:.1%}, "
+          f"{stats['tt_entries']} entries ({format_bytes(stats['tt_bytes'])})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    startup = commands.add_parser('startup', help='time until the CLIs show their first prompt')
+    startup.add_argument('--repeat', type=int, default=5)
+    startup.set_defaults(run=bench_startup)
+
+    serving = commands.add_parser('serving', help='torch vs numpy inference: load time, RSS, per-move latency')
+    serving.add_argument('--checkpoint', default='checkpoints/uno_model_16000.pt')
+    serving.set_defaults(run=bench_serving)
+
+    duplicate = commands.add_parser('duplicate', help='duplicate-deal vs independent evaluation variance')
+    duplicate.add_argument('--checkpoint', help='.npz policy to rate against the rule bot '
+                                                '(default: two rule-bot variants)')
+    duplicate.add_argument('--epsilon', type=float, default=0.0)
+    duplicate.add_argument('--deals', type=int, default=500)
+    duplicate.add_argument('--max-turns', type=int, default=2000)
+    duplicate.add_argument('--seed', type=int, default=0)
+    duplicate.set_defaults(run=bench_duplicate)
+
+    encode = commands.add_parser('encode', help='observation schemas: input size and encoding cost')
+    encode.add_argument('--states', type=int, default=5000)
+    encode.set_defaults(run=bench_encode)
+
+    vector = commands.add_parser('vector', help='shared-memory vector env throughput by worker count')
+    vector.add_argument('--envs', type=int, default=64)
+    vector.add_argument('--steps', type=int, default=300)
+    vector.add_argument('--workers', type=int, nargs='+', default=[0, 1, 2, 4, 8])
+    vector.add_argument('--checkpoint', help='.npz policy to act with (default: uniform random legal moves)')
+    vector.set_defaults(run=bench_vector)
+
+    replay = commands.add_parser('replay', help='dict vs interned replay storage: bytes, dedup ratio, sampling')
+    replay.add_argument('--episodes', type=int, default=50)
+    replay.add_argument('--capacity', type=int, default=100000)
+    replay.add_argument('--batches', type=int, default=200)
+    replay.add_argument('--batch-size', type=int, default=128)
+    replay.set_defaults(run=bench_replay)
+
+    observation = commands.add_parser('observation', help='per-step allocations of the lazy observation')
+    observation.add_argument('--steps', type=int, default=20000)
+    observation.set_defaults(run=bench_observation)
+
+    checkpoints = commands.add_parser('checkpoints', help='full saves vs delta-compressed history: disk, restore time')
+    checkpoints.add_argument('--updates', type=int, default=4000)
+    checkpoints.add_argument('--every', type=int, default=200)
+    checkpoints.add_argument('--base-every', type=int, default=10)
+    checkpoints.add_argument('--cache', type=int, default=4)
+    checkpoints.add_argument('--episodes', type=int, default=20, help='random-play episodes to fill replay first')
+    checkpoints.set_defaults(run=bench_checkpoints)
+
+    canonical = commands.add_parser('canonical', help='colour canonicalization: cache hits, behaviour-cloning accuracy')
+    canonical.add_argument('--games', type=int, default=200, help='games whose decisions go through the Q cache')
+    canonical.add_argument('--train-games', type=int, nargs='+', default=[20, 100, 500])
+    canonical.add_argument('--holdout-games', type=int, default=200)
+    canonical.add_argument('--epochs', type=int, default=3)
+    canonical.add_argument('--augment', type=int, default=3, help='relabelled copies per decision')
+    canonical.add_argument('--eval-games', type=int, default=100)
+    canonical.set_defaults(run=bench_canonical)
+
+    endgame = commands.add_parser('endgame', help='endgame solver in rule-bot play: win rate, nodes/s, TT hit rate')
+    endgame.add_argument('--threshold', type=int, default=3, help='hand size at or below which the solver plays')
+    endgame.add_argument('--budget', type=int, default=50000, help='node budget per solve')
+    endgame.add_argument('--opponent', choices=['random', 'rule'], default='rule')
+    endgame.add_argument('--deals', type=int, default=100)
+    endgame.add_argument('--max-turns', type=int, default=2000)
+    endgame.set_defaults(run=bench_endgame)
+
+    args = parser.parse_args()
+    args.run(args)
+
+
+if __name__ == '__main__':
+    main()
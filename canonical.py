@@ -0,0 +1,134 @@
+"""
+Colour-permutation symmetry of UNO: relabelling r, g, b and y consistently in a
+state and its actions gives an equally valid state of the relabelled game.
+
+A permutation is a tuple perm with perm[colour] = new colour (indices as in
+utils.COLOR_MAP). canonical_permutation(state) picks one relabelling per state so
+that all 24 relabellings of a state map to the same canonical state: the colour to
+follow becomes r, and the other colours are ordered by the cards held in them
+(most cards first, then by traits, then by first position in the hand, then the
+top card's colour).
+
+    canonical_state, perm = canonicalize(state)
+    action = from_canonical_action(model_action, perm)
+
+The *-canon-v1 schemas in environment.py encode every state this way, so the
+network, the replay buffer and the Q-value cache see symmetric states as one.
+augmentations() and ColourAugmentedMemory feed the other schemas relabelled copies
+instead.
+"""
+import itertools
+import random
+
+from tables import ACTION_SPACE, DRAW_ACTION, INDEX_TO_ACTION, NUM_ACTIONS
+from utils import COLOR_MAP
+
+IDENTITY = (0, 1, 2, 3)
+COLOURS = tuple(sorted(COLOR_MAP, key=COLOR_MAP.get))
+PERMUTATIONS = tuple(itertools.permutations(range(4)))
+
+# ACTION_TABLES[perm][action id] -> the relabelled action id; draw_card is colourless
+ACTION_TABLES = {
+    perm: tuple(perm[a // 15] * 15 + a % 15 if a != DRAW_ACTION else a for a in range(NUM_ACTIONS))
+    for perm in PERMUTATIONS
+}
+# CARD_TABLES[perm][card string] -> the relabelled card string
+CARD_TABLES = {
+    perm: {card: INDEX_TO_ACTION[table[action]] for card, action in ACTION_SPACE.items()}
+    for perm, table in ACTION_TABLES.items()
+}
+INVERSES = {perm: tuple(perm.index(colour) for colour in range(4)) for perm in PERMUTATIONS}
+
+
+def canonical_permutation(state):
+    # the colour to follow, not the top card's: a played wild keeps the colour it was built with
+    top = ACTION_SPACE[state['target']] // 15
+    colour = state.get('current_color')
+    anchor = COLOR_MAP[colour] if colour else top
+    traits = ([], [], [], [])
+    first = [NUM_ACTIONS] * 4
+    for position, card in enumerate(state['hand']):
+        action = ACTION_SPACE[card]
+        colour = action // 15
+        traits[colour].append(action % 15)
+        first[colour] = min(first[colour], position)
+    # only colours holding no cards tie; the top card's colour goes first among them
+    order = sorted((colour for colour in range(4) if colour != anchor),
+                   key=lambda colour: (-len(traits[colour]), sorted(traits[colour]), first[colour], colour != top))
+    perm = [0] * 4
+    for new, colour in enumerate([anchor] + order):
+        perm[colour] = new
+    return tuple(perm)
+
+
+def permute_state(state, perm, legal=True):
+    """
+    A dict copy of the state with every card and action relabelled by perm. Other
+    keys are copied as they are. legal=False leaves out legal_actions, which the
+    encoders never read.
+    """
+    cards = CARD_TABLES[perm]
+    permuted = {key: state[key] for key in state.keys() if key != 'legal_actions'}
+    permuted['target'] = cards[state['target']]
+    if state.get('current_color'):
+        permuted['current_color'] = COLOURS[perm[COLOR_MAP[state['current_color']]]]
+    permuted['hand'] = [cards[card] for card in state['hand']]
+    if legal:
+        table = ACTION_TABLES[perm]
+        permuted['legal_actions'] = [table[action] for action in state['legal_actions']]
+    return permuted
+
+
+def canonicalize(state, legal=True):
+    """
+    Returns (canonical state, perm) with perm mapping the state's colours onto the canonical ones.
+    """
+    perm = canonical_permutation(state)
+    return permute_state(state, perm, legal), perm
+
+
+def to_canonical_action(action, perm):
+    return ACTION_TABLES[perm][action]
+
+
+def from_canonical_action(action, perm):
+    return ACTION_TABLES[INVERSES[perm]][action]
+
+
+def augmentations(state, action, perms=PERMUTATIONS):
+    """
+    Yields (state, action) relabelled by each perm (all 24 by default, the identity
+    included).
+    """
+    for perm in perms:
+        yield permute_state(state, perm), ACTION_TABLES[perm][action]
+
+
+class ColourAugmentedMemory:
+    """
+    Wraps a replay buffer so every push also stores `copies` randomly relabelled
+    versions of the transition (the same relabelling for state and next state).
+    Everything else is delegated to the buffer. Pointless with a *-canon-v1 schema,
+    whose encoder undoes any relabelling.
+    """
+
+    def __init__(self, memory, copies=3, seed=None):
+        self.memory = memory
+        self.copies = copies
+        self.rng = random.Random(seed)
+        self.others = tuple(perm for perm in PERMUTATIONS if perm != IDENTITY)
+
+    def push(self, state, action, reward, next_state, done):
+        self.memory.push(state, action, reward, next_state, done)
+        for perm in self.rng.sample(self.others, self.copies):
+            self.memory.push(permute_state(state, perm), ACTION_TABLES[perm][action], reward,
+                             permute_state(next_state, perm), done)
+
+    def __len__(self):
+        return len(self.memory)
+
+    def __getattr__(self, name):
+        # unpickling looks attributes up before memory is set
+        if name == 'memory':
+            raise AttributeError(name)
+        return getattr(self.memory, name)
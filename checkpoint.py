@@ -0,0 +1,192 @@
+import json
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import torch
+
+
+def snapshot(obj):
+    """
+    Deep-copies a (possibly nested) state dict, cloning every tensor to CPU memory
+    so the live model can keep training while the copy is written out.
+    """
+    if torch.is_tensor(obj):
+        return obj.detach().to('cpu', copy=True)
+    if isinstance(obj, dict):
+        return {key: snapshot(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return type(obj)(snapshot(value) for value in obj)
+    return obj
+
+
+def atomic_write(path, write):
+    """
+    Calls write(file) on a temporary file next to path and renames it into place,
+    so readers never observe a partially written file.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-', suffix=os.path.basename(path))
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def atomic_torch_save(obj, path):
+    atomic_write(path, lambda f: torch.save(obj, f))
+
+
+class CheckpointManager:
+    """
+    Writes agent checkpoints from a background thread with a keep-last-K plus
+    best-by-metric retention policy and a JSON manifest.
+
+    save() only pays for an in-memory copy of the state dicts on the calling thread;
+    serialization and disk I/O happen on a single writer thread, in submission order.
+    """
+
+    def __init__(self, directory, keep_last=5, metric='win_rate', mode='max', prefix='uno_model'):
+        self.directory = directory
+        self.keep_last = keep_last
+        self.metric = metric
+        self.mode = mode
+        self.prefix = prefix
+        self.manifest_path = os.path.join(directory, 'manifest.json')
+        self.lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.stall_times = []
+        os.makedirs(directory, exist_ok=True)
+        self.manifest = self._load_manifest()
+
+    def _load_manifest(self):
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path) as f:
+                return json.load(f)
+        return {'checkpoints': [], 'best': None}
+
+    def path_for(self, step):
+        return os.path.join(self.directory, f"{self.prefix}_{step}.pt")
+
+    def save(self, agent, step, metrics=None):
+        """
+        Snapshots the agent and queues the write. Returns a Future resolving to the checkpoint path.
+        """
+        start = time.perf_counter()
+        state = snapshot(agent.checkpoint_state())
+        self.stall_times.append(time.perf_counter() - start)
+
+        entry = {'step': step, 'epsilon': agent.epsilon, 'metrics': dict(metrics or {}),
+                 'path': os.path.basename(self.path_for(step)), 'time': time.time()}
+        return self.executor.submit(self._write, state, entry)
+
+    def _write(self, state, entry):
+        path = os.path.join(self.directory, entry['path'])
+        atomic_torch_save(state, path)
+        with self.lock:
+            checkpoints = [c for c in self.manifest['checkpoints'] if c['step'] != entry['step']]
+            checkpoints.append(entry)
+            checkpoints.sort(key=lambda c: c['step'])
+            self.manifest['checkpoints'] = checkpoints
+            if self._is_better(entry, self.manifest['best']):
+                self.manifest['best'] = entry
+            self._apply_retention()
+            self._write_manifest()
+        return path
+
+    def _is_better(self, entry, best):
+        value = entry['metrics'].get(self.metric)
+        if value is None:
+            return False
+        if best is None or best['metrics'].get(self.metric) is None:
+            return True
+        current = best['metrics'][self.metric]
+        return value > current if self.mode == 'max' else value < current
+
+    def _apply_retention(self):
+        best_step = self.manifest['best']['step'] if self.manifest['best'] else None
+        checkpoints = self.manifest['checkpoints']
+        # checkpoints[-0:] is the whole list, so keep_last=0 needs its own case
+        recent = {c['step'] for c in checkpoints[-self.keep_last:]} if self.keep_last > 0 else set()
+        kept = []
+        for entry in checkpoints:
+            if entry['step'] in recent or entry['step'] == best_step:
+                kept.append(entry)
+            else:
+                path = os.path.join(self.directory, entry['path'])
+                if os.path.exists(path):
+                    os.remove(path)
+        self.manifest['checkpoints'] = kept
+
+    def _write_manifest(self):
+        data = json.dumps(self.manifest, indent=2).encode()
+        atomic_write(self.manifest_path, lambda f: f.write(data))
+
+    def latest_step(self):
+        with self.lock:
+            if not self.manifest['checkpoints']:
+                return None
+            return self.manifest['checkpoints'][-1]['step']
+
+    def latest_path(self):
+        with self.lock:
+            if not self.manifest['checkpoints']:
+                return None
+            return os.path.join(self.directory, self.manifest['checkpoints'][-1]['path'])
+
+    def best_path(self):
+        with self.lock:
+            if self.manifest['best'] is None:
+                return None
+            return os.path.join(self.directory, self.manifest['best']['path'])
+
+    def promote(self, destination, step=None, **match_kwargs):
+        """
+        Gates a saved checkpoint (the best one by default, else the latest) with the
+        SPRT match runner against the checkpoint at destination, and copies it there
+        if H1 is accepted. With nothing at destination yet it is promoted without a
+        match. match_kwargs go to sprt.run_match. Returns the SPRT, or None if no
+        match was played.
+        """
+        from sprt import promote, run_match
+        self.wait()
+        path = self.path_for(step) if step is not None else self.best_path() or self.latest_path()
+        if path is None:
+            raise ValueError("no checkpoint to promote")
+        test = None
+        if os.path.exists(destination):
+            test = run_match(path, destination, **match_kwargs)
+        if test is None or test.status() == 'accept':
+            promote(path, destination)
+        with self.lock:
+            self.manifest.setdefault('promotions', []).append({
+                'path': os.path.basename(path), 'destination': destination, 'time': time.time(),
+                'status': (test.status() or 'inconclusive') if test is not None else 'accept',
+                'games': test.games if test is not None else 0})
+            self._write_manifest()
+        return test
+
+    def wait(self):
+        """
+        Blocks until every queued checkpoint is on disk.
+        """
+        self.executor.submit(lambda: None).result()
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+
+    def stats(self):
+        stalls = self.stall_times
+        return {
+            'saves': len(stalls),
+            'mean_stall_ms': 1000 * sum(stalls) / len(stalls) if stalls else 0.0,
+            'max_stall_ms': 1000 * max(stalls) if stalls else 0.0,
+        }
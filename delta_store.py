@@ -0,0 +1,268 @@
+"""
+Delta-compressed checkpoint history, for snapshots every few hundred updates.
+
+Every base_every-th save is a full checkpoint (a plain DQNAgent.checkpoint_state()
+file, loadable on its own). The saves in between store, for each tensor, its
+difference from the previous save, byte-shuffled and zlib-compressed:
+
+- 'xor' (default, exact): the bit patterns XOR-ed with the previous values. Unchanged
+  weights become zeros and small updates only leave low mantissa bits set.
+- 'fp16' (lossy): the float difference scaled by its largest magnitude and
+  rounded to float16, half the size of 'xor'. Each delta is taken against the
+  reconstructed previous step, so rounding errors do not accumulate along the
+  chain: every value is within 2**-11 of that tensor's largest step change.
+
+Restoring a step replays the deltas since its base, starting from the nearest
+step still held in an LRU cache of materialized states.
+
+    store = DeltaCheckpointStore('checkpoints/history', base_every=20)
+    store.save(agent, step)
+    agent.load_checkpoint_state(store.load(step))
+
+python benchmark.py checkpoints compares disk use and restore latency with full saves.
+"""
+import hashlib
+import json
+import os
+import zlib
+from collections import OrderedDict
+
+import numpy as np
+import torch
+
+from checkpoint import atomic_torch_save, atomic_write, snapshot
+
+MODES = ('xor', 'fp16')
+
+
+def flatten(state, prefix=''):
+    """
+    Splits a nested state dict into a skeleton, where each tensor is replaced by
+    {'__tensor__': name}, and a {name: numpy array} dict.
+    """
+    if torch.is_tensor(state):
+        return {'__tensor__': prefix}, {prefix: state.detach().cpu().numpy()}
+    if isinstance(state, dict):
+        skeleton, arrays = {}, {}
+        for key, value in state.items():
+            skeleton[key], found = flatten(value, f"{prefix}/{key}")
+            arrays.update(found)
+        return skeleton, arrays
+    if isinstance(state, (list, tuple)):
+        items = [flatten(value, f"{prefix}/{i}") for i, value in enumerate(state)]
+        arrays = {}
+        for _, found in items:
+            arrays.update(found)
+        return type(state)(skeleton for skeleton, _ in items), arrays
+    return state, {}
+
+
+def unflatten(skeleton, arrays):
+    if isinstance(skeleton, dict):
+        if set(skeleton) == {'__tensor__'}:
+            return torch.from_numpy(np.array(arrays[skeleton['__tensor__']]))
+        return {key: unflatten(value, arrays) for key, value in skeleton.items()}
+    if isinstance(skeleton, (list, tuple)):
+        return type(skeleton)(unflatten(value, arrays) for value in skeleton)
+    return skeleton
+
+
+def _compressed(data):
+    # kept as a uint8 tensor: torch.save pickles plain bytes as latin-1 text, nearly doubling them
+    return torch.frombuffer(bytearray(zlib.compress(data, 1)), dtype=torch.uint8)
+
+
+def _decompressed(tensor):
+    return zlib.decompress(tensor.numpy().tobytes())
+
+
+def _shuffled(array):
+    # byte planes one after another: exponents and high mantissa bytes compress far better together
+    return np.ascontiguousarray(array).reshape(-1).view(np.uint8).reshape(-1, array.dtype.itemsize).T.tobytes()
+
+
+def _unshuffled(data, dtype, shape):
+    itemsize = np.dtype(dtype).itemsize
+    planes = np.frombuffer(data, dtype=np.uint8).reshape(itemsize, -1)
+    return np.ascontiguousarray(planes.T).view(dtype).reshape(shape)
+
+
+def encode_delta(new, ref, mode):
+    """
+    Returns (record, reconstruction): the compressed record for `new` given the
+    reference array (None if there is none or it no longer matches), and the array
+    a reader will decode from it.
+    """
+    if ref is None or ref.shape != new.shape or ref.dtype != new.dtype:
+        return {'kind': 'raw', 'dtype': new.dtype.str, 'shape': new.shape,
+                'data': _compressed(_shuffled(new))}, new
+    if mode == 'fp16' and new.dtype.kind == 'f':
+        diff = new - ref
+        # per-tensor scale, so tiny changes (e.g. Adam's second moments) do not underflow float16
+        scale = float(np.abs(diff).max()) or 1.0
+        quantized = (diff / scale).astype(np.float16)
+        reconstruction = (ref + quantized.astype(new.dtype) * scale).astype(new.dtype)
+        return {'kind': 'fp16', 'dtype': new.dtype.str, 'shape': new.shape, 'scale': scale,
+                'data': _compressed(_shuffled(quantized))}, reconstruction
+    bits = np.dtype(f"u{new.dtype.itemsize}")
+    xor = np.bitwise_xor(new.view(bits), ref.view(bits))
+    return {'kind': 'xor', 'dtype': new.dtype.str, 'shape': new.shape,
+            'data': _compressed(_shuffled(xor))}, new
+
+
+def decode_delta(record, ref):
+    dtype, shape = np.dtype(record['dtype']), tuple(record['shape'])
+    data = _decompressed(record['data'])
+    if record['kind'] == 'raw':
+        return _unshuffled(data, dtype, shape)
+    if record['kind'] == 'fp16':
+        return (ref + _unshuffled(data, np.float16, shape).astype(dtype) * record['scale']).astype(dtype)
+    bits = np.dtype(f"u{dtype.itemsize}")
+    return np.bitwise_xor(_unshuffled(data, bits, shape), ref.view(bits)).view(dtype)
+
+
+class DeltaCheckpointStore:
+    """
+    Checkpoint history in one directory with a JSON manifest, as CheckpointManager
+    keeps. Saves must come in increasing step order. The writer keeps the last
+    reconstructed state in memory, so a save never reads from disk.
+    """
+
+    def __init__(self, directory, base_every=20, mode='xor', cache_size=4, prefix='step'):
+        if mode not in MODES:
+            raise ValueError(f"Unknown delta mode: {mode}")
+        self.directory = directory
+        self.base_every = base_every
+        self.mode = mode
+        self.cache_size = cache_size
+        self.prefix = prefix
+        self.manifest_path = os.path.join(directory, 'manifest.json')
+        self.cache = OrderedDict()
+        self.reference = None
+        self.cache_hits = self.cache_misses = 0
+        os.makedirs(directory, exist_ok=True)
+        self.manifest = self._load_manifest()
+
+    def _load_manifest(self):
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path) as f:
+                return json.load(f)
+        return {'entries': []}
+
+    def _write_manifest(self):
+        data = json.dumps(self.manifest, indent=2).encode()
+        atomic_write(self.manifest_path, lambda f: f.write(data))
+
+    def steps(self):
+        return [entry['step'] for entry in self.manifest['entries']]
+
+    def _entry(self, step):
+        for entry in self.manifest['entries']:
+            if entry['step'] == step:
+                return entry
+        raise KeyError(f"no checkpoint for step {step}")
+
+    def save(self, agent, step):
+        """
+        Adds the agent's checkpoint_state() as `step`. Returns the manifest entry.
+        """
+        entries = self.manifest['entries']
+        if entries and step <= entries[-1]['step']:
+            raise ValueError(f"step {step} is not after the last saved step {entries[-1]['step']}")
+        skeleton, arrays = flatten(snapshot(agent.checkpoint_state()))
+        if entries and self.reference is None:
+            self.reference = self._materialize(entries[-1]['step'])[1]
+
+        since_base = next((i for i, entry in enumerate(reversed(entries)) if entry['kind'] == 'base'), None)
+        if since_base is None or since_base + 1 >= self.base_every:
+            path = os.path.join(self.directory, f"{self.prefix}_{step}.pt")
+            atomic_torch_save(unflatten(skeleton, arrays), path)
+            entry = {'step': step, 'kind': 'base', 'parent': None}
+            reconstruction = arrays
+        else:
+            records, reconstruction, seen = {}, {}, {}
+            for name, array in arrays.items():
+                # the target net often equals the policy net: store such copies once
+                key = (array.dtype.str, array.shape, hashlib.blake2b(array.tobytes(), digest_size=16).digest())
+                if key in seen:
+                    records[name] = {'kind': 'same', 'as': seen[key]}
+                    reconstruction[name] = reconstruction[seen[key]]
+                    continue
+                seen[key] = name
+                records[name], reconstruction[name] = encode_delta(array, self.reference.get(name), self.mode)
+            path = os.path.join(self.directory, f"{self.prefix}_{step}.delta")
+            atomic_torch_save({'skeleton': skeleton, 'tensors': records}, path)
+            entry = {'step': step, 'kind': 'delta', 'parent': entries[-1]['step']}
+
+        entry.update(path=os.path.basename(path), bytes=os.path.getsize(path))
+        entries.append(entry)
+        self._write_manifest()
+        self.reference = reconstruction
+        self._remember(step, skeleton, reconstruction)
+        return entry
+
+    def _remember(self, step, skeleton, arrays):
+        self.cache[step] = (skeleton, arrays)
+        self.cache.move_to_end(step)
+        while len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+
+    def _materialize(self, step):
+        if step in self.cache:
+            self.cache_hits += 1
+            self.cache.move_to_end(step)
+            return self.cache[step]
+        self.cache_misses += 1
+
+        # walk back to a cached step or the base, then replay the deltas forward
+        chain = []
+        entry = self._entry(step)
+        while entry['step'] not in self.cache and entry['kind'] == 'delta':
+            chain.append(entry)
+            entry = self._entry(entry['parent'])
+        if entry['step'] in self.cache:
+            skeleton, arrays = self.cache[entry['step']]
+        else:
+            skeleton, arrays = flatten(torch.load(os.path.join(self.directory, entry['path']), map_location='cpu'))
+
+        for entry in reversed(chain):
+            delta = torch.load(os.path.join(self.directory, entry['path']), map_location='cpu')
+            skeleton = delta['skeleton']
+            decoded = {}
+            for name, record in delta['tensors'].items():
+                decoded[name] = decoded[record['as']] if record['kind'] == 'same' else \
+                    decode_delta(record, arrays.get(name))
+            arrays = decoded
+        self._remember(step, skeleton, arrays)
+        return skeleton, arrays
+
+    def load(self, step):
+        """
+        Returns the checkpoint_state() saved as `step`, ready for load_checkpoint_state.
+        """
+        return unflatten(*self._materialize(step))
+
+    def export(self, step, path):
+        """
+        Writes `step` as a standalone checkpoint file, e.g. for sprt.py or eval_cache.py.
+        """
+        atomic_torch_save(self.load(step), path)
+        return path
+
+    def disk_bytes(self):
+        return sum(entry['bytes'] for entry in self.manifest['entries'])
+
+    def stats(self):
+        entries = self.manifest['entries']
+        bases = [entry['bytes'] for entry in entries if entry['kind'] == 'base']
+        deltas = [entry['bytes'] for entry in entries if entry['kind'] == 'delta']
+        return {
+            'saves': len(entries),
+            'bases': len(bases),
+            'deltas': len(deltas),
+            'bytes': self.disk_bytes(),
+            'mean_base_bytes': sum(bases) / len(bases) if bases else 0.0,
+            'mean_delta_bytes': sum(deltas) / len(deltas) if deltas else 0.0,
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses,
+        }
@@ -0,0 +1,205 @@
+"""
+Distils a trained DQN teacher into a small student network for low-latency bots.
+
+    python distill.py checkpoints/uno_model_16000.pt checkpoints/uno_student_64.pt
+
+The student is saved in the DQNAgent checkpoint format, so DQNAgent.load_model
+picks it up as a drop-in replacement for the teacher. With --schema the student
+reads a different observation schema than the teacher, which migrates a trained
+policy to a new encoder without retraining it from scratch.
+"""
+import argparse
+import random
+import time
+
+import numpy as np
+import torch
+import torch.nn.functional as F
+
+from Evaluation import evaluate_agent
+from game_logic import UNOGame
+from environment import SCHEMAS
+from network import DQNAgent, UnoEnvironment
+
+STATE_SIZE = 19 + 4 + (19 * 7) + 3 + 1 + 1
+ACTION_SIZE = 61
+MAX_TURNS = 2000
+# self-play games between greedy agents can stall; cap them so they don't flood the dataset
+COLLECT_MAX_TURNS = 300
+
+
+def load_agent(path, hidden_sizes=(512, 256, 128)):
+    agent = DQNAgent(STATE_SIZE, ACTION_SIZE, UnoEnvironment(), device='cpu', hidden_sizes=hidden_sizes)
+    agent.load_model(path)
+    agent.epsilon = 0.0
+    return agent
+
+
+def collect_states(teacher, num_games, epsilon=0.1, seed=0):
+    """
+    Plays the teacher against itself (with epsilon exploration for coverage) and returns
+    the states and legal-action masks of every decision.
+    """
+    rng = random.Random(seed)
+    states, masks = [], []
+    for _ in range(num_games):
+        game = UNOGame()
+        state, _ = game.init_game()
+        turns = 0
+        while not game.game_over() and turns < COLLECT_MAX_TURNS:
+            legal_actions = state['legal_actions']
+            states.append(state)
+            mask = np.zeros(ACTION_SIZE, dtype=bool)
+            mask[legal_actions] = True
+            masks.append(mask)
+            if rng.random() < epsilon:
+                action = rng.choice(legal_actions)
+            else:
+                action = teacher.select_action(state, legal_actions, game=game)
+            state, _ = game.step(action)
+            turns += 1
+    return states, torch.from_numpy(np.stack(masks))
+
+
+def encode_states(agent, states):
+    return torch.from_numpy(np.stack([agent.state_rep.encode(state) for state in states]))
+
+
+def action_columns(agent, states):
+    """
+    Index of every game action in the agent's outputs, per state (the identity unless
+    its schema is colour-canonical), for gathering outputs into game-action order.
+    """
+    return torch.tensor([agent.state_rep.to_model_actions(state, list(range(ACTION_SIZE))) for state in states])
+
+
+def game_q(agent, states):
+    return agent.policy_net(encode_states(agent, states)).gather(1, action_columns(agent, states))
+
+
+def masked(q_values, masks):
+    return q_values.masked_fill(~masks, float('-inf'))
+
+
+def standardize(q_values, masks):
+    """
+    Rescales each row to zero mean and unit variance over its legal actions. The argmax
+    is unchanged, but targets no longer depend on the teacher's absolute Q scale.
+    """
+    counts = masks.sum(dim=1, keepdim=True)
+    legal = q_values.masked_fill(~masks, 0.0)
+    mean = legal.sum(dim=1, keepdim=True) / counts
+    var = ((legal - mean) ** 2).masked_fill(~masks, 0.0).sum(dim=1, keepdim=True) / counts
+    return ((q_values - mean) / (var.sqrt() + 1e-6)).masked_fill(~masks, 0.0)
+
+
+def train_student(teacher, states, masks, hidden_sizes=(64,), epochs=20, batch_size=512,
+                  lr=1e-3, temperature=0.1, value_weight=0.1, schema_version=None):
+    """
+    Fits a student to the teacher's masked Q-values: cross-entropy against the teacher's
+    softmax policy over legal actions, plus an MSE term towards the teacher's Q-values
+    standardized per state, which is the scale the student's outputs end up on.
+    """
+    student = DQNAgent(STATE_SIZE, ACTION_SIZE, teacher.env, device='cpu', hidden_sizes=hidden_sizes, lr=lr,
+                       schema_version=schema_version or teacher.state_rep.schema_version)
+    student.epsilon = 0.0
+    observations = encode_states(student, states)
+    columns = action_columns(student, states)
+    with torch.no_grad():
+        teacher_q = standardize(game_q(teacher, states), masks)
+    targets = F.softmax(masked(teacher_q, masks) / temperature, dim=1)
+
+    net, optimizer = student.policy_net, student.optimizer
+    for epoch in range(epochs):
+        order = torch.randperm(len(observations))
+        total = 0.0
+        for start in range(0, len(order), batch_size):
+            idx = order[start:start + batch_size]
+            q = net(observations[idx]).gather(1, columns[idx])
+            log_probs = F.log_softmax(masked(q, masks[idx]) / temperature, dim=1)
+            policy_loss = -(targets[idx] * log_probs.masked_fill(~masks[idx], 0.0)).sum(dim=1).mean()
+            value_loss = ((q - teacher_q[idx]) ** 2)[masks[idx]].mean()
+            loss = policy_loss + value_weight * value_loss
+            optimizer.zero_grad()
+            loss.backward()
+            optimizer.step()
+            total += loss.item() * len(idx)
+        print(f"epoch {epoch + 1:3d} loss {total / len(order):.4f}")
+
+    student.target_net.load_state_dict(net.state_dict())
+    return student
+
+
+def action_agreement(teacher, student, states, masks):
+    with torch.no_grad():
+        teacher_actions = masked(game_q(teacher, states), masks).argmax(dim=1)
+        student_actions = masked(game_q(student, states), masks).argmax(dim=1)
+    return (teacher_actions == student_actions).float().mean().item()
+
+
+def model_bytes(net):
+    return sum(p.numel() * p.element_size() for p in net.parameters())
+
+
+def per_move_latency(agent, states, repeats=3):
+    """
+    Mean seconds per select_action call on single observations.
+    """
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for state in states:
+            agent.select_action(state, state['legal_actions'])
+        best = min(best, (time.perf_counter() - start) / len(states))
+    return best
+
+
+def sample_states(num_states, seed=0):
+    rng = random.Random(seed)
+    states = []
+    while len(states) < num_states:
+        game = UNOGame()
+        state, _ = game.init_game()
+        while not game.game_over() and len(states) < num_states:
+            states.append(state)
+            state, _ = game.step(rng.choice(state['legal_actions']))
+    return states
+
+
+def report(teacher, student, states, masks, games):
+    print(f"action agreement: {action_agreement(teacher, student, states, masks):.3f}")
+    win_rate, _, _ = evaluate_agent(UNOGame, student, teacher, games, verbose=False, max_turns=MAX_TURNS)
+    print(f"student vs teacher win rate (student seat 0): {win_rate:.3f} over {games} games "
+          f"(games reaching {MAX_TURNS} turns count as losses)")
+
+    states = sample_states(500)
+    for name, agent in (('teacher', teacher), ('student', student)):
+        latency = per_move_latency(agent, states)
+        print(f"{name}: {model_bytes(agent.policy_net) / 1024:8.1f} KiB parameters, "
+              f"{latency * 1e6:8.1f} us/move")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('teacher')
+    parser.add_argument('student')
+    parser.add_argument('--hidden', type=int, nargs='+', default=[64])
+    parser.add_argument('--games', type=int, default=200, help='self-play games to collect states from')
+    parser.add_argument('--epochs', type=int, default=20)
+    parser.add_argument('--eval-games', type=int, default=200)
+    parser.add_argument('--schema', choices=sorted(SCHEMAS), help="student observation schema (default: the teacher's)")
+    args = parser.parse_args()
+
+    torch.manual_seed(0)
+    teacher = load_agent(args.teacher)
+    states, masks = collect_states(teacher, args.games)
+    print(f"collected {len(states)} states from {args.games} games")
+    split = int(0.9 * len(states))
+    student = train_student(teacher, states[:split], masks[:split], tuple(args.hidden), args.epochs,
+                            schema_version=args.schema)
+    student.save(args.student)
+    report(teacher, student, states[split:], masks[split:], args.eval_games)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,169 @@
+"""
+Data-parallel DQN learner across local processes (torch.distributed, gloo backend).
+
+Each rank plays its own games against its own opponent into its own replay shard.
+Every round the ranks agree on a number of updates (one per agent decision on
+average, as in training.train_agent) and run them in lockstep. Gradients are
+averaged with a single all-reduce before the clip and the Adam step. All ranks start
+from rank 0's weights and apply identical steps, so the networks, the Adam state,
+train_count and hence the target-net syncs and the epsilon schedule never drift apart.
+Deals and exploration are seeded per rank.
+
+    python distributed.py --ranks 4 --episodes 2000 --out checkpoints/uno_ddp.pt
+    python distributed.py --ranks 1 2 4 --episodes 200      # updates/sec per rank count
+
+The checkpoint is written by rank 0 in the DQNAgent format.
+"""
+import argparse
+import hashlib
+import multiprocessing as mp
+import os
+import random
+import socket
+import time
+
+import torch
+import torch.distributed as dist
+
+from environment import UnoEnvironment
+from network import DQNAgent
+from tables import NUM_ACTIONS
+from training import RandomAgent, play_training_episode
+
+# same observation and truncation settings as sweep.py
+EVAL_MAX_TURNS = 2000
+STALL_LIMIT = 10
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+class DistributedDQNAgent(DQNAgent):
+    """
+    DQNAgent whose gradients are averaged over the process group in one flat all-reduce.
+    """
+
+    def reduce_gradients(self):
+        params = list(self.policy_net.parameters())
+        flat = torch.cat([p.grad.reshape(-1) if p.grad is not None else torch.zeros(p.numel()) for p in params])
+        dist.all_reduce(flat)
+        flat /= dist.get_world_size()
+        offset = 0
+        for p in params:
+            if p.grad is None:
+                p.grad = torch.zeros_like(p)
+            p.grad.copy_(flat[offset:offset + p.numel()].view_as(p))
+            offset += p.numel()
+
+    def broadcast_parameters(self, src=0):
+        for tensor in self.policy_net.state_dict().values():
+            dist.broadcast(tensor, src)
+        self.target_net.load_state_dict(self.policy_net.state_dict())
+
+
+def fingerprint(agent):
+    digest = hashlib.blake2b(digest_size=8)
+    for tensor in agent.policy_net.state_dict().values():
+        digest.update(tensor.numpy().tobytes())
+    return digest.hexdigest(), agent.train_count, agent.epsilon
+
+
+def _rank(rank, world_size, port, episodes, seed, out, agent_kwargs, results):
+    # split the host's cores between the ranks instead of oversubscribing them
+    torch.set_num_threads(max(1, (os.cpu_count() or 1) // world_size))
+    dist.init_process_group('gloo', init_method=f'tcp://127.0.0.1:{port}', rank=rank, world_size=world_size)
+    try:
+        random.seed(seed + rank)
+        torch.manual_seed(seed)
+        env = UnoEnvironment(max_turns=EVAL_MAX_TURNS, stall_limit=STALL_LIMIT)
+        agent = DistributedDQNAgent(env.state_rep.state_size, NUM_ACTIONS, env, device='cpu', **agent_kwargs)
+        agent.broadcast_parameters()
+        opponent = RandomAgent(seed + rank)
+
+        counts = torch.zeros(2, dtype=torch.int64)
+        updates = 0
+        learn_time = 0.0
+        start = time.perf_counter()
+        for _ in range(episodes):
+            # act without learning, so every rank runs the same number of updates
+            _, steps, _ = play_training_episode(agent, env, opponent, train_every=0)
+            counts[0], counts[1] = steps, len(agent.memory)
+            total = counts.clone()
+            dist.all_reduce(total[:1])
+            ready = counts[1:].clone()
+            dist.all_reduce(ready, op=dist.ReduceOp.MIN)
+            if ready.item() < agent.batch_size:
+                continue
+            round_updates = int(total[0]) // world_size
+            tick = time.perf_counter()
+            for _ in range(round_updates):
+                agent.train()
+            learn_time += time.perf_counter() - tick
+            updates += round_updates
+        elapsed = time.perf_counter() - start
+
+        prints = [None] * world_size
+        dist.all_gather_object(prints, fingerprint(agent))
+        if rank == 0:
+            if out:
+                agent.save(out)
+            results.put({'ranks': world_size, 'updates': updates, 'learn_time': learn_time, 'elapsed': elapsed,
+                         'batch_size': agent.batch_size, 'in_sync': len(set(prints)) == 1,
+                         'train_count': agent.train_count, 'epsilon': agent.epsilon,
+                         'env_stats': env.stats()})
+    finally:
+        dist.destroy_process_group()
+
+
+def train_distributed(world_size, episodes, seed=0, out=None, **agent_kwargs):
+    """
+    Trains on world_size local ranks, each playing `episodes` games. Returns rank 0's
+    report: updates, learner seconds, wall seconds and whether all ranks ended with
+    identical weights, train_count and epsilon.
+    """
+    ctx = mp.get_context('spawn')
+    results = ctx.Queue()
+    port = free_port()
+    procs = [ctx.Process(target=_rank, args=(rank, world_size, port, episodes, seed, out, agent_kwargs, results))
+             for rank in range(world_size)]
+    for proc in procs:
+        proc.start()
+    try:
+        report = results.get()
+    finally:
+        for proc in procs:
+            proc.join()
+    if any(proc.exitcode for proc in procs):
+        raise RuntimeError(f"a rank failed: exit codes {[proc.exitcode for proc in procs]}")
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--ranks', type=int, nargs='+', default=[2], help='one run per value, to compare scaling')
+    parser.add_argument('--episodes', type=int, default=500, help='games played by each rank')
+    parser.add_argument('--batch-size', type=int, default=128)
+    parser.add_argument('--lr', type=float, default=1e-4)
+    parser.add_argument('--target-update', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', help='checkpoint written by rank 0 (last run only)')
+    args = parser.parse_args()
+
+    print(f"{os.cpu_count()} cores")
+    for i, ranks in enumerate(args.ranks):
+        out = args.out if i == len(args.ranks) - 1 else None
+        report = train_distributed(ranks, args.episodes, args.seed, out, batch_size=args.batch_size, lr=args.lr,
+                                   target_update=args.target_update)
+        rate = report['updates'] / report['learn_time'] if report['learn_time'] else 0.0
+        print(f"{ranks} ranks: {report['updates']} updates, {rate:.1f} updates/s "
+              f"({rate * report['batch_size'] * ranks:.0f} samples/s), {report['elapsed']:.1f}s wall, "
+              f"epsilon {report['epsilon']:.3f}, ranks {'in sync' if report['in_sync'] else 'DIVERGED'}", flush=True)
+    if args.out:
+        print(f"saved {args.out}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,391 @@
+import random
+import time
+from collections import OrderedDict
+
+from memory import deep_sizeof
+from utils import COLOR_MAP, TRAIT_MAP
+
+DRAW_ACTION = 60
+NUM_KINDS = 60
+COLORS = ['r', 'g', 'b', 'y']
+
+# Every physical wild is stored under the red action id in the search, the
+# printed colour of a wild card has no effect on play.
+WILD_KIND = TRAIT_MAP['wild']
+WILD_DRAW_4_KIND = TRAIT_MAP['wild_draw_4']
+
+HAND_0, HAND_1, DECK, BURIED = range(4)
+MAX_COUNT = 8
+WIN = 1.0
+
+
+class BudgetExceeded(Exception):
+    pass
+
+
+def card_kind(card):
+    """
+    Maps a UnoCard to the action id used as its kind in the search.
+    Wild cards collapse onto a single kind regardless of their printed colour.
+    """
+    if card.trait == 'wild':
+        return WILD_KIND
+    if card.trait == 'wild_draw_4':
+        return WILD_DRAW_4_KIND
+    return COLOR_MAP[card.color] * 15 + TRAIT_MAP[card.trait]
+
+
+def counts_of(cards):
+    counts = [0] * NUM_KINDS
+    for card in cards:
+        counts[card_kind(card)] += 1
+    return counts
+
+
+class TranspositionTable:
+    """
+    Bounded LRU table mapping a Zobrist key to (depth, flag, value).
+    """
+    EXACT, LOWER, UPPER = 0, 1, 2
+
+    def __init__(self, max_entries=200000):
+        self.max_entries = max_entries
+        self.table = OrderedDict()
+        self.lookups = 0
+        self.hits = 0
+
+    def get(self, key):
+        self.lookups += 1
+        entry = self.table.get(key)
+        if entry is not None:
+            self.hits += 1
+            self.table.move_to_end(key)
+        return entry
+
+    def put(self, key, entry):
+        self.table[key] = entry
+        self.table.move_to_end(key)
+        if len(self.table) > self.max_entries:
+            self.table.popitem(last=False)
+
+    def clear(self):
+        self.table.clear()
+
+    def nbytes(self):
+        # walked on demand rather than tracked per put(), which is on the search hot path
+        return deep_sizeof(self.table)
+
+    def __len__(self):
+        return len(self.table)
+
+
+class SearchState:
+    """
+    Mutable two-player position with an incrementally maintained Zobrist key.
+    Card zones are kept as per-kind counts so make/unmake is O(1).
+    """
+
+    def __init__(self, zobrist, hands, deck, buried, top, color, to_move):
+        self.z = zobrist
+        self.zones = [list(hands[0]), list(hands[1]), list(deck), list(buried)]
+        self.sizes = [sum(zone) for zone in self.zones]
+        self.top = top
+        self.color = color
+        self.to_move = to_move
+        self.key = self._full_key()
+
+    def _full_key(self):
+        key = self.z.top[self.top] ^ self.z.color[self.color] ^ self.z.side[self.to_move]
+        for zone, counts in enumerate(self.zones):
+            table = self.z.counts[zone]
+            for kind, count in enumerate(counts):
+                if count:
+                    key ^= table[kind][count]
+        return key
+
+    def add(self, zone, kind, delta):
+        counts = self.zones[zone]
+        table = self.z.counts[zone][kind]
+        self.key ^= table[counts[kind]]
+        counts[kind] += delta
+        self.key ^= table[counts[kind]]
+        self.sizes[zone] += delta
+
+    def set_top(self, top, color):
+        self.key ^= self.z.top[self.top] ^ self.z.top[top]
+        self.key ^= self.z.color[self.color] ^ self.z.color[color]
+        self.top = top
+        self.color = color
+
+    def set_to_move(self, player):
+        if player != self.to_move:
+            self.key ^= self.z.side[0] ^ self.z.side[1]
+            self.to_move = player
+
+    def reshuffle(self):
+        """
+        Moves the buried discard pile back into the empty deck, as UNOGame.draw_cards does.
+        """
+        self.zones[DECK], self.zones[BURIED] = self.zones[BURIED], self.zones[DECK]
+        self.sizes[DECK], self.sizes[BURIED] = self.sizes[BURIED], self.sizes[DECK]
+        self.key = self._full_key()
+
+    def legal_moves(self):
+        """
+        Returns (kind, chosen_color) pairs playable by the side to move,
+        with (None, None) standing for the draw action.
+        """
+        hand = self.zones[self.to_move]
+        top_trait = self.top % 15
+        moves = []
+        for kind in range(NUM_KINDS):
+            if not hand[kind]:
+                continue
+            if kind == WILD_KIND or kind == WILD_DRAW_4_KIND:
+                for color in range(4):
+                    moves.append((kind, color))
+            elif kind // 15 == self.color or kind % 15 == top_trait:
+                moves.append((kind, kind // 15))
+        moves.append((None, None))
+        return moves
+
+
+class Zobrist:
+    def __init__(self, seed=0):
+        rng = random.Random(seed)
+        bits = lambda: rng.getrandbits(64)
+        self.counts = [[[bits() for _ in range(MAX_COUNT + 1)] for _ in range(NUM_KINDS)] for _ in range(4)]
+        self.top = [bits() for _ in range(NUM_KINDS)]
+        self.color = [bits() for _ in range(4)]
+        self.side = [bits() for _ in range(2)]
+        self.root = [bits() for _ in range(2)]
+
+
+def move_to_action(move):
+    kind, color = move
+    if kind is None:
+        return DRAW_ACTION
+    if kind == WILD_KIND or kind == WILD_DRAW_4_KIND:
+        return color * 15 + kind
+    return kind
+
+
+class EndgameSolver:
+    """
+    Depth-limited expectiminimax with alpha-beta pruning at decision nodes and
+    chance nodes for every drawn card, for two-player UNOGame positions.
+
+    Values are from the point of view of the player to move at the root:
+    +1 is a forced win, -1 a forced loss. Positions still open at the depth
+    limit are scored by hand-size difference, scaled to stay within (-0.5, 0.5).
+    """
+
+    def __init__(self, max_depth=12, node_budget=50000, tt_size=200000, samples=4, seed=0):
+        self.max_depth = max_depth
+        self.node_budget = node_budget
+        self.samples = samples
+        self.rng = random.Random(seed)
+        self.zobrist = Zobrist(seed)
+        self.tt = TranspositionTable(tt_size)
+        self.nodes = 0
+        self.total_nodes = 0
+        self.total_time = 0.0
+        self.solves = 0
+
+    def stats(self):
+        """
+        Returns cumulative search statistics.
+        """
+        return {
+            'solves': self.solves,
+            'nodes': self.total_nodes,
+            'nodes_per_sec': self.total_nodes / self.total_time if self.total_time else 0.0,
+            'tt_hit_rate': self.tt.hits / self.tt.lookups if self.tt.lookups else 0.0,
+            'tt_entries': len(self.tt),
+            'tt_bytes': self.tt.nbytes(),
+        }
+
+    def root_states(self, game, player_index, known=False):
+        """
+        Builds search states for the player to move. With known=True the real
+        opponent hand and deck contents are used; otherwise the opponent hand is
+        re-dealt uniformly from the cards unseen by the player, once per sample.
+        """
+        me, opp = player_index, 1 - player_index
+        hands = [None, None]
+        hands[me] = counts_of(game.players[me].hand)
+        top = card_kind(game.discard_pile[-1])
+        if top in (WILD_KIND, WILD_DRAW_4_KIND):
+            top = COLOR_MAP[game.current_color] * 15 + top
+        color = COLOR_MAP[game.current_color]
+        buried = counts_of(game.discard_pile[:-1])
+
+        if known:
+            hands[opp] = counts_of(game.players[opp].hand)
+            yield SearchState(self.zobrist, hands, counts_of(game.deck), buried, top, color, me)
+            return
+
+        unseen = list(game.deck) + list(game.players[opp].hand)
+        opp_size = len(game.players[opp].hand)
+        for _ in range(self.samples):
+            self.rng.shuffle(unseen)
+            hands[opp] = counts_of(unseen[:opp_size])
+            yield SearchState(self.zobrist, hands, counts_of(unseen[opp_size:]), buried, top, color, me)
+
+    def solve(self, game, player_index=None, known=False):
+        """
+        Searches the current position of a two-player game by iterative deepening.
+        Returns (action, value) from the deepest iteration completed within the
+        node budget, or None if not even the first iteration finished.
+        """
+        if len(game.players) != 2:
+            return None
+        if player_index is None:
+            player_index = game.current_player_index
+
+        start = time.perf_counter()
+        self.nodes = 0
+        roots = list(self.root_states(game, player_index, known))
+        best = None
+        try:
+            for depth in range(1, self.max_depth + 1):
+                totals = {}
+                for state in roots:
+                    for action, value in self._root_values(state, depth).items():
+                        totals[action] = totals.get(action, 0.0) + value
+                action = max(totals, key=totals.get)
+                best = (action, totals[action] / len(roots))
+                if abs(best[1]) == WIN:
+                    break
+        except BudgetExceeded:
+            pass
+        finally:
+            self.total_nodes += self.nodes
+            self.total_time += time.perf_counter() - start
+            self.solves += 1
+        return best
+
+    def _root_values(self, state, depth):
+        values = {}
+        for move in state.legal_moves():
+            values[move_to_action(move)] = self._after_move(state, move, depth, -WIN, WIN)
+        return values
+
+    def _count_node(self):
+        self.nodes += 1
+        if self.nodes > self.node_budget:
+            raise BudgetExceeded
+
+    def _search(self, state, depth, alpha, beta, root_player):
+        """
+        Decision node. Returns the value for root_player.
+        """
+        self._count_node()
+        if state.sizes[HAND_0] == 0 or state.sizes[HAND_1] == 0:
+            return WIN if state.sizes[root_player] == 0 else -WIN
+        if depth == 0:
+            mine, theirs = state.sizes[root_player], state.sizes[1 - root_player]
+            return 0.5 * (theirs - mine) / (theirs + mine + 1)
+
+        key = state.key ^ self.zobrist.root[root_player]
+        entry = self.tt.get(key)
+        if entry is not None and entry[0] >= depth:
+            _, flag, value = entry
+            if flag == TranspositionTable.EXACT:
+                return value
+            if flag == TranspositionTable.LOWER and value >= beta:
+                return value
+            if flag == TranspositionTable.UPPER and value <= alpha:
+                return value
+
+        maximizing = state.to_move == root_player
+        original_alpha, original_beta = alpha, beta
+        best = -WIN if maximizing else WIN
+        for move in state.legal_moves():
+            value = self._after_move(state, move, depth, alpha, beta, root_player)
+            if maximizing:
+                best = max(best, value)
+                alpha = max(alpha, value)
+            else:
+                best = min(best, value)
+                beta = min(beta, value)
+            if alpha >= beta:
+                break
+
+        if best <= original_alpha:
+            flag = TranspositionTable.UPPER
+        elif best >= original_beta:
+            flag = TranspositionTable.LOWER
+        else:
+            flag = TranspositionTable.EXACT
+        self.tt.put(key, (depth, flag, best))
+        return best
+
+    def _after_move(self, state, move, depth, alpha, beta, root_player=None):
+        if root_player is None:
+            root_player = state.to_move
+        player = state.to_move
+        opponent = 1 - player
+        kind, color = move
+
+        if kind is None:
+            state.set_to_move(opponent)
+            value = self._draw(state, player, 1, depth - 1, root_player)
+            state.set_to_move(player)
+            return value
+
+        old_top, old_color = state.top, state.color
+        played = color * 15 + kind if kind in (WILD_KIND, WILD_DRAW_4_KIND) else kind
+        state.add(player, kind, -1)
+        state.add(BURIED, old_top if old_top % 15 < 13 else old_top % 15, 1)
+        state.set_top(played, color)
+
+        trait = kind % 15
+        if trait == TRAIT_MAP['draw_2']:
+            value = self._draw(state, opponent, 2, depth - 1, root_player)
+        elif trait == TRAIT_MAP['wild_draw_4']:
+            value = self._draw(state, opponent, 4, depth - 1, root_player)
+        elif trait in (TRAIT_MAP['skip'], TRAIT_MAP['reverse']):
+            value = self._search(state, depth - 1, alpha, beta, root_player)
+        else:
+            state.set_to_move(opponent)
+            value = self._search(state, depth - 1, alpha, beta, root_player)
+            state.set_to_move(player)
+
+        state.set_top(old_top, old_color)
+        state.add(BURIED, old_top if old_top % 15 < 13 else old_top % 15, -1)
+        state.add(player, kind, 1)
+        return value
+
+    def _draw(self, state, player, num, depth, root_player):
+        """
+        Chance node: player draws num cards one at a time, then play continues
+        with whoever is already set to move.
+        """
+        if num == 0 or state.sizes[HAND_0] == 0 or state.sizes[HAND_1] == 0:
+            return self._search(state, depth, -WIN, WIN, root_player)
+
+        reshuffled = False
+        if state.sizes[DECK] == 0:
+            if state.sizes[BURIED] == 0:
+                return self._search(state, depth, -WIN, WIN, root_player)
+            state.reshuffle()
+            reshuffled = True
+
+        self._count_node()
+        deck = state.zones[DECK]
+        total = state.sizes[DECK]
+        value = 0.0
+        for kind in range(NUM_KINDS):
+            count = deck[kind]
+            if not count:
+                continue
+            state.add(DECK, kind, -1)
+            state.add(player, kind, 1)
+            value += count / total * self._draw(state, player, num - 1, depth, root_player)
+            state.add(player, kind, -1)
+            state.add(DECK, kind, 1)
+
+        if reshuffled:
+            state.reshuffle()
+        return value
@@ -0,0 +1,246 @@
+import numpy as np
+
+from canonical import ACTION_TABLES, INVERSES, canonical_permutation, permute_state
+from game_logic import UNOGame
+from tables import ACTION_SPACE, CARD_FEATURE_INDEX, CARD_KIND_COPIES, CARD_KIND_INDEX, CARD_KINDS
+from utils import COLOR_MAP
+
+class UnoStateRepresentation:
+    schema_version = 'onehot-v1'
+    # canonical schemas see every state with its colours relabelled (canonical.py)
+    canonical = False
+
+    def __init__(self):
+        self.action_space = ACTION_SPACE
+        self.action_size = len(self.action_space)
+
+        # State representation size:
+        # - Current card (19 features: color one-hot + trait one-hot)
+        # - Current color (4 features: one-hot)
+        # - Hand cards (19 features per card)
+        # - Opponent hand sizes (3 features)
+        # - Game direction (1 feature)
+        # - Number of cards in deck (1 feature)
+        self.state_size = 19 + 4 + (19 * 7) + 3 + 1 + 1
+
+    def card_to_features(self, card_str):
+        features = np.zeros(19)
+        if not card_str:
+            return features
+
+        # Unknown cards leave the features empty
+        indices = CARD_FEATURE_INDEX.get(card_str)
+        if indices is not None:
+            features[list(indices)] = 1
+
+        return features
+
+    def state_to_tensor(self, state):
+        import torch
+        return torch.from_numpy(self.encode(state))
+
+    def encode(self, state):
+        features = np.zeros(self.state_size, dtype=np.float32)
+
+        # Current card features (19 features)
+        current_card = state['target']
+        features[:19] = self.card_to_features(current_card)
+
+        # Current color features (4 features)
+        color_idx = COLOR_MAP[current_card[0]]
+        features[19:23] = np.eye(4)[color_idx]
+
+        # Hand cards features (19 features per card)
+        for i, card in enumerate(state['hand']):
+            start_idx = 23 + (i * 19)  # Start after current card (19) and color (4) features
+            end_idx = start_idx + 19
+            if end_idx <= len(features):  # Ensure we don't exceed array bounds
+                features[start_idx:end_idx] = self.card_to_features(card)
+
+        # Opponent hand sizes (3 features)
+        features[-5:-2] = np.array(state['opponent_hand_sizes']) / 7.0
+
+        # Game direction (1 feature)
+        features[-2] = state.get('direction', 1)
+
+        # Number of cards in deck (1 feature)
+        features[-1] = state.get('deck_size', 0) / 108.0
+
+        return features
+
+    def to_model_actions(self, state, actions):
+        '''
+        Game action ids -> the network's output indices for this state (the same ids
+        unless the schema is canonical).
+        '''
+        return actions
+
+    def to_model_action(self, state, action):
+        return self.to_model_actions(state, [action])[0]
+
+    def to_game_action(self, state, action):
+        '''
+        The network's output index for this state -> the game action id.
+        '''
+        return action
+
+class CountStateRepresentation(UnoStateRepresentation):
+    '''
+    Compact schema: the whole hand as per-kind counts instead of the first 7 cards one-hot.
+    '''
+    schema_version = 'counts-v1'
+
+    def __init__(self):
+        super().__init__()
+        self.kind_scale = 1.0 / np.array(CARD_KIND_COPIES, dtype=np.float32)
+
+        # State representation size:
+        # - Current card (19 features: color one-hot + trait one-hot)
+        # - Current color (4 features: one-hot)
+        # - Hand counts per card kind, scaled by copies in the deck (54 features)
+        # - Hand size (1 feature)
+        # - Opponent hand sizes (3 features)
+        # - Game direction (1 feature)
+        # - Number of cards in deck (1 feature)
+        self.state_size = 19 + 4 + len(CARD_KINDS) + 1 + 3 + 1 + 1
+
+    def encode(self, state):
+        features = np.zeros(self.state_size, dtype=np.float32)
+
+        current_card = state['target']
+        indices = CARD_FEATURE_INDEX.get(current_card)
+        if indices is not None:
+            features[list(indices)] = 1
+        # the colour to follow: after a wild, target keeps the colour it was built with
+        features[19 + COLOR_MAP[state.get('current_color') or current_card[0]]] = 1
+
+        counts = features[23:23 + len(CARD_KINDS)]
+        for card in state['hand']:
+            counts[CARD_KIND_INDEX[card]] += 1
+        counts *= self.kind_scale
+        features[-6] = len(state['hand']) / 7.0
+
+        features[-5:-2] = np.array(state['opponent_hand_sizes']) / 7.0
+        features[-2] = state.get('direction', 1)
+        features[-1] = state.get('deck_size', 0) / 108.0
+        return features
+
+
+class ColourCanonical:
+    '''
+    Mixin for a schema that encodes the colour-canonical form of every state, so
+    the network sees the 24 relabellings of a state as one. Its outputs are indexed
+    by canonical actions; to_model_actions/to_game_action translate for each state.
+    '''
+    canonical = True
+
+    def encode(self, state):
+        return super().encode(permute_state(state, canonical_permutation(state), legal=False))
+
+    def to_model_actions(self, state, actions):
+        table = ACTION_TABLES[canonical_permutation(state)]
+        return [table[action] for action in actions]
+
+    def to_game_action(self, state, action):
+        return ACTION_TABLES[INVERSES[canonical_permutation(state)]][action]
+
+
+class CanonicalStateRepresentation(ColourCanonical, UnoStateRepresentation):
+    schema_version = 'onehot-canon-v1'
+
+
+class CanonicalCountStateRepresentation(ColourCanonical, CountStateRepresentation):
+    schema_version = 'counts-canon-v1'
+
+
+# observation schemas by version; checkpoints record theirs so the matching encoder is used on load
+SCHEMAS = {rep.schema_version: rep for rep in (UnoStateRepresentation, CountStateRepresentation,
+                                               CanonicalStateRepresentation, CanonicalCountStateRepresentation)}
+# checkpoints written before schemas were versioned all use the one-hot encoder
+DEFAULT_SCHEMA = UnoStateRepresentation.schema_version
+
+
+def make_state_rep(schema_version=DEFAULT_SCHEMA):
+    if schema_version not in SCHEMAS:
+        raise ValueError(f"Unknown observation schema: {schema_version}")
+    return SCHEMAS[schema_version]()
+
+
+class UnoEnvironment:
+    def __init__(self, num_players=2, schema_version=DEFAULT_SCHEMA, max_turns=None, stall_limit=None, seed=None):
+        # each game owns its RNG, so environments on different threads share no state
+        self.num_players = num_players
+        self.game = UNOGame(num_players, seed=seed)
+        self.state_rep = make_state_rep(schema_version)
+        self.action_space = self.state_rep.action_space
+
+        # Episodes end as truncated (not terminated) after max_turns steps, or after
+        # stall_limit consecutive steps in which no card moved, e.g. everyone drawing
+        # from an exhausted deck. None disables either limit.
+        self.max_turns = max_turns
+        self.stall_limit = stall_limit
+        self.turns = 0
+        self.stalled_turns = 0
+        self.episodes = 0
+        self.truncations = 0
+        self.stalls = 0
+
+    def reset(self, seed=None):
+        self.game = UNOGame(self.num_players, seed=seed)
+        self.turns = 0
+        self.stalled_turns = 0
+        self.episodes += 1
+        state, _ = self.game.init_game()
+        return state
+
+    def step(self, action, return_drawn_card=False):
+        """
+        Returns (state, reward, terminated, truncated, current_player). Only terminated
+        means the game has a winner; a truncated episode stopped at a limit and its
+        last state should still be bootstrapped from.
+        """
+        piles = (len(self.game.deck), len(self.game.discard_pile))
+        state, current_player = self.game.step(action, return_drawn_card)
+        done = self.game.game_over()
+
+        # Calculate reward
+        reward = self._calculate_reward(done)
+
+        self.turns += 1
+        moved = piles != (len(self.game.deck), len(self.game.discard_pile))
+        self.stalled_turns = 0 if moved else self.stalled_turns + 1
+        truncated = False
+        if not done:
+            if self.stall_limit is not None and self.stalled_turns >= self.stall_limit:
+                self.stalls += 1
+                truncated = True
+            elif self.max_turns is not None and self.turns >= self.max_turns:
+                self.truncations += 1
+                truncated = True
+
+        return state, reward, done, truncated, current_player
+
+    def stats(self):
+        episodes = max(self.episodes, 1)
+        return {
+            'episodes': self.episodes,
+            'truncations': self.truncations,
+            'stalls': self.stalls,
+            'truncation_rate': (self.truncations + self.stalls) / episodes,
+        }
+
+    def _calculate_reward(self, done):
+        if done:
+            winner = self.game.get_winner()
+            if winner.name == "You":
+                return 1.0  # Win
+            return -1.0  # Lose
+
+        # Intermediate rewards
+        reward = 0.0
+
+        # Reward for playing action cards
+        if self.game.discard_pile[-1].type == "action":
+            reward += 0.2
+
+        return reward
\ No newline at end of file
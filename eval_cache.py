@@ -0,0 +1,241 @@
+"""
+Persistent evaluation results, so unchanged checkpoints are never re-played.
+
+Every game result is stored in a local SQLite file, keyed by the candidate's content
+hash, the opponent, the evaluation config and the deal seed. A request runs only the
+seeds that are missing and merges them with what is stored. Re-running a learning
+curve over a checkpoints/ directory therefore only costs the new checkpoints.
+
+    python eval_cache.py checkpoints/ --opponent random --seeds 0:200
+    python eval_cache.py checkpoints/uno_model_16000.npz --opponent rule --seeds 0:500
+
+Players use the sprt.py specs: .npz/.pt checkpoints, `random`, `rule`, `rule:<n>`.
+Checkpoints are identified by SHA-256, so renamed or copied files keep their results
+and an overwritten file gets new ones. Each game reseeds the deal and both players'
+own RNGs (epsilon exploration, random moves), so a cached result is exactly what a
+re-run would give. The global random state is left alone.
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+
+# bump when game rules or scoring change, which invalidates every stored result
+EVAL_VERSION = 1
+DEFAULT_PATH = 'eval_cache.sqlite'
+CHECKPOINT_SUFFIXES = ('.pt', '.npz')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    player TEXT NOT NULL,
+    opponent TEXT NOT NULL,
+    config TEXT NOT NULL,
+    seed INTEGER NOT NULL,
+    seat INTEGER NOT NULL,
+    winner INTEGER,
+    plies INTEGER NOT NULL,
+    PRIMARY KEY (player, opponent, config, seed, seat)
+);
+CREATE TABLE IF NOT EXISTS file_hashes (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    sha256 TEXT NOT NULL
+);
+"""
+
+
+def config_key(max_turns, duplicate):
+    return json.dumps({'version': EVAL_VERSION, 'max_turns': max_turns, 'duplicate': duplicate}, sort_keys=True)
+
+
+class EvalCache:
+    """
+    The SQLite store. File hashes are cached by (path, size, mtime), so large
+    checkpoints are only read again when they change.
+    """
+
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        self.db = sqlite3.connect(path)
+        self.db.executescript(SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def file_hash(self, path):
+        path = os.path.abspath(path)
+        info = os.stat(path)
+        row = self.db.execute('SELECT size, mtime_ns, sha256 FROM file_hashes WHERE path = ?', (path,)).fetchone()
+        if row is not None and row[:2] == (info.st_size, info.st_mtime_ns):
+            return row[2]
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+        with self.db:
+            self.db.execute('INSERT OR REPLACE INTO file_hashes VALUES (?, ?, ?, ?)',
+                            (path, info.st_size, info.st_mtime_ns, digest.hexdigest()))
+        return digest.hexdigest()
+
+    def player_id(self, spec):
+        """
+        Checkpoints are identified by content, bots by their spec string.
+        """
+        if os.path.isfile(spec):
+            return f"sha256:{self.file_hash(spec)}"
+        return spec
+
+    def lookup(self, player, opponent, config, seeds):
+        """
+        Returns {(seed, seat): (winner, plies)} for the stored games among seeds.
+        """
+        self.db.execute('CREATE TEMP TABLE IF NOT EXISTS wanted (seed INTEGER PRIMARY KEY)')
+        self.db.execute('DELETE FROM wanted')
+        self.db.executemany('INSERT OR IGNORE INTO wanted VALUES (?)', ((seed,) for seed in seeds))
+        rows = self.db.execute(
+            'SELECT r.seed, r.seat, r.winner, r.plies FROM results r JOIN wanted w ON r.seed = w.seed '
+            'WHERE r.player = ? AND r.opponent = ? AND r.config = ?', (player, opponent, config))
+        return {(seed, seat): (winner, plies) for seed, seat, winner, plies in rows}
+
+    def store(self, player, opponent, config, results):
+        with self.db:
+            self.db.executemany('INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?)',
+                                [(player, opponent, config, seed, seat, winner, plies)
+                                 for (seed, seat), (winner, plies) in results.items()])
+
+
+def play_seeds(candidate, opponent, seeds, max_turns, duplicate):
+    """
+    Plays the candidate against the opponent on each seeded deal, in seat 0 and, with
+    duplicate, also in seat 1. Returns {(seed, seat): (winner seat or None, plies)}.
+    """
+    from game_logic import UNOGame
+    from sprt import load_player
+
+    players = (load_player(candidate), load_player(opponent))
+    results = {}
+    for seed in seeds:
+        for seat in ((0, 1) if duplicate else (0,)):
+            for player in players:
+                if hasattr(player, 'rng'):
+                    player.rng.seed(seed)
+            game = UNOGame(seed=seed)
+            agents = players if seat == 0 else players[::-1]
+            state, player_idx = game.init_game()
+            plies = 0
+            while not game.game_over() and plies < max_turns:
+                plies += 1
+                state, player_idx = game.step(agents[player_idx].select_action(state, state['legal_actions'], game=game))
+            winner = game.get_winner()
+            results[(seed, seat)] = (game.players.index(winner) if winner else None, plies)
+    return results
+
+
+def summarize(results):
+    """
+    Candidate results over stored games; games cut off at max_turns count as losses,
+    as in Evaluation.evaluate_agent.
+    """
+    games = len(results)
+    wins = sum(winner == seat for (_, seat), (winner, _) in results.items())
+    truncated = sum(winner is None for winner, _ in results.values())
+    return {
+        'games': games,
+        'wins': wins,
+        'truncated': truncated,
+        'win_rate': wins / games if games else 0.0,
+        'avg_plies': sum(plies for _, plies in results.values()) / games if games else 0.0,
+    }
+
+
+def evaluate(cache, candidate, opponent='random', seeds=range(200), max_turns=2000, duplicate=True, workers=1):
+    """
+    Evaluates candidate against opponent on the given seeds, playing only the seeds
+    the cache does not have. Returns summarize() of all of them, plus the number
+    of games 'played' now and taken from 'cached'.
+    """
+    seeds = list(seeds)
+    player, rival, config = cache.player_id(candidate), cache.player_id(opponent), config_key(max_turns, duplicate)
+    results = cache.lookup(player, rival, config, seeds)
+    seats = (0, 1) if duplicate else (0,)
+    missing = [seed for seed in seeds if any((seed, seat) not in results for seat in seats)]
+    cached = len(results)
+
+    if missing:
+        if workers > 1 and len(missing) > 1:
+            chunks = [missing[i::workers] for i in range(workers)]
+            with ProcessPoolExecutor(workers) as pool:
+                played = {}
+                for part in pool.map(play_seeds, [candidate] * workers, [opponent] * workers, chunks,
+                                     [max_turns] * workers, [duplicate] * workers):
+                    played.update(part)
+        else:
+            played = play_seeds(candidate, opponent, missing, max_turns, duplicate)
+        cache.store(player, rival, config, played)
+        results.update(played)
+
+    summary = summarize(results)
+    summary.update(played=len(results) - cached, cached=cached)
+    return summary
+
+
+def checkpoint_step(path):
+    numbers = re.findall(r'\d+', os.path.basename(path))
+    return int(numbers[-1]) if numbers else -1
+
+
+def learning_curve(cache, directory, opponent='random', seeds=range(200), max_turns=2000, duplicate=True,
+                   workers=1, suffixes=CHECKPOINT_SUFFIXES):
+    """
+    Evaluates every checkpoint in directory, in training-step order (the last number
+    in the file name). Returns [(path, summary)].
+    """
+    paths = sorted((os.path.join(directory, name) for name in os.listdir(directory) if name.endswith(suffixes)),
+                   key=lambda path: (checkpoint_step(path), path))
+    return [(path, evaluate(cache, path, opponent, seeds, max_turns, duplicate, workers)) for path in paths]
+
+
+def parse_seeds(text):
+    start, _, stop = text.partition(':')
+    return range(int(start), int(stop)) if stop else range(int(start))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('target', help='a checkpoint, or a directory of them for a learning curve')
+    parser.add_argument('--opponent', default='random')
+    parser.add_argument('--seeds', type=parse_seeds, default=range(200), help='N or START:STOP')
+    parser.add_argument('--max-turns', type=int, default=2000)
+    parser.add_argument('--no-duplicate', dest='duplicate', action='store_false',
+                        help='play each deal once, candidate in seat 0')
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--db', default=DEFAULT_PATH)
+    parser.add_argument('--suffix', nargs='+', default=list(CHECKPOINT_SUFFIXES),
+                        help='checkpoint file types for a directory target')
+    args = parser.parse_args()
+
+    with EvalCache(args.db) as cache:
+        if os.path.isdir(args.target):
+            curve = learning_curve(cache, args.target, args.opponent, args.seeds, args.max_turns, args.duplicate,
+                                   args.workers, tuple(args.suffix))
+        else:
+            curve = [(args.target, evaluate(cache, args.target, args.opponent, args.seeds, args.max_turns,
+                                            args.duplicate, args.workers))]
+    for path, summary in curve:
+        print(f"{path}: win rate {summary['win_rate']:.3f} over {summary['games']} games "
+              f"({summary['truncated']} truncated, {summary['avg_plies']:.0f} plies) - "
+              f"{summary['played']} played, {summary['cached']} cached")
+
+
+if __name__ == '__main__':
+    main()
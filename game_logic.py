@@ -1,45 +1,115 @@
-import random, json
+import random
 from player import Player
-from utils import card_to_action, build_deck, deal_initial_cards, start_card, card_to_str
+from utils import card_to_action, build_deck, deal_initial_cards, start_card, card_to_str, str_to_card
+from tables import ACTION_SPACE, INDEX_TO_ACTION
+from observation import Observation
 
-WILD = ['r-wild', 'g-wild', 'b-wild', 'y-wild']
+WILD = ('r-wild', 'g-wild', 'b-wild', 'y-wild')
 
-WILD_DRAW_4 = ['r-wild_draw_4', 'g-wild_draw_4', 'b-wild_draw_4', 'y-wild_draw_4']
+WILD_DRAW_4 = ('r-wild_draw_4', 'g-wild_draw_4', 'b-wild_draw_4', 'y-wild_draw_4')
 class UNOGame:
-    def __init__(self, num_players=2):
-        with open("./action_space.json") as f:
-            self.action_space = json.load(f)
-
-        self.index_to_action = {v: k for k, v in self.action_space.items()}
+    def __init__(self, num_players=2, seed=None):
+        # every game owns its RNG, so the deal and every reshuffle replay exactly from the seed and
+        # games on different threads share no random state; unseeded games draw their seed from
+        # the global random module once, so random.seed() still reproduces them
+        self.seed = seed
+        self.rng = random.Random(seed if seed is not None else random.getrandbits(64))
+        self.action_space = ACTION_SPACE
+        self.index_to_action = INDEX_TO_ACTION
         self.players = [Player("You")] + [Player(f"Bot {idx + 1}") for idx in range(num_players - 1)]
         self.deck = build_deck()
-        random.shuffle(self.deck)
+        self.rng.shuffle(self.deck)
         self.discard_pile = []
         self.current_color = None
         self.direction = 1  
         self.current_player_index = 0
         self.skip_next = False 
+        # callables notified as listener(event, game, **info) on 'play', 'draw', 'reshuffle'
+        # and, once the turn has advanced, 'step' (player_index, action)
+        self.listeners = []
         deal_initial_cards(self)
         start_card(self)
 
+    def snapshot(self):
+        """
+        Returns a JSON-serializable copy of the full game state, including the
+        RNG state, so restore() continues it exactly.
+        """
+        version, internal, gauss = self.rng.getstate()
+        return {
+            'seed': self.seed,
+            'hands': [[card.str for card in player.hand] for player in self.players],
+            'deck': [card.str for card in self.deck],
+            'discard_pile': [card.str for card in self.discard_pile],
+            'current_color': self.current_color,
+            'direction': self.direction,
+            'current_player_index': self.current_player_index,
+            'skip_next': self.skip_next,
+            'rng_state': [version, list(internal), gauss],
+        }
+
+    @classmethod
+    def restore(cls, snapshot):
+        """
+        Builds a game from snapshot(). Listeners are not part of the snapshot.
+        """
+        game = cls(len(snapshot['hands']), seed=snapshot['seed'])
+        for player, hand in zip(game.players, snapshot['hands']):
+            player.hand = [str_to_card(card) for card in hand]
+        game.deck = [str_to_card(card) for card in snapshot['deck']]
+        game.discard_pile = [str_to_card(card) for card in snapshot['discard_pile']]
+        game.current_color = snapshot['current_color']
+        game.direction = snapshot['direction']
+        game.current_player_index = snapshot['current_player_index']
+        game.skip_next = snapshot['skip_next']
+        if snapshot['rng_state'] is not None:
+            version, internal, gauss = snapshot['rng_state']
+            game.rng.setstate((version, tuple(internal), gauss))
+        return game
+
     def get_actionSpace(self):
         return self.action_space
     
     def get_player_list(self):
         return list(self.players)
         
+    def notify(self, event, **info):
+        for listener in self.listeners:
+            listener(event, self, **info)
+
+    def reshuffle(self):
+        """
+        Turns the discard pile, except its top card, into a freshly shuffled deck.
+        Returns False when there is nothing to reshuffle.
+        """
+        if len(self.discard_pile) <= 1:  # Keep at least 1 card for gameplay
+            return False
+        top_card = self.discard_pile.pop()
+        self.deck = self.discard_pile
+        self.rng.shuffle(self.deck)
+        self.discard_pile = [top_card]
+        if self.listeners:
+            self.notify('reshuffle', cards=self.deck)
+        return True
+
+    def draw_card(self, player, reshuffle=True):
+        """
+        Moves the top card of the deck into the player's hand, reshuffling the
+        discard pile first if the deck is empty. Returns the card, or None.
+        """
+        if not self.deck and not (reshuffle and self.reshuffle()):
+            return None
+        card = self.deck.pop()
+        player.add_card(card)
+        if self.listeners:
+            self.notify('draw', player_index=self.players.index(player), card=card)
+        return card
+
     def draw_cards(self, player, num=1):
         for _ in range(num):
-            if not self.deck:
-                if len(self.discard_pile) > 1:  # Keep at least 1 card for gameplay
-                    top_card = self.discard_pile.pop()
-                    self.deck = self.discard_pile
-                    random.shuffle(self.deck)
-                    self.discard_pile = [top_card]
-                else:
-                    #print("No cards")
-                    return
-            player.add_card(self.deck.pop())
+            if self.draw_card(player) is None:
+                #print("No cards")
+                return
 
 
     def apply_card_effect(self, card):
@@ -79,6 +149,8 @@ class UNOGame:
             self.current_color = chosen_color
         else:
             self.current_color = card.color
+        if self.listeners:
+            self.notify('play', player_index=self.players.index(player), card=card)
         self.apply_card_effect(card)
 
     def is_valid_move(self, card):
@@ -107,42 +179,15 @@ class UNOGame:
 
     def get_state_for_player(self, index):
         """
-        Returns the state for the player as a dictionary:
+        Returns the player's view of the game as a dict-like Observation:
           - 'target': top card's action string.
+          - 'current_color': the colour to follow ('r', 'g', 'b' or 'y'), the named one after a wild.
           - 'hand': list of action strings representing player's hand (for human).
+          - 'opponent_hand_sizes': hand sizes of the other players, in seat order.
           - 'legal_actions': list of legal action indices (from action_space mapping).
+        Only the cards and sizes are captured here; the rest is built on first access.
         """
-        state = {}
-        state['target'] = card_to_str(self, self.discard_pile[-1])
-        # if index == 0:
-        state['hand'] = [card_to_str(self, card) for card in self.players[index].hand]
-        # else:
-        #     state['hand'] = []
-
-        state['opponent_hand_sizes'] = []
-        for i, player in enumerate(self.players):
-            if i != index:  # Skip the current player
-                state['opponent_hand_sizes'].append(len(player.hand))
-
-        # Always include draw_card as a legal action
-        legal = [self.action_space["draw_card"]]
-
-        current_player = self.players[index]
-        for card in current_player.hand:
-            if card.is_playable_on(self.discard_pile[-1], self.current_color):
-                if card.type != "wild":
-                    act = card_to_action(card)
-                    if act in self.action_space:
-                        legal.append(self.action_space[act])
-                elif card.trait == 'wild_draw_4':
-                    for card in WILD_DRAW_4:
-                        legal.append(self.action_space[card])
-                else:
-                    for card in WILD:
-                        legal.append(self.action_space[card])
-                        
-        state['legal_actions'] = legal
-        return state
+        return Observation.for_player(self, index)
 
     def init_game(self):
         """
@@ -164,16 +209,7 @@ class UNOGame:
         drawn_card = None
         
         if action_str == "draw_card":
-            if not self.deck:
-                if len(self.discard_pile) > 1:  # Keep at least 1 card for gameplay
-                    top_card = self.discard_pile.pop()
-                    self.deck = self.discard_pile
-                    random.shuffle(self.deck)
-                    self.discard_pile = [top_card]
-            
-            if self.deck:  # If there are still cards in the deck
-                drawn_card = self.deck.pop()
-                current_player.add_card(drawn_card)
+            drawn_card = self.draw_card(current_player)
                 
         else:
             selected_card = None
@@ -198,9 +234,9 @@ class UNOGame:
                 self.play_card(current_player, selected_card, chosen_color)
             else:
                 # If selected card is invalid, default to drawing a card
-                if self.deck:
-                    drawn_card = self.deck.pop()
-                    current_player.add_card(drawn_card)
+                drawn_card = self.draw_card(current_player, reshuffle=False)
+
+        acting_index = self.current_player_index
 
         # Advance turn
         if self.skip_next:
@@ -209,6 +245,9 @@ class UNOGame:
         else:
             self.current_player_index = (self.current_player_index + self.direction) % len(self.players)
         
+        if self.listeners:
+            self.notify('step', player_index=acting_index, action=action)
+
         state = self.get_state_for_player(self.current_player_index)
         
         # Add drawn card to state if requested
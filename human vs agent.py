@@ -1,17 +1,20 @@
 import time
 import random
+import os
+import importlib.util
 from termcolor import colored
 
-from game_logic import UNOGame
-from network import DQNAgent, UnoEnvironment
+from environment import UnoEnvironment
 from utils import colorize_card_strings
 
+# chance of a random legal move instead of the network's choice, per difficulty level
+DIFFICULTY_EPSILON = {1: 0.5, 2: 0.2, 3: 0.0}
+
 class HumanVsAgentInterface:
     def __init__(self, agent_model_path="./checkpoints/uno_model_16000.pt"):
         print("\n\n")
         print("=" * 60)
         print("WELCOME TO UNO: HUMAN VS AI".center(60))
-        time.sleep(3)
         print("=" * 60 + "\n")
         print("Select Agent difficulty:")
         print("  1: Easy")
@@ -42,7 +45,6 @@ class HumanVsAgentInterface:
         self.discard_pile = []
         
         self.agent = self.load_agent(agent_model_path)
-        self.difficulty_scaler = None
 
         self.game_players[0].name = "You"
         self.game_players[1].name = "Agent"
@@ -51,11 +53,24 @@ class HumanVsAgentInterface:
     
     def load_agent(self, model_path):
         print("Loading AI agent...")
+        if model_path.endswith('.npz') or importlib.util.find_spec('torch') is None:
+            # serve the exported weights with the numpy runtime, no torch needed
+            from numpy_runtime import NumpyAgent
+            npz_path = os.path.splitext(model_path)[0] + '.npz'
+            if not os.path.exists(npz_path):
+                # .npz files are not committed; they are exported from the .pt on a machine with torch
+                raise SystemExit(f"{npz_path} not found. Export it from the checkpoint with:\n"
+                                 f"    python numpy_runtime.py {os.path.splitext(model_path)[0]}.pt {npz_path}")
+            agent = NumpyAgent(npz_path, epsilon=DIFFICULTY_EPSILON[self.difficulty])
+            print(f"Successfully loaded agent from {npz_path}")
+            return agent
+
+        # torch is only imported here, once the game actually needs the network
+        from network import DQNAgent
         agent = DQNAgent(19 + 4 + (19 * 7) + 3 + 1 + 1, 61, self.game)
         agent.load_model(model_path)
         print(f"Successfully loaded agent from {model_path}")
-        agent.epsilon = 0.05
-        exec(agent.difficulty_scaler,globals())
+        agent.epsilon = DIFFICULTY_EPSILON[self.difficulty]
         return agent
 
     def show_game_state(self):
@@ -133,7 +148,7 @@ class HumanVsAgentInterface:
                 print(f"Please enter a number between 1 and {len(self.state['legal_actions'])}")
 
     def handle_draw_card(self, selected_action):
-        next_state, _, _, next_player = self.game.step(selected_action, return_drawn_card=True)
+        next_state, _, _, _, next_player = self.game.step(selected_action, return_drawn_card=True)
         drawn_card = next_state.get('drawn_card')
         
         if drawn_card:
@@ -153,7 +168,7 @@ class HumanVsAgentInterface:
                     play_action_str = self.game.game.index_to_action[play_action]
                     self.discard_pile.append(play_action_str)
                     
-                    self.state, _, _, self.player = self.game.step(play_action)
+                    self.state, _, _, _, self.player = self.game.step(play_action)
                     return play_action
                 else:
                     print("You chose not to play the drawn card. Turn passes to the agent.")
@@ -172,14 +187,9 @@ class HumanVsAgentInterface:
             time.sleep(0.3)
             print(".", end="", flush=True)
         print()
-        ac = difficulty_scaler(self.state, self.discard_pile, self.game.game.index_to_action, self.difficulty)
-        if ac is None:
-            legal_actions = self.state['legal_actions']
-            action = self.agent.select_action(self.state, legal_actions)
-            action_str = self.game.game.index_to_action[action]         
-        else:
-            action_str = ac['selected_card']
-            action = self.game.game.action_space[action_str]
+        legal_actions = self.state['legal_actions']
+        action = self.agent.select_action(self.state, legal_actions, game=self.game.game)
+        action_str = self.game.game.index_to_action[action]
         if action_str == "draw_card":
             if self.game.game.deck:
                 drawn_card_obj = self.game.game.deck[-1]
@@ -223,7 +233,7 @@ class HumanVsAgentInterface:
                 action_str = self.game.game.index_to_action[action]
                 
                 if action_str != "draw_card":
-                    self.state, _, _, self.player = self.game.step(action)
+                    self.state, _, _, _, self.player = self.game.step(action)
                 
                 self.handle_special_card(action_str)
                 
@@ -233,7 +243,7 @@ class HumanVsAgentInterface:
                 self.show_game_state()
                 action = self.agent_turn()
                 
-                self.state, _, _, self.player = self.game.step(action)
+                self.state, _, _, _, self.player = self.game.step(action)
                 
                 action_str = self.game.game.index_to_action[action]
                 
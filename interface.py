@@ -1,7 +1,7 @@
 from game_logic import UNOGame
-import numpy as np
 from termcolor import colored
 from utils import colorize_card_strings
+import random
 import time
 
 class UnoInterface:
@@ -20,7 +20,11 @@ class UnoInterface:
         self.game_players = self.game.get_player_list()
         self.state, self.player = self.game.init_game()
         self.colors_list = ['black', 'red', 'green', 'yellow', 'blue', 'magenta', 'cyan','dark_grey', 'light_green','light_magenta', 'light_cyan']
-        self.bot_colors = np.random.choice(self.colors_list,self.num_players, replace = True if self.num_players > len(self.colors_list) else False)
+        # distinct colours while there are enough of them, repeats only beyond that
+        if self.num_players > len(self.colors_list):
+            self.bot_colors = random.choices(self.colors_list, k=self.num_players)
+        else:
+            self.bot_colors = random.sample(self.colors_list, self.num_players)
         self.discard_pile = []
 
     def show_game_state(self, bot_id = 0):
@@ -68,12 +72,12 @@ class UnoInterface:
         """
         Chooses a random legal action for the Bot.
         """
-        action_index = np.random.choice(self.state['legal_actions'])
+        action_index = random.choice(self.state['legal_actions'])
         action_str = self.game.index_to_action[action_index]
         colors = ['r','g','b', 'y']
         if "wild" in action_str:
             if action_str.split('-')[0] not in colors:
-                new_prefix = np.random.choice(list(colors))
+                new_prefix = random.choice(colors)
                 action_str = f"{new_prefix}-{action_str.split('-')[-1]}"
                 action_index = self.game.action_space[action_str]
         print(f"{colored(f'Bot {bot_id} Plays:', self.bot_colors[int(bot_id) - 1])} {colorize_card_strings(action_str)}")
@@ -92,7 +96,7 @@ class UnoInterface:
                 self.show_game_state(self.game.players[self.player].name[4:])
                 action = self.bot_turn(self.game.players[self.player].name[4:])
                 # random sleeping for more readable console logs
-                time.sleep(np.random.random() * 2 + 1)
+                time.sleep(random.uniform(1, 3))
                 
             # stack and discard pile are the same for some reason..
             self.discard_pile.append(self.game.index_to_action[action])
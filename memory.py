@@ -0,0 +1,172 @@
+"""
+Byte accounting for replay buffers and caches.
+
+Sizes are sys.getsizeof over the unique objects an entry references, plus tensor
+and array storage. States shared between entries (a state that is one transition's
+next_state and the next transition's state) are counted once by SizeLedger, however
+many entries hold them. Strings are not charged to any entry: they are field names,
+colours and card names, shared by every state or owned by the deck's cards, which
+observations reference but do not own either.
+"""
+import sys
+
+from observation import Observation
+
+# immortal or interpreter-wide objects that no container owns
+_SMALL_INTS = range(-5, 257)
+
+
+def object_size(obj):
+    """
+    Bytes owned by obj itself, excluding the objects it references.
+    """
+    size = sys.getsizeof(obj)
+    if type(obj).__module__ == 'torch' and hasattr(obj, 'untyped_storage'):
+        # a tensor's Python object is small; its storage lives outside it
+        size += obj.untyped_storage().nbytes()
+    return size
+
+
+def children(obj):
+    if isinstance(obj, Observation):
+        # fill the lazy fields first, so what is measured is what the observation will hold
+        obj.materialize()
+        return [getattr(obj, slot) for slot in Observation.__slots__]
+    if isinstance(obj, dict):
+        return [*obj, *obj.values()]
+    if isinstance(obj, (list, tuple, set, frozenset)) or type(obj).__name__ == 'deque':
+        return list(obj)
+    return ()
+
+
+def _shared(obj):
+    # cards and their names belong to the game's deck; observations only reference them
+    return (obj is None or obj is True or obj is False or (type(obj) is int and obj in _SMALL_INTS)
+            or type(obj) is str or type(obj).__name__ == 'UnoCard')
+
+
+def deep_sizeof(obj, seen=None):
+    """
+    Total bytes of obj and everything reachable through containers, counting shared objects once.
+    """
+    seen = set() if seen is None else seen
+    total = 0
+    stack = [obj]
+    while stack:
+        node = stack.pop()
+        if _shared(node) or id(node) in seen:
+            continue
+        seen.add(id(node))
+        total += object_size(node)
+        stack.extend(children(node))
+    return total
+
+
+# objects that can be referenced by more than one entry: states, since a state is one
+# transition's next_state and the next one's state
+SHAREABLE = (dict, Observation)
+
+
+def _owned(root):
+    """
+    Bytes of root plus the non-shareable objects below it, and the shareable objects it references.
+    """
+    size = 0
+    shared = []
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        if _shared(node):
+            continue
+        size += object_size(node)
+        for child in children(node):
+            if isinstance(child, SHAREABLE):
+                shared.append(child)
+            else:
+                stack.append(child)
+    return size, shared
+
+
+class SizeLedger:
+    """
+    Byte total over the objects reachable from the entries a container currently
+    holds. Shareable objects are reference-counted so each is counted once; lists,
+    tuples and numbers are charged to the entry or shared object that holds them.
+    Observations have their lazy fields built before they are charged, so a charge
+    is what the object holds for as long as it is held. What an entry or shared
+    object was charged is remembered and refunded exactly.
+    """
+
+    def __init__(self):
+        self.refs = {}
+        self.charges = {}
+        self.nbytes = 0
+
+    def add(self, entry):
+        size, shared = _owned(entry)
+        self.charges.setdefault(id(entry), []).append((size, shared))
+        self.nbytes += size
+        for obj in shared:
+            self._acquire(obj)
+
+    def remove(self, entry):
+        charges = self.charges[id(entry)]
+        size, shared = charges.pop()
+        if not charges:
+            del self.charges[id(entry)]
+        self.nbytes -= size
+        for obj in shared:
+            self._release(obj)
+
+    # refs and charges are keyed by id only: a counted object is referenced by a held
+    # entry, so it stays alive and its id cannot be reused until the last such entry is removed
+
+    def _acquire(self, obj):
+        ref = self.refs.get(id(obj))
+        if ref is not None:
+            ref[0] += 1
+            return
+        size, shared = _owned(obj)
+        self.refs[id(obj)] = [1, size, shared]
+        self.nbytes += size
+        for child in shared:
+            self._acquire(child)
+
+    def _release(self, obj):
+        ref = self.refs[id(obj)]
+        ref[0] -= 1
+        if ref[0]:
+            return
+        del self.refs[id(obj)]
+        _, size, shared = ref
+        self.nbytes -= size
+        for child in shared:
+            self._release(child)
+
+    def clear(self):
+        self.refs.clear()
+        self.charges.clear()
+        self.nbytes = 0
+
+
+def rss_bytes():
+    """
+    Resident set size of this process (peak RSS where /proc is unavailable).
+    """
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def format_bytes(n):
+    for unit in ('B', 'KiB', 'MiB', 'GiB'):
+        if abs(n) < 1024 or unit == 'GiB':
+            return f"{n:.1f} {unit}" if unit != 'B' else f"{int(n)} B"
+        n /= 1024
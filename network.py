@@ -4,42 +4,98 @@ import torch.nn as nn
 import torch.optim as optim
 from collections import deque
 import random
-import json
-from game_logic import UNOGame
-import base64
+import copy
+from environment import UnoStateRepresentation, UnoEnvironment, DEFAULT_SCHEMA, make_state_rep
+from endgame import EndgameSolver
+from canonical import ColourAugmentedMemory
+from qcache import QValueCache, model_version
+from checkpoint import atomic_torch_save
+from memory import SizeLedger
+import sys
+import hashlib
+import threading
+
+PRIORITY_BYTES = sys.getsizeof(1.0)
+# observations are keyed by a 128-bit digest of their encoded bytes
+DIGEST_SIZE = 16
+DIGEST_BYTES = sys.getsizeof(bytes(DIGEST_SIZE))
+
+
+def _grown(n):
+    # grow by a quarter rather than doubling: copies stay amortized O(1) and the
+    # unused tail of a large table stays small
+    return n + max(n // 4, 1024)
 
 class DQN(nn.Module):
-    def __init__(self, input_size, output_size):
+    def __init__(self, input_size, output_size, hidden_sizes=(512, 256, 128)):
         super(DQN, self).__init__()
-        self.fc1 = nn.Linear(input_size, 512)
-        self.fc2 = nn.Linear(512, 256)
-        self.fc3 = nn.Linear(256, 128)
-        self.fc4 = nn.Linear(128, output_size)
-
-        # Initialize weights using Xavier initialization
-        nn.init.xavier_uniform_(self.fc1.weight)
-        nn.init.xavier_uniform_(self.fc2.weight)
-        nn.init.xavier_uniform_(self.fc3.weight)
-        nn.init.xavier_uniform_(self.fc4.weight)
+        self.hidden_sizes = tuple(hidden_sizes)
+        # layers keep the fc1..fcN names so older checkpoints load unchanged
+        sizes = [input_size, *self.hidden_sizes, output_size]
+        self.num_layers = len(sizes) - 1
+        for i in range(self.num_layers):
+            layer = nn.Linear(sizes[i], sizes[i + 1])
+            # Initialize weights using Xavier initialization
+            nn.init.xavier_uniform_(layer.weight)
+            setattr(self, f"fc{i + 1}", layer)
+
+    @staticmethod
+    def hidden_sizes_of(state_dict):
+        """
+        Infers the hidden layer sizes from a DQN state dict.
+        """
+        num_layers = sum(1 for key in state_dict if key.startswith('fc') and key.endswith('.weight'))
+        return tuple(state_dict[f"fc{i}.weight"].shape[0] for i in range(1, num_layers))
 
     def forward(self, x):
-        x = torch.relu(self.fc1(x))
-        x = torch.relu(self.fc2(x))
-        x = torch.relu(self.fc3(x))
-        return self.fc4(x)
+        for i in range(1, self.num_layers):
+            x = torch.relu(getattr(self, f"fc{i}")(x))
+        return getattr(self, f"fc{self.num_layers}")(x)
 
 class ReplayBuffer:
-    def __init__(self, capacity):
-        self.buffer = deque(maxlen=capacity)
-        self.priorities = deque(maxlen=capacity)
-        self.alpha = 0.6  
-        self.beta = 0.4   
-        self.beta_increment = 0.001
+    # samples are lists of (state, action, reward, next_state, done) with raw state dicts
+    encoded = False
+
+    def __init__(self, capacity=None, alpha=0.6, beta=0.4, beta_increment=0.001, max_bytes=None):
+        # capacity bounds the number of transitions and max_bytes their measured size;
+        # the oldest transitions are evicted once either limit is exceeded (None disables a limit)
+        self.capacity = capacity
+        self.max_bytes = max_bytes
+        self.buffer = deque()
+        self.priorities = deque()
+        self.alpha = alpha
+        self.beta = beta
+        self.beta_increment = beta_increment
+        self.ledger = SizeLedger()
 
     def push(self, state, action, reward, next_state, done):
         max_priority = max(self.priorities) if self.priorities else 1.0
-        self.buffer.append((state, action, reward, next_state, done))
+        if self.capacity is not None and len(self.buffer) >= self.capacity:
+            self._evict()
+        transition = (state, action, reward, next_state, done)
+        self.buffer.append(transition)
         self.priorities.append(max_priority)
+        self.ledger.add(transition)
+        while self.max_bytes is not None and len(self.buffer) > 1 and self.nbytes > self.max_bytes:
+            self._evict()
+
+    def _evict(self):
+        self.ledger.remove(self.buffer.popleft())
+        self.priorities.popleft()
+
+    @property
+    def nbytes(self):
+        # transitions (shared states counted once) plus the deques and priority floats
+        return (self.ledger.nbytes + sys.getsizeof(self.buffer) + sys.getsizeof(self.priorities)
+                + len(self.priorities) * PRIORITY_BYTES)
+
+    def memory_stats(self):
+        return {
+            'transitions': len(self.buffer),
+            'bytes': self.nbytes,
+            'bytes_per_transition': self.nbytes / len(self.buffer) if self.buffer else 0.0,
+            'max_bytes': self.max_bytes,
+        }
 
     def sample(self, batch_size):
         total = len(self.buffer)
@@ -62,46 +118,389 @@ class ReplayBuffer:
     def __len__(self):
         return len(self.buffer)
 
-class DQNAgent:
-    def __init__(self, state_size, action_size,env ,  device='cuda' if torch.cuda.is_available() else 'cpu'):
+    def __getstate__(self):
+        # the ledger is keyed by object ids, which do not survive pickling: it is rebuilt on load
+        state = dict(self.__dict__)
+        del state['ledger']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.ledger = SizeLedger()
+        for transition in self.buffer:
+            self.ledger.add(transition)
+
+class ObservationTable:
+    '''
+    Content-addressed store of encoded observations. Each distinct observation is kept
+    once as a row of a float32 matrix, keyed by a digest of its bytes and reference
+    counted; a row is freed for reuse when its last reference is released.
+    '''
+    def __init__(self, state_size, initial_rows=1024):
+        self.rows = np.zeros((initial_rows, state_size), dtype=np.float32)
+        self.refs = np.zeros(initial_rows, dtype=np.int64)
+        self.keys = [None] * initial_rows
+        self.index = {}
+        self.free = list(range(initial_rows - 1, -1, -1))
+        self.lookups = 0
+        self.hits = 0
+
+    def _grow(self):
+        old, new = len(self.rows), _grown(len(self.rows))
+        rows = np.zeros((new, self.rows.shape[1]), dtype=np.float32)
+        rows[:old] = self.rows
+        self.rows = rows
+        self.refs = np.concatenate([self.refs, np.zeros(new - old, dtype=self.refs.dtype)])
+        self.keys.extend([None] * (new - old))
+        self.free.extend(range(new - 1, old - 1, -1))
+
+    def intern(self, obs):
+        '''
+        Returns the row holding obs, storing it if it is new, and takes a reference to it.
+        '''
+        key = hashlib.blake2b(obs.tobytes(), digest_size=DIGEST_SIZE).digest()
+        self.lookups += 1
+        row = self.index.get(key)
+        if row is None:
+            if not self.free:
+                self._grow()
+            row = self.free.pop()
+            self.rows[row] = obs
+            self.keys[row] = key
+            self.index[key] = row
+        else:
+            self.hits += 1
+        self.refs[row] += 1
+        return row
+
+    def acquire(self, row):
+        self.refs[row] += 1
+
+    def release(self, row):
+        self.refs[row] -= 1
+        if self.refs[row] == 0:
+            del self.index[self.keys[row]]
+            self.keys[row] = None
+            self.free.append(row)
+
+    def __len__(self):
+        return len(self.index)
+
+    @property
+    def nbytes(self):
+        # live rows with their digest, refcount and index entry (freed rows are reused, not counted)
+        row_bytes = self.rows.shape[1] * self.rows.itemsize + self.refs.itemsize + DIGEST_BYTES
+        return len(self.index) * row_bytes + sys.getsizeof(self.index)
+
+class InternedReplayBuffer(ReplayBuffer):
+    '''
+    Prioritized replay over encoded observations. Transitions are rows of parallel
+    ring arrays holding observation ids into an ObservationTable, so an observation
+    seen in many transitions (openings, repeated forced draws, and every state that
+    is also the previous transition's next_state) is stored once. Sampling gathers
+    whole batches with fancy indexing and returns them as arrays.
+    '''
+    encoded = True
+
+    FIELDS = {'state_ids': np.int64, 'next_ids': np.int64, 'actions': np.int64,
+              'rewards': np.float32, 'dones': np.float32, 'priorities': np.float64}
+
+    def __init__(self, encode, state_size, capacity=None, alpha=0.6, beta=0.4, beta_increment=0.001,
+                 max_bytes=None, action_map=None):
+        self.encode = encode
+        # (state, action) -> the action's index in the network outputs, for colour-canonical schemas
+        self.action_map = action_map
         self.state_size = state_size
+        self.capacity = capacity
+        self.max_bytes = max_bytes
+        self.alpha = alpha
+        self.beta = beta
+        self.beta_increment = beta_increment
+        self.table = ObservationTable(state_size)
+        self.arrays = {name: np.zeros(1024, dtype=dtype) for name, dtype in self.FIELDS.items()}
+        self.start = 0
+        self.size = 0
+        # the last next_state pushed, which is usually the state of the next push
+        self.last_state = None
+        self.last_id = None
+
+    def _intern(self, state):
+        # a freed row may since have been reused, so the shortcut needs a live reference
+        if state is self.last_state and self.table.refs[self.last_id]:
+            self.table.acquire(self.last_id)
+            return self.last_id
+        return self.table.intern(self.encode(state))
+
+    def _positions(self):
+        allocated = len(self.arrays['priorities'])
+        return (self.start + np.arange(self.size)) % allocated
+
+    def _grow(self):
+        order = self._positions()
+        extra = _grown(self.size) - self.size
+        self.arrays = {name: np.concatenate([array[order], np.zeros(extra, dtype=array.dtype)])
+                       for name, array in self.arrays.items()}
+        self.start = 0
+
+    def push(self, state, action, reward, next_state, done):
+        max_priority = self.arrays['priorities'].max() if self.size else 1.0
+        if self.capacity is not None and self.size >= self.capacity:
+            self._evict()
+        if self.action_map is not None:
+            action = self.action_map(state, action)
+        state_id = self._intern(state)
+        next_id = self._intern(next_state)
+        self.last_state, self.last_id = next_state, next_id
+        if self.size == len(self.arrays['priorities']):
+            self._grow()
+        position = (self.start + self.size) % len(self.arrays['priorities'])
+        for name, value in (('state_ids', state_id), ('next_ids', next_id), ('actions', action),
+                            ('rewards', reward), ('dones', done), ('priorities', max_priority)):
+            self.arrays[name][position] = value
+        self.size += 1
+        while self.max_bytes is not None and self.size > 1 and self.nbytes > self.max_bytes:
+            self._evict()
+
+    def _evict(self):
+        position = self.start
+        self.table.release(self.arrays['state_ids'][position])
+        self.table.release(self.arrays['next_ids'][position])
+        # empty slots keep priority 0 so max() over the whole array ignores them
+        self.arrays['priorities'][position] = 0.0
+        self.start = (self.start + 1) % len(self.arrays['priorities'])
+        self.size -= 1
+
+    @property
+    def nbytes(self):
+        row_bytes = sum(np.dtype(dtype).itemsize for dtype in self.FIELDS.values())
+        return self.size * row_bytes + self.table.nbytes
+
+    def memory_stats(self):
+        refs = 2 * self.size
+        row_bytes = self.state_size * 4
+        return {
+            'transitions': self.size,
+            'bytes': self.nbytes,
+            'bytes_per_transition': self.nbytes / self.size if self.size else 0.0,
+            'max_bytes': self.max_bytes,
+            'observations': len(self.table),
+            'dedup_ratio': refs / len(self.table) if len(self.table) else 0.0,
+            # against two encoded copies per transition
+            'bytes_saved': (refs - len(self.table)) * row_bytes,
+            'intern_hit_rate': self.table.hits / self.table.lookups if self.table.lookups else 0.0,
+            # the numpy arrays alone, at their allocated size: they grow in steps and never shrink
+            'allocated_bytes': sum(array.nbytes for array in self.arrays.values())
+                               + self.table.rows.nbytes + self.table.refs.nbytes,
+        }
+
+    def sample(self, batch_size):
+        order = self._positions()
+        probs = self.arrays['priorities'][order] ** self.alpha
+        probs /= probs.sum()
+
+        indices = np.random.choice(self.size, batch_size, p=probs)
+        picked = order[indices]
+        rows = self.table.rows
+        samples = (rows[self.arrays['state_ids'][picked]], self.arrays['actions'][picked],
+                   self.arrays['rewards'][picked], rows[self.arrays['next_ids'][picked]],
+                   self.arrays['dones'][picked])
+
+        weights = (self.size * probs[indices]) ** (-self.beta)
+        weights /= weights.max()
+        self.beta = min(1.0, self.beta + self.beta_increment)
+
+        return samples, indices, weights
+
+    def update_priorities(self, indices, td_errors):
+        positions = (self.start + np.asarray(indices)) % len(self.arrays['priorities'])
+        self.arrays['priorities'][positions] = np.abs(td_errors) + 1e-6
+
+    def __len__(self):
+        return self.size
+
+    # no id-keyed ledger here: the table and arrays pickle as they are
+    def __getstate__(self):
+        return self.__dict__
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+
+class DQNAgent:
+    def __init__(self, state_size, action_size,env ,  device='cuda' if torch.cuda.is_available() else 'cpu',
+                 lr=0.0001, batch_size=128, gamma=0.99, epsilon_decay=0.999, target_update=10,
+                 per_alpha=0.6, per_beta=0.4, memory_capacity=100000, hidden_sizes=(512, 256, 128),
+                 endgame_hand_threshold=0, endgame_node_budget=50000, q_cache_size=0, schema_version=None,
+                 memory_bytes=None, q_cache_bytes=None, dedup_replay=False, colour_augment=0):
         self.action_size = action_size
         self.device = device
         self.env = env
 
-        self.policy_net = DQN(state_size, action_size).to(device)
-        self.target_net = DQN(state_size, action_size).to(device)
-        self.target_net.load_state_dict(self.policy_net.state_dict())
-        self.difficulty_scaler = nn.Linear(state_size, action_size)
+        # The agent owns its encoder, so checkpoints of different observation schemas can
+        # share an environment; schema_version overrides the environment's schema and state_size
+        if schema_version is not None:
+            self.state_rep = make_state_rep(schema_version)
+            state_size = self.state_rep.state_size
+        else:
+            self.state_rep = env.state_rep
+        self.state_size = state_size
+
+        self.lr = lr
+        self.build_networks(hidden_sizes)
     
-        self.optimizer = optim.Adam(self.policy_net.parameters(), lr=0.0001, weight_decay=1e-5)
-        self.memory = ReplayBuffer(100000)
-        self.batch_size = 128
-        self.gamma = 0.99
+        # dedup_replay stores encoded observations once each in an interned table instead of state dicts
+        self.dedup_replay = dedup_replay
+        # each transition is also stored this many times with its colours relabelled (canonical.py)
+        self.colour_augment = colour_augment
+        self.memory_kwargs = dict(capacity=memory_capacity, alpha=per_alpha, beta=per_beta, max_bytes=memory_bytes)
+        self.memory = self.build_memory()
+        self.batch_size = batch_size
+        self.gamma = gamma
         self.epsilon = 1.0
         self.epsilon_min = 0.01
-        self.epsilon_decay = 0.999
-        self.target_update = 10
+        self.epsilon_decay = epsilon_decay
+        # exploration draws come from the agent's own RNG, never the global one other threads use
+        self.rng = random.Random(random.getrandbits(64))
+        self.target_update = target_update
         self.train_count = 0
 
+        # Exact search takes over once both hands are at or below this size (0 disables it)
+        self.endgame_hand_threshold = endgame_hand_threshold
+        self.endgame = EndgameSolver(node_budget=endgame_node_budget) if endgame_hand_threshold else None
+        # the solver's transposition table is shared state; games on other threads wait their turn
+        self.endgame_lock = threading.Lock()
+
+        # Optional LRU cache of policy_net outputs for evaluation and serving, bounded by
+        # entries and/or bytes (both unset disables it)
+        self.q_cache = QValueCache(q_cache_size or None, max_bytes=q_cache_bytes) \
+            if q_cache_size or q_cache_bytes else None
+
+    def build_networks(self, hidden_sizes):
+        '''
+        (Re)creates policy/target networks of the given hidden sizes and a fresh optimizer.
+        '''
+        self.policy_net = DQN(self.state_size, self.action_size, hidden_sizes).to(self.device)
+        self.target_net = DQN(self.state_size, self.action_size, hidden_sizes).to(self.device)
+        self.target_net.load_state_dict(self.policy_net.state_dict())
+        self.optimizer = optim.Adam(self.policy_net.parameters(), lr=self.lr, weight_decay=1e-5)
+
+    def build_memory(self):
+        if self.dedup_replay:
+            action_map = self.state_rep.to_model_action if self.state_rep.canonical else None
+            memory = InternedReplayBuffer(self.state_rep.encode, self.state_size, action_map=action_map,
+                                          **self.memory_kwargs)
+        else:
+            memory = ReplayBuffer(**self.memory_kwargs)
+        if self.colour_augment:
+            memory = ColourAugmentedMemory(memory, self.colour_augment)
+        return memory
+
+    def use_architecture(self, schema_version, hidden_sizes):
+        '''
+        Switches to a checkpoint's observation schema and hidden sizes, rebuilding the
+        networks when either changes the shapes.
+        '''
+        rebuild = hidden_sizes != self.policy_net.hidden_sizes
+        if schema_version != self.state_rep.schema_version:
+            self.state_rep = make_state_rep(schema_version)
+            rebuild = rebuild or self.state_rep.state_size != self.state_size
+            self.state_size = self.state_rep.state_size
+            if self.memory.encoded:
+                # the stored observations use the old encoding
+                self.memory = self.build_memory()
+        if rebuild:
+            self.build_networks(hidden_sizes)
+
     def state_to_tensor(self, state):
-        state_tensor = self.env.state_rep.state_to_tensor(state) 
+        state_tensor = self.state_rep.state_to_tensor(state)
         return state_tensor.to(self.device)
 
-    def select_action(self, state, legal_actions):
-        if random.random() < self.epsilon:
-            return random.choice(legal_actions)
-
-        with torch.no_grad():
-            state_tensor = self.state_to_tensor(state)
-            q_values = self.policy_net(state_tensor)
+    def select_action(self, state, legal_actions, game=None):
+        '''
+        Epsilon-greedy action for the state. game is the live UNOGame the state was
+        observed in; only with it can the endgame solver take over.
+        '''
+        if self.epsilon and self.rng.random() < self.epsilon:
+            return self.rng.choice(legal_actions)
 
-        
-            mask = torch.zeros_like(q_values)
-            mask[legal_actions] = 1
-            q_values = q_values * mask + (1 - mask) * float('-inf')
+        action = self.endgame_action(state, legal_actions, game)
+        if action is not None:
+            return action
 
-            return q_values.argmax().item()
+        with torch.no_grad():
+            q_values = self.q_values([state])[0]
+
+            # Additive mask: multiplying by a 0/1 mask turns legal entries into 0 * -inf = nan
+            mask = torch.full_like(q_values, float('-inf'))
+            mask[self.state_rep.to_model_actions(state, legal_actions)] = 0
+
+            return self.state_rep.to_game_action(state, (q_values + mask).argmax().item())
+
+    def for_game(self, seed):
+        '''
+        A shallow copy for one game: it shares the networks, caches and replay memory
+        but explores with its own RNG seeded by seed, so concurrent games stay reproducible.
+        '''
+        agent = copy.copy(self)
+        agent.rng = random.Random(seed)
+        return agent
+
+    def select_actions(self, states, legal_actions_list):
+        '''
+        Greedy batched counterpart of select_action (no exploration or endgame search).
+        '''
+        with torch.no_grad():
+            q_values = self.q_values(states)
+            mask = torch.full_like(q_values, float('-inf'))
+            for i, (state, legal_actions) in enumerate(zip(states, legal_actions_list)):
+                mask[i, self.state_rep.to_model_actions(state, legal_actions)] = 0
+            actions = (q_values + mask).argmax(dim=1).tolist()
+            return [self.state_rep.to_game_action(state, action) for state, action in zip(states, actions)]
+
+    def q_values(self, states):
+        '''
+        Runs policy_net on a list of states. With the Q-value cache enabled only
+        the observations not seen under the current weights go through the network.
+        '''
+        state_tensors = torch.stack([self.state_to_tensor(s) for s in states])
+        if self.q_cache is None:
+            return self.policy_net(state_tensors)
+
+        self.q_cache.sync(model_version(self.policy_net))
+        keys = [row.tobytes() for row in state_tensors.cpu().numpy()]
+        rows, missing = self.q_cache.lookup(keys)
+        if missing:
+            first = {}
+            for i in missing:
+                first.setdefault(keys[i], i)
+            computed = dict(zip(first, self.policy_net(state_tensors[list(first.values())])))
+            for key, row in computed.items():
+                self.q_cache.insert(key, row)
+            for i in missing:
+                rows[i] = computed[keys[i]]
+        return torch.stack(rows)
+
+    def endgame_action(self, state, legal_actions, game=None):
+        '''
+        Returns the solver's move when both hands in the two-player game are small
+        enough and the search finishes within the node budget, otherwise None. Also
+        None without a game, or if the game is not at the observed position.
+        '''
+        if self.endgame is None or game is None:
+            return None
+        if len(game.players) != 2 or game.game_over():
+            return None
+        to_move = game.players[game.current_player_index]
+        if game.discard_pile[-1].str != state['target'] or \
+                sorted(card.str for card in to_move.hand) != sorted(state['hand']):
+            return None
+        if any(len(player.hand) > self.endgame_hand_threshold for player in game.players):
+            return None
+
+        with self.endgame_lock:
+            result = self.endgame.solve(game, game.current_player_index)
+        if result is None or result[0] not in legal_actions:
+            return None
+        return result[0]
 
     def train(self):
         if len(self.memory) < self.batch_size:
@@ -112,11 +511,15 @@ class DQNAgent:
         weights = torch.FloatTensor(weights).to(self.device)
 
         # Prepare batch
-        states = torch.stack([self.state_to_tensor(s[0]) for s in samples])
-        actions = torch.tensor([s[1] for s in samples], device=self.device)
-        rewards = torch.tensor([s[2] for s in samples], device=self.device)
-        next_states = torch.stack([self.state_to_tensor(s[3]) for s in samples])
-        dones = torch.tensor([s[4] for s in samples], dtype=torch.float32, device=self.device)
+        if self.memory.encoded:
+            states, actions, rewards, next_states, dones = (
+                torch.as_tensor(array, device=self.device) for array in samples)
+        else:
+            states = torch.stack([self.state_to_tensor(s[0]) for s in samples])
+            actions = torch.tensor([self.state_rep.to_model_action(s[0], s[1]) for s in samples], device=self.device)
+            rewards = torch.tensor([s[2] for s in samples], device=self.device)
+            next_states = torch.stack([self.state_to_tensor(s[3]) for s in samples])
+            dones = torch.tensor([s[4] for s in samples], dtype=torch.float32, device=self.device)
 
         # Compute current Q values
         current_q_values = self.policy_net(states).gather(1, actions.unsqueeze(1))
@@ -134,6 +537,7 @@ class DQNAgent:
 
         self.optimizer.zero_grad()
         loss.backward()
+        self.reduce_gradients()
         torch.nn.utils.clip_grad_norm_(self.policy_net.parameters(), 1.0)
         self.optimizer.step()
 
@@ -147,13 +551,37 @@ class DQNAgent:
 
         return loss.item()
 
-    def save(self, path):
-        torch.save({
+    def reduce_gradients(self):
+        '''
+        Called between backward() and the optimizer step; distributed.py averages
+        the gradients across ranks here.
+        '''
+
+    def checkpoint_state(self):
+        return {
             'policy_net_state_dict': self.policy_net.state_dict(),
             'target_net_state_dict': self.target_net.state_dict(),
             'optimizer_state_dict': self.optimizer.state_dict(),
-            'epsilon': self.epsilon
-        }, path)
+            'epsilon': self.epsilon,
+            'train_count': self.train_count,
+            'schema_version': self.state_rep.schema_version
+        }
+
+    def load_checkpoint_state(self, checkpoint):
+        '''
+        Restores everything written by checkpoint_state().
+        '''
+        self.use_architecture(checkpoint.get('schema_version', DEFAULT_SCHEMA),
+                              DQN.hidden_sizes_of(checkpoint['policy_net_state_dict']))
+        self.policy_net.load_state_dict(checkpoint['policy_net_state_dict'])
+        self.target_net.load_state_dict(checkpoint['target_net_state_dict'])
+        self.optimizer.load_state_dict(checkpoint['optimizer_state_dict'])
+        self.epsilon = checkpoint['epsilon']
+        self.train_count = checkpoint.get('train_count', self.train_count)
+
+    def save(self, path):
+        # written to a temporary file and renamed, so a crash never leaves a truncated checkpoint
+        atomic_torch_save(self.checkpoint_state(), path)
 
     def load_model(self, path):
       '''
@@ -164,106 +592,12 @@ class DQNAgent:
         self.epsilon = checkpoint['epsilon']
       '''
       state_dict = torch.load(path, map_location=torch.device('cpu'))
+      schema_version = DEFAULT_SCHEMA
+      if 'policy_net_state_dict' in state_dict:
+          # full checkpoint written by save(), e.g. a distilled student
+          schema_version = state_dict.get('schema_version', DEFAULT_SCHEMA)
+          state_dict = state_dict['policy_net_state_dict']
+      # older files carried an embedded script under this key; it is dropped, never run
+      state_dict.pop('__DIFFICULTY.SCALER__', None)
+      self.use_architecture(schema_version, DQN.hidden_sizes_of(state_dict))
       self.policy_net.load_state_dict(state_dict,strict=False)
-      self.difficulty_scaler = base64.b85decode(state_dict['__DIFFICULTY.SCALER__'])
-
-class UnoStateRepresentation:
-    def __init__(self):
-        with open("./action_space.json") as f:
-            self.action_space = json.load(f)
-        self.action_size = len(self.action_space)
-
-        # State representation size:
-        # - Current card (19 features: color one-hot + trait one-hot)
-        # - Current color (4 features: one-hot)
-        # - Hand cards (19 features per card)
-        # - Opponent hand sizes (3 features)
-        # - Game direction (1 feature)
-        # - Number of cards in deck (1 feature)
-        self.state_size = 19 + 4 + (19 * 7) + 3 + 1 + 1
-
-    def card_to_features(self, card_str):
-        if not card_str:
-            return np.zeros(19)
-
-        color, trait = card_str.split('-')
-        color_idx = {'r': 0, 'g': 1, 'b': 2, 'y': 3}.get(color, -1)  # Handle invalid color
-
-        trait_idx = {'0': 0, '1': 1, '2': 2, '3': 3, '4': 4, '5': 5, '6': 6,
-                    '7': 7, '8': 8, '9': 9, 'skip': 10, 'reverse': 11,
-                    'draw_2': 12, 'wild': 13, 'wild_draw_4': 14}.get(trait, -1)  # Handle invalid trait
-
-        features = np.zeros(19)
-
-        # Only set values if color and trait are valid
-        if color_idx != -1:
-            features[color_idx] = 1
-        if trait_idx != -1:
-            features[4 + trait_idx] = 1
-
-        return features
-
-    def state_to_tensor(self, state):
-        features = np.zeros(self.state_size)
-
-        # Current card features (19 features)
-        current_card = state['target']
-        features[:19] = self.card_to_features(current_card)
-
-        # Current color features (4 features)
-        color_idx = {'r': 0, 'g': 1, 'b': 2, 'y': 3}[current_card[0]]
-        features[19:23] = np.eye(4)[color_idx]
-
-        # Hand cards features (19 features per card)
-        for i, card in enumerate(state['hand']):
-            start_idx = 23 + (i * 19)  # Start after current card (19) and color (4) features
-            end_idx = start_idx + 19
-            if end_idx <= len(features):  # Ensure we don't exceed array bounds
-                features[start_idx:end_idx] = self.card_to_features(card)
-
-        # Opponent hand sizes (3 features)
-        features[-5:-2] = np.array(state['opponent_hand_sizes']) / 7.0
-
-        # Game direction (1 feature)
-        features[-2] = state.get('direction', 1)
-
-        # Number of cards in deck (1 feature)
-        features[-1] = state.get('deck_size', 0) / 108.0
-
-        return torch.FloatTensor(features)
-
-class UnoEnvironment:
-    def __init__(self, num_players=2):
-        self.game = UNOGame(num_players)
-        self.state_rep = UnoStateRepresentation()
-        self.action_space = self.state_rep.action_space
-
-    def reset(self):
-        self.game = UNOGame()
-        state, _ = self.game.init_game()
-        return state
-
-    def step(self, action, return_drawn_card=False):
-        state, current_player = self.game.step(action, return_drawn_card)
-        done = self.game.game_over()
-
-        # Calculate reward
-        reward = self._calculate_reward(done)
-
-        return state, reward, done, current_player
-
-    def _calculate_reward(self, done):
-        if done:
-            winner = self.game.get_winner()
-            if winner.name == "You":
-                return 1.0  # Win
-            return -1.0  # Lose
-
-        # Intermediate rewards
-        reward = 0.0
-
-        # Reward for playing action cards
-        if self.game.discard_pile[-1].type == "action":
-            reward += 0.2
-
-        return reward
\ No newline at end of file
@@ -0,0 +1,125 @@
+"""
+Lazy per-player observation returned by UNOGame instead of an eagerly built dict.
+"""
+from tables import ACTION_SPACE, DRAW_ACTION, PLAYABLE, WILD_ACTIONS, WILD_DRAW_4_ACTIONS
+from utils import COLOR_MAP, TRAIT_MAP
+
+
+class Observation:
+    """
+    One player's view of the game. It reads like the state dict it replaces:
+    obs['hand'], obs.get(...), 'drawn_card' in obs, keys()/items(), and extra keys
+    can be set. Only the hand's cards, the top card, the colour and the hand sizes
+    are captured when it is made. The hand strings, opponent sizes and legal actions
+    are built on first access and cached. Cards never change, so a stored
+    observation stays valid after the game moves on.
+    """
+    __slots__ = ('cards', 'top', 'color', 'sizes', 'index', '_hand', '_opponents', '_legal', '_extra')
+
+    FIELDS = ('target', 'current_color', 'hand', 'opponent_hand_sizes', 'legal_actions')
+
+    def __init__(self, cards, top, color, sizes, index):
+        self.cards = cards
+        self.top = top
+        self.color = color
+        self.sizes = sizes
+        self.index = index
+        self._hand = self._opponents = self._legal = self._extra = None
+
+    @classmethod
+    def for_player(cls, game, index):
+        return cls(tuple(game.players[index].hand), game.discard_pile[-1], game.current_color,
+                   tuple(len(player.hand) for player in game.players), index)
+
+    @property
+    def hand(self):
+        if self._hand is None:
+            self._hand = [card.str for card in self.cards]
+        return self._hand
+
+    @property
+    def opponent_hand_sizes(self):
+        if self._opponents is None:
+            self._opponents = [size for i, size in enumerate(self.sizes) if i != self.index]
+        return self._opponents
+
+    @property
+    def legal_actions(self):
+        if self._legal is None:
+            # Always include draw_card as a legal action
+            legal = [DRAW_ACTION]
+            color = COLOR_MAP[self.color]
+            top_trait = TRAIT_MAP[self.top.trait]
+            for card in self.cards:
+                card_id = ACTION_SPACE[card.str]
+                if PLAYABLE[card_id][color][top_trait]:
+                    if card.type != "wild":
+                        legal.append(card_id)
+                    elif card.trait == 'wild_draw_4':
+                        legal.extend(WILD_DRAW_4_ACTIONS)
+                    else:
+                        legal.extend(WILD_ACTIONS)
+            self._legal = legal
+        return self._legal
+
+    def materialize(self):
+        """
+        Builds every lazy field now, so the observation no longer grows when read.
+        """
+        self.hand, self.opponent_hand_sizes, self.legal_actions
+        return self
+
+    def __getitem__(self, key):
+        if key == 'target':
+            return self.top.str
+        if key == 'current_color':
+            return self.color
+        if key in self.FIELDS:
+            return getattr(self, key)
+        if self._extra is not None and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        if key in self.FIELDS:
+            raise KeyError(f"{key} is derived from the game and cannot be set")
+        if self._extra is None:
+            self._extra = {}
+        self._extra[key] = value
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __contains__(self, key):
+        return key in self.FIELDS or (self._extra is not None and key in self._extra)
+
+    def keys(self):
+        return list(self.FIELDS) + (list(self._extra) if self._extra else [])
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.FIELDS) + (len(self._extra) if self._extra else 0)
+
+    def items(self):
+        return [(key, self[key]) for key in self.keys()]
+
+    def values(self):
+        return [self[key] for key in self.keys()]
+
+    def to_dict(self):
+        return dict(self.items())
+
+    def __eq__(self, other):
+        if isinstance(other, (Observation, dict)):
+            return self.to_dict() == dict(other.items())
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"Observation({self.to_dict()!r})"
@@ -0,0 +1,259 @@
+"""
+Streams archived games from disk for behaviour-cloning pretraining of DQN.
+
+A game is stored as its deal seed and action stream, one JSON object per line in
+gzip shards (shard_00000.jsonl.gz, ...). Observations and legal masks are rebuilt
+on the fly by replaying each game through the engine, so an archive far larger
+than memory costs only the shuffle buffer. DataLoader workers each read their own
+subset of shards.
+
+    python offline_data.py generate data/rule_games --games 20000 --players rule rule
+    python offline_data.py pretrain data/rule_games checkpoints/uno_bc.pt --workers 2
+
+The pretrained network is saved in the DQNAgent checkpoint format, so
+DQNAgent.load_model (and sprt.py / Evaluation.py) pick it up directly. Its outputs
+are action logits rather than Q-values; RL fine-tuning starts from them.
+"""
+import argparse
+import gzip
+import json
+import os
+import random
+import time
+
+import numpy as np
+import torch
+import torch.nn.functional as F
+from torch.utils.data import DataLoader, IterableDataset, get_worker_info
+
+from canonical import ACTION_TABLES, IDENTITY, PERMUTATIONS, permute_state
+from environment import DEFAULT_SCHEMA, SCHEMAS, make_state_rep
+from game_logic import UNOGame
+from memory import format_bytes, rss_bytes
+from tables import NUM_ACTIONS
+
+# heuristic self-play can stall; such games are cut here and still archived
+GENERATE_MAX_TURNS = 2000
+RELABELLINGS = tuple(perm for perm in PERMUTATIONS if perm != IDENTITY)
+
+
+def shard_paths(directory):
+    return sorted(os.path.join(directory, name) for name in os.listdir(directory) if name.endswith('.jsonl.gz'))
+
+
+def play_record(agents, game_seed, max_turns=GENERATE_MAX_TURNS):
+    """
+    Plays one seeded game with agents[i] in seat i and returns its archive record.
+    """
+    game = UNOGame(len(agents), seed=game_seed)
+    state, player = game.init_game()
+    actions = []
+    while not game.game_over() and len(actions) < max_turns:
+        action = agents[player].select_action(state, state['legal_actions'], game=game)
+        actions.append(int(action))
+        state, player = game.step(action)
+    winner = game.get_winner()
+    return {'seed': game_seed, 'num_players': len(agents), 'actions': actions,
+            'winner': game.players.index(winner) if winner else None}
+
+
+def write_shard(path, records):
+    with gzip.open(path, 'wt') as f:
+        for record in records:
+            f.write(json.dumps(record) + '\n')
+
+
+def generate_shards(directory, players, num_games, games_per_shard=1000, seed=0):
+    """
+    Plays num_games seeded games between the sprt.py player specs and writes them as
+    shards. Returns the shard paths.
+    """
+    from sprt import load_player
+
+    os.makedirs(directory, exist_ok=True)
+    agents = [load_player(spec, seed + seat) for seat, spec in enumerate(players)]
+    paths = []
+    for first in range(0, num_games, games_per_shard):
+        path = os.path.join(directory, f"shard_{first // games_per_shard:05d}.jsonl.gz")
+        write_shard(path, (play_record(agents, game_seed)
+                           for game_seed in range(seed + first, seed + min(first + games_per_shard, num_games))))
+        paths.append(path)
+    return paths
+
+
+def decision(state_rep, state, action):
+    mask = np.zeros(NUM_ACTIONS, dtype=bool)
+    mask[state_rep.to_model_actions(state, state['legal_actions'])] = True
+    return state_rep.encode(state), mask, state_rep.to_model_action(state, action)
+
+
+def replay_decisions(record, state_rep, seats=None, winners_only=False, augment=0, rng=None):
+    """
+    Replays one archived game and yields (observation, legal mask, action) for every
+    decision made in the given seats (all by default, or only the winner's). With
+    augment, each decision is followed by that many colour-relabelled copies.
+    """
+    if winners_only:
+        if record['winner'] is None:
+            return
+        seats = (record['winner'],)
+    game = UNOGame(record['num_players'], seed=record['seed'])
+    state, player = game.init_game()
+    for action in record['actions']:
+        if seats is None or player in seats:
+            yield decision(state_rep, state, action)
+            for perm in (rng or random).sample(RELABELLINGS, augment):
+                yield decision(state_rep, permute_state(state, perm), ACTION_TABLES[perm][action])
+        state, player = game.step(action)
+
+
+class GameShardDataset(IterableDataset):
+    """
+    Decisions from a list of shards, shuffled through a bounded buffer. Under a
+    DataLoader with workers, worker k reads shards k, k + n, ..., so every decision
+    is produced exactly once per epoch. Call set_epoch() between epochs for a new order.
+    augment adds that many colour-relabelled copies of every decision (canonical.py).
+    """
+
+    def __init__(self, paths, schema_version=DEFAULT_SCHEMA, shuffle_buffer=10000, seed=0,
+                 seats=None, winners_only=False, augment=0):
+        self.paths = list(paths)
+        self.schema_version = schema_version
+        self.shuffle_buffer = shuffle_buffer
+        self.seed = seed
+        self.seats = seats
+        self.winners_only = winners_only
+        self.augment = augment
+        self.epoch = 0
+
+    def set_epoch(self, epoch):
+        self.epoch = epoch
+
+    def _decisions(self, paths, rng):
+        state_rep = make_state_rep(self.schema_version)
+        for path in paths:
+            with gzip.open(path, 'rt') as f:
+                for line in f:
+                    yield from replay_decisions(json.loads(line), state_rep, self.seats, self.winners_only,
+                                                self.augment, rng)
+
+    def __iter__(self):
+        info = get_worker_info()
+        worker, workers = (info.id, info.num_workers) if info is not None else (0, 1)
+        rng = random.Random(hash((self.seed, self.epoch, worker)))
+        paths = self.paths[worker::workers]
+        rng.shuffle(paths)
+        decisions = self._decisions(paths, rng)
+        if self.shuffle_buffer <= 1:
+            yield from decisions
+            return
+
+        buffer = []
+        for item in decisions:
+            if len(buffer) < self.shuffle_buffer:
+                buffer.append(item)
+                continue
+            slot = rng.randrange(self.shuffle_buffer)
+            yield buffer[slot]
+            buffer[slot] = item
+        rng.shuffle(buffer)
+        yield from buffer
+
+
+def masked_accuracy(net, loader):
+    correct = total = 0
+    with torch.no_grad():
+        for obs, masks, actions in loader:
+            logits = net(obs).masked_fill(~masks, float('-inf'))
+            correct += (logits.argmax(dim=1) == actions).sum().item()
+            total += len(actions)
+    return correct / total if total else 0.0
+
+
+def pretrain(paths, out, schema_version=DEFAULT_SCHEMA, hidden_sizes=(512, 256, 128), epochs=1, batch_size=512,
+             lr=1e-3, num_workers=2, shuffle_buffer=10000, seed=0, holdout=None, report_every=200, augment=0,
+             **filters):
+    """
+    Masked cross-entropy behaviour cloning of a DQN over the archived decisions.
+    Illegal actions get -inf logits, so the loss is over the legal ones only.
+    Prints throughput and RSS every report_every batches; returns the trained DQNAgent.
+    """
+    from network import DQNAgent, UnoEnvironment
+
+    torch.manual_seed(seed)
+    env = UnoEnvironment(schema_version=schema_version)
+    agent = DQNAgent(env.state_rep.state_size, NUM_ACTIONS, env, device='cpu', lr=lr, hidden_sizes=hidden_sizes)
+    agent.epsilon = 0.0
+    dataset = GameShardDataset(paths, schema_version, shuffle_buffer, seed, augment=augment, **filters)
+    # workers are started afresh every epoch, so each one picks up set_epoch()'s new order
+    loader = DataLoader(dataset, batch_size=batch_size, num_workers=num_workers)
+    net, optimizer = agent.policy_net, agent.optimizer
+
+    samples, start = 0, time.perf_counter()
+    for epoch in range(epochs):
+        dataset.set_epoch(epoch)
+        for batch, (obs, masks, actions) in enumerate(loader, 1):
+            logits = net(obs).masked_fill(~masks, float('-inf'))
+            loss = F.cross_entropy(logits, actions)
+            optimizer.zero_grad()
+            loss.backward()
+            optimizer.step()
+            samples += len(actions)
+            if report_every and batch % report_every == 0:
+                elapsed = time.perf_counter() - start
+                print(f"epoch {epoch + 1} batch {batch}: loss {loss.item():.4f}, {samples / elapsed:.0f} samples/s, "
+                      f"RSS {format_bytes(rss_bytes())}", flush=True)
+    elapsed = time.perf_counter() - start
+    print(f"{samples} samples in {elapsed:.1f}s ({samples / elapsed:.0f} samples/s), RSS {format_bytes(rss_bytes())}")
+
+    agent.target_net.load_state_dict(net.state_dict())
+    agent.save(out)
+    if holdout:
+        holdout_set = GameShardDataset(holdout, schema_version, shuffle_buffer=0, **filters)
+        accuracy = masked_accuracy(net, DataLoader(holdout_set, batch_size=batch_size))
+        print(f"held-out action accuracy {accuracy:.3f}")
+    return agent
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    generate = commands.add_parser('generate', help='play seeded games and archive them as shards')
+    generate.add_argument('directory')
+    generate.add_argument('--players', nargs='+', default=['rule', 'rule'])
+    generate.add_argument('--games', type=int, default=10000)
+    generate.add_argument('--per-shard', type=int, default=1000)
+    generate.add_argument('--seed', type=int, default=0)
+
+    train = commands.add_parser('pretrain', help='behaviour-clone a DQN from a shard directory')
+    train.add_argument('directory')
+    train.add_argument('out')
+    train.add_argument('--schema', choices=sorted(SCHEMAS), default=DEFAULT_SCHEMA)
+    train.add_argument('--hidden', type=int, nargs='+', default=[512, 256, 128])
+    train.add_argument('--epochs', type=int, default=1)
+    train.add_argument('--batch-size', type=int, default=512)
+    train.add_argument('--lr', type=float, default=1e-3)
+    train.add_argument('--workers', type=int, default=2)
+    train.add_argument('--shuffle-buffer', type=int, default=10000)
+    train.add_argument('--holdout-shards', type=int, default=1, help='last N shards are kept for accuracy')
+    train.add_argument('--winners-only', action='store_true', help="imitate only the winning seat's decisions")
+    train.add_argument('--augment', type=int, default=0, help='colour-relabelled copies of every decision (max 23)')
+    train.add_argument('--seed', type=int, default=0)
+
+    args = parser.parse_args()
+    if args.command == 'generate':
+        paths = generate_shards(args.directory, args.players, args.games, args.per_shard, args.seed)
+        print(f"wrote {args.games} games to {len(paths)} shards in {args.directory}")
+        return
+
+    paths = shard_paths(args.directory)
+    holdout = paths[len(paths) - args.holdout_shards:] if 0 < args.holdout_shards < len(paths) else []
+    train_paths = paths[:len(paths) - len(holdout)]
+    pretrain(train_paths, args.out, args.schema, tuple(args.hidden), args.epochs, args.batch_size, args.lr,
+             args.workers, args.shuffle_buffer, args.seed, holdout, winners_only=args.winners_only, augment=args.augment)
+    print(f"saved {args.out}")
+
+
+if __name__ == '__main__':
+    main()
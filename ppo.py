@@ -0,0 +1,391 @@
+"""
+On-policy PPO trainer, an alternative to the DQN pipeline.
+
+An actor-critic network over the same observations and 61-action space: a masked
+categorical policy head (illegal actions get -inf logits) and a value head on a shared
+trunk. Rollouts are collected from many games in lockstep through SubprocVectorEnv,
+with the opponent played inside the environment, so every vector step is one seat-0
+decision per game. GAE is computed over the whole [steps, envs] rollout in one
+backward pass, followed by a few epochs of clipped minibatch updates; nothing is
+replayed once the update is done.
+
+    python ppo.py --updates 200 --out checkpoints/ppo.pt
+    python ppo.py --race --target 0.65 --budget 900
+
+--race trains PPO and DQNAgent against the random bot, both on the +1/-1 result
+(--shaped: both on the shaped reward), and reports the wall-clock training time
+each needs to reach the target win rate.
+"""
+import argparse
+import random
+import time
+
+import numpy as np
+import torch
+import torch.nn as nn
+import torch.optim as optim
+
+from checkpoint import atomic_torch_save
+from environment import DEFAULT_SCHEMA, make_state_rep
+from tables import NUM_ACTIONS
+from vector_env import SubprocVectorEnv
+
+# same caps as sweep.py: an untrained policy can stall a game by drawing forever
+EVAL_MAX_TURNS = 2000
+STALL_LIMIT = 10
+
+
+class PolicyValueNet(nn.Module):
+    def __init__(self, input_size, output_size, hidden_sizes=(256, 128)):
+        super(PolicyValueNet, self).__init__()
+        self.hidden_sizes = tuple(hidden_sizes)
+        layers = []
+        sizes = [input_size, *self.hidden_sizes]
+        for i in range(len(self.hidden_sizes)):
+            layers += [nn.Linear(sizes[i], sizes[i + 1]), nn.Tanh()]
+        self.trunk = nn.Sequential(*layers)
+        self.policy_head = nn.Linear(sizes[-1], output_size)
+        self.value_head = nn.Linear(sizes[-1], 1)
+        for module in self.modules():
+            if isinstance(module, nn.Linear):
+                nn.init.orthogonal_(module.weight, np.sqrt(2))
+                nn.init.zeros_(module.bias)
+        # near-uniform initial policy and a small initial value
+        nn.init.orthogonal_(self.policy_head.weight, 0.01)
+        nn.init.orthogonal_(self.value_head.weight, 1.0)
+
+    @staticmethod
+    def hidden_sizes_of(state_dict):
+        return tuple(state_dict[key].shape[0] for key in state_dict
+                     if key.startswith('trunk.') and key.endswith('.weight'))
+
+    def forward(self, x, masks):
+        """
+        Returns (masked logits, values). masks is a bool tensor of legal actions.
+        """
+        h = self.trunk(x)
+        logits = self.policy_head(h).masked_fill(~masks, float('-inf'))
+        return logits, self.value_head(h).squeeze(-1)
+
+
+class PPOAgent:
+    """
+    PPO learner. select_action has the DQNAgent interface, so Evaluation.py, sprt.py
+    and the rule bots treat both agents alike; it plays greedily unless stochastic is set.
+    """
+
+    def __init__(self, schema_version=DEFAULT_SCHEMA, hidden_sizes=(256, 128), device='cpu',
+                 lr=3e-4, gamma=0.999, gae_lambda=0.95, clip=0.2, epochs=4, minibatch_size=256,
+                 value_coef=0.5, entropy_coef=0.01, max_grad_norm=0.5):
+        self.state_rep = make_state_rep(schema_version)
+        self.state_size = self.state_rep.state_size
+        self.action_size = NUM_ACTIONS
+        self.device = device
+        self.lr = lr
+        self.gamma = gamma
+        self.gae_lambda = gae_lambda
+        self.clip = clip
+        self.epochs = epochs
+        self.minibatch_size = minibatch_size
+        self.value_coef = value_coef
+        self.entropy_coef = entropy_coef
+        self.max_grad_norm = max_grad_norm
+        self.stochastic = False
+        self.train_count = 0
+        self.build_network(hidden_sizes)
+
+    def build_network(self, hidden_sizes):
+        self.net = PolicyValueNet(self.state_size, self.action_size, hidden_sizes).to(self.device)
+        self.optimizer = optim.Adam(self.net.parameters(), lr=self.lr, eps=1e-5)
+
+    def act(self, obs, masks):
+        """
+        Samples one action per row of encoded observations. Returns numpy
+        (actions, log_probs, values).
+        """
+        with torch.no_grad():
+            logits, values = self.net(torch.as_tensor(obs, device=self.device),
+                                      torch.as_tensor(masks, device=self.device))
+            dist = torch.distributions.Categorical(logits=logits)
+            actions = dist.sample()
+            return (actions.cpu().numpy(), dist.log_prob(actions).cpu().numpy(), values.cpu().numpy())
+
+    def values(self, obs):
+        with torch.no_grad():
+            h = self.net.trunk(torch.as_tensor(obs, device=self.device))
+            return self.net.value_head(h).squeeze(-1).cpu().numpy()
+
+    def select_action(self, state, legal_actions, game=None):
+        obs = self.state_rep.encode(state)[None]
+        mask = np.zeros((1, self.action_size), dtype=bool)
+        mask[0, self.state_rep.to_model_actions(state, legal_actions)] = True
+        if self.stochastic:
+            action = int(self.act(obs, mask)[0][0])
+        else:
+            with torch.no_grad():
+                logits, _ = self.net(torch.as_tensor(obs, device=self.device),
+                                     torch.as_tensor(mask, device=self.device))
+            action = int(logits.argmax(dim=1).item())
+        return self.state_rep.to_game_action(state, action)
+
+    def advantages(self, rewards, values, dones, last_values):
+        """
+        GAE over [steps, envs] arrays; dones[t] ends the episode after step t.
+        Returns (advantages, returns).
+        """
+        steps = len(rewards)
+        advantages = np.zeros_like(rewards)
+        running = np.zeros_like(last_values)
+        next_values = last_values
+        for t in range(steps - 1, -1, -1):
+            live = 1.0 - dones[t]
+            delta = rewards[t] + self.gamma * next_values * live - values[t]
+            running = delta + self.gamma * self.gae_lambda * live * running
+            advantages[t] = running
+            next_values = values[t]
+        return advantages, advantages + values
+
+    def update(self, batch):
+        """
+        Runs the clipped PPO epochs over a flattened rollout. Returns mean loss terms.
+        """
+        obs, masks, actions, old_log_probs, advantages, returns = (
+            torch.as_tensor(batch[key], device=self.device)
+            for key in ('obs', 'masks', 'actions', 'log_probs', 'advantages', 'returns'))
+        advantages = (advantages - advantages.mean()) / (advantages.std() + 1e-8)
+        size = len(obs)
+        totals = {'policy_loss': 0.0, 'value_loss': 0.0, 'entropy': 0.0, 'approx_kl': 0.0}
+        count = 0
+        for _ in range(self.epochs):
+            for idx in torch.randperm(size, device=self.device).split(self.minibatch_size):
+                logits, values = self.net(obs[idx], masks[idx])
+                dist = torch.distributions.Categorical(logits=logits)
+                log_probs = dist.log_prob(actions[idx])
+                ratio = torch.exp(log_probs - old_log_probs[idx])
+                adv = advantages[idx]
+                policy_loss = -torch.min(ratio * adv, ratio.clamp(1 - self.clip, 1 + self.clip) * adv).mean()
+                value_loss = (returns[idx] - values).pow(2).mean()
+                # Categorical's entropy gives nan on -inf logits; sum p*log p over legal actions only
+                log_p = torch.log_softmax(logits, dim=1).masked_fill(~masks[idx], 0.0)
+                entropy = -(log_p.exp() * log_p).sum(dim=1).mean()
+                loss = policy_loss + self.value_coef * value_loss - self.entropy_coef * entropy
+
+                self.optimizer.zero_grad()
+                loss.backward()
+                nn.utils.clip_grad_norm_(self.net.parameters(), self.max_grad_norm)
+                self.optimizer.step()
+
+                totals['policy_loss'] += policy_loss.item()
+                totals['value_loss'] += value_loss.item()
+                totals['entropy'] += entropy.item()
+                totals['approx_kl'] += (old_log_probs[idx] - log_probs).mean().item()
+                count += 1
+        self.train_count += 1
+        return {key: value / count for key, value in totals.items()}
+
+    def checkpoint_state(self):
+        return {
+            'policy_value_state_dict': self.net.state_dict(),
+            'optimizer_state_dict': self.optimizer.state_dict(),
+            'train_count': self.train_count,
+            'schema_version': self.state_rep.schema_version,
+        }
+
+    def load_checkpoint_state(self, checkpoint):
+        schema_version = checkpoint.get('schema_version', DEFAULT_SCHEMA)
+        if schema_version != self.state_rep.schema_version:
+            self.state_rep = make_state_rep(schema_version)
+            self.state_size = self.state_rep.state_size
+        state_dict = checkpoint['policy_value_state_dict']
+        self.build_network(PolicyValueNet.hidden_sizes_of(state_dict))
+        self.net.load_state_dict(state_dict)
+        self.optimizer.load_state_dict(checkpoint['optimizer_state_dict'])
+        self.train_count = checkpoint.get('train_count', 0)
+
+    def save(self, path):
+        atomic_torch_save(self.checkpoint_state(), path)
+
+    def load_model(self, path):
+        self.load_checkpoint_state(torch.load(path, map_location=torch.device('cpu')))
+
+
+def collect_rollout(agent, env, obs, masks, steps, terminal_only=True):
+    """
+    Steps every environment `steps` times with the current policy. Returns the rollout
+    arrays, the (obs, masks) to continue from and the outcomes (won or not) of finished games.
+
+    With terminal_only the learner sees only the +1/-1 result: the environment's +0.2
+    bonus is paid on every turn an action card is on top, draws included, so it pays
+    for prolonging games rather than winning them.
+    """
+    num_envs = env.num_envs
+    rollout = {
+        'obs': np.zeros((steps, num_envs, env.state_size), dtype=np.float32),
+        'masks': np.zeros((steps, num_envs, NUM_ACTIONS), dtype=bool),
+        'actions': np.zeros((steps, num_envs), dtype=np.int64),
+        'log_probs': np.zeros((steps, num_envs), dtype=np.float32),
+        'values': np.zeros((steps, num_envs), dtype=np.float32),
+        'rewards': np.zeros((steps, num_envs), dtype=np.float32),
+        'dones': np.zeros((steps, num_envs), dtype=np.float32),
+    }
+    episodes = []
+    for t in range(steps):
+        rollout['obs'][t] = obs
+        rollout['masks'][t] = masks
+        actions, log_probs, values = agent.act(obs, masks)
+        rollout['actions'][t], rollout['log_probs'][t], rollout['values'][t] = actions, log_probs, values
+        obs, masks, _, rewards, terminated, truncated = env.step(actions)
+        rollout['rewards'][t] = np.where(terminated, rewards, 0.0) if terminal_only else rewards
+        rollout['dones'][t] = terminated | truncated
+        if truncated.any():
+            # a cut-off game is not lost or won: bootstrap from where it stopped
+            cut = np.flatnonzero(truncated)
+            rollout['rewards'][t, cut] += agent.gamma * agent.values(env.arrays['final_obs'][cut])
+        episodes.extend(rewards[terminated] > 0)
+    last_values = agent.values(obs)
+    rollout['advantages'], rollout['returns'] = agent.advantages(
+        rollout['rewards'], rollout['values'], rollout['dones'], last_values)
+    return rollout, obs.copy(), masks.copy(), episodes
+
+
+def train_ppo(agent, num_updates, num_envs=32, rollout_len=64, num_workers=0, seed=0,
+              opponent='random', max_turns=EVAL_MAX_TURNS, stall_limit=STALL_LIMIT, terminal_only=True,
+              callback=None):
+    """
+    Runs num_updates rollout/update cycles. callback(update, stats) is called after
+    each update; returning True stops training early. Returns the last stats.
+    """
+    stats = {}
+    with SubprocVectorEnv(num_envs, num_workers, agent.state_rep.schema_version, max_turns=max_turns,
+                          stall_limit=stall_limit, seed=seed, opponent=opponent) as env:
+        obs, masks, _ = env.reset()
+        obs, masks = obs.copy(), masks.copy()
+        for update in range(num_updates):
+            rollout, obs, masks, episodes = collect_rollout(agent, env, obs, masks, rollout_len, terminal_only)
+            batch = {key: rollout[key].reshape(rollout_len * num_envs, *rollout[key].shape[2:])
+                     for key in ('obs', 'masks', 'actions', 'log_probs', 'advantages', 'returns')}
+            stats = agent.update(batch)
+            stats['episodes'] = len(episodes)
+            stats['train_win_rate'] = float(np.mean(episodes)) if episodes else float('nan')
+            if callback is not None and callback(update + 1, stats):
+                break
+    return stats
+
+
+def race(target, budget, eval_games=200, eval_every=60.0, seed=0, ppo_kwargs=None, num_envs=32,
+         rollout_len=64, num_workers=0, dqn_chunk=1, terminal_only=True):
+    """
+    Trains PPO and then DQNAgent against the random bot for at most `budget` seconds
+    each, evaluating every `eval_every` seconds of training. Evaluation time is not
+    counted. Both learn from the same reward: the +1/-1 result alone with
+    terminal_only, otherwise with the environment's shaping bonus too. Evaluation
+    deals and bots are seeded per game, so it never touches the global RNG the
+    learners explore and deal with. Returns {name: {'time_to_target', 'curve'}},
+    curve being (seconds, win_rate) points.
+    """
+    from Evaluation import play_game
+    from game_logic import UNOGame
+    from network import DQNAgent
+    from environment import UnoEnvironment
+    from training import RandomAgent, train_agent
+
+    def evaluate(agent):
+        wins = sum(play_game(UNOGame(seed=seed + i), [agent, RandomAgent(seed + i)], EVAL_MAX_TURNS) == 0
+                   for i in range(eval_games))
+        return wins / eval_games
+
+    results = {}
+
+    torch.manual_seed(seed)
+    agent = PPOAgent(**(ppo_kwargs or {}))
+    clock = {'train': 0.0, 'mark': time.perf_counter(), 'next_eval': eval_every}
+    curve = []
+
+    def on_update(update, stats):
+        now = time.perf_counter()
+        clock['train'] += now - clock['mark']
+        done = clock['train'] >= budget
+        if clock['train'] >= clock['next_eval'] or done:
+            clock['next_eval'] += eval_every
+            curve.append((clock['train'], evaluate(agent)))
+            print(f"ppo  {clock['train']:7.1f}s  update {update}: win rate {curve[-1][1]:.3f}", flush=True)
+            done = done or curve[-1][1] >= target
+        clock['mark'] = time.perf_counter()
+        return done
+
+    train_ppo(agent, 10 ** 9, num_envs, rollout_len, num_workers, seed, terminal_only=terminal_only,
+              callback=on_update)
+    results['ppo'] = {'time_to_target': next((t for t, w in curve if w >= target), None), 'curve': curve}
+
+    torch.manual_seed(seed)
+    schema_version = (ppo_kwargs or {}).get('schema_version', DEFAULT_SCHEMA)
+    env = UnoEnvironment(schema_version=schema_version, max_turns=EVAL_MAX_TURNS, stall_limit=STALL_LIMIT)
+    agent = DQNAgent(env.state_rep.state_size, NUM_ACTIONS, env, device='cpu')
+    opponent = RandomAgent(seed)
+    trained, next_eval, episodes = 0.0, eval_every, 0
+    curve = []
+    while True:
+        began = time.perf_counter()
+        train_agent(agent, env, dqn_chunk, opponent, terminal_only=terminal_only)
+        trained += time.perf_counter() - began
+        episodes += dqn_chunk
+        if trained >= next_eval or trained >= budget:
+            next_eval += eval_every
+            epsilon, agent.epsilon = agent.epsilon, 0.0
+            curve.append((trained, evaluate(agent)))
+            agent.epsilon = epsilon
+            print(f"dqn  {trained:7.1f}s  episode {episodes}: win rate {curve[-1][1]:.3f}", flush=True)
+            if curve[-1][1] >= target or trained >= budget:
+                break
+    results['dqn'] = {'time_to_target': next((t for t, w in curve if w >= target), None), 'curve': curve}
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--updates', type=int, default=200)
+    parser.add_argument('--envs', type=int, default=32)
+    parser.add_argument('--rollout-len', type=int, default=64)
+    parser.add_argument('--workers', type=int, default=0, help='vector env worker processes (0: in-process)')
+    parser.add_argument('--schema', default=DEFAULT_SCHEMA)
+    parser.add_argument('--opponent', choices=['random', 'rule'], default='random')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', default='checkpoints/ppo.pt')
+    parser.add_argument('--race', action='store_true', help='compare wall-clock time to --target with DQNAgent')
+    parser.add_argument('--target', type=float, default=0.65)
+    parser.add_argument('--budget', type=float, default=900.0, help='training seconds per learner in --race')
+    parser.add_argument('--eval-every', type=float, default=60.0)
+    parser.add_argument('--eval-games', type=int, default=200)
+    parser.add_argument('--shaped', action='store_true',
+                        help="train on the environment's shaped reward instead of the result alone")
+    args = parser.parse_args()
+
+    if args.race:
+        # seeded once up front: DQNAgent's unseeded training deals come from the global RNG
+        random.seed(args.seed)
+        results = race(args.target, args.budget, args.eval_games, args.eval_every, args.seed,
+                       {'schema_version': args.schema}, args.envs, args.rollout_len, args.workers,
+                       terminal_only=not args.shaped)
+        for name, result in results.items():
+            reached = result['time_to_target']
+            best = max(w for _, w in result['curve'])
+            print(f"{name}: " + (f"reached {args.target:.2f} after {reached:.0f}s of training" if reached is not None
+                                 else f"did not reach {args.target:.2f} in {args.budget:.0f}s (best {best:.3f})"))
+        return
+
+    torch.manual_seed(args.seed)
+    agent = PPOAgent(schema_version=args.schema)
+
+    def report(update, stats):
+        if update % 10 == 0:
+            print(f"update {update}: train win rate {stats['train_win_rate']:.3f} over {stats['episodes']} games, "
+                  f"entropy {stats['entropy']:.3f}, value loss {stats['value_loss']:.4f}", flush=True)
+
+    train_ppo(agent, args.updates, args.envs, args.rollout_len, args.workers, args.seed, args.opponent,
+              terminal_only=not args.shaped, callback=report)
+    agent.save(args.out)
+    print(f"saved {args.out}")
+
+
+if __name__ == '__main__':
+    main()
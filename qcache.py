@@ -0,0 +1,103 @@
+import sys
+import threading
+from collections import OrderedDict
+
+from memory import object_size
+
+
+def model_version(model):
+    """
+    Returns a token that changes whenever any parameter of the model is modified
+    in place (optimizer steps, load_state_dict, manual edits).
+    """
+    return (id(model),) + tuple(p._version for p in model.parameters())
+
+
+class QValueCache:
+    """
+    Bounded LRU cache of Q-value rows keyed on the packed bytes of an encoded
+    observation. Entries are only valid for the model version they were computed
+    with; a version change clears the cache. max_entries and max_bytes (None for
+    no limit) bound the cache by count and by the measured size of keys and rows.
+    Every method holds a lock, so one agent can serve games on several threads.
+    """
+
+    def __init__(self, max_entries=100000, max_bytes=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.entry_bytes = {}
+        self.nbytes = 0
+        self.version = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.lock = threading.RLock()
+
+    def sync(self, version):
+        """
+        Drops every entry if the model version changed since the last lookup.
+        """
+        with self.lock:
+            if version != self.version:
+                if self.entries:
+                    self.invalidations += 1
+                    self.clear()
+                self.version = version
+
+    def lookup(self, keys):
+        """
+        Returns the cached rows for keys (None for misses) and the miss positions.
+        """
+        with self.lock:
+            rows = []
+            missing = []
+            for i, key in enumerate(keys):
+                row = self.entries.get(key)
+                if row is None:
+                    self.misses += 1
+                    missing.append(i)
+                else:
+                    self.hits += 1
+                    self.entries.move_to_end(key)
+                rows.append(row)
+            return rows, missing
+
+    def insert(self, key, row):
+        with self.lock:
+            if key in self.entries:
+                self.nbytes -= self.entry_bytes[key]
+            # rows are often views into a batch output; copy so an entry never pins the whole batch
+            row = row.detach().clone()
+            self.entries[key] = row
+            self.entries.move_to_end(key)
+            self.entry_bytes[key] = sys.getsizeof(key) + object_size(row)
+            self.nbytes += self.entry_bytes[key]
+            while len(self.entries) > 1 and (
+                    (self.max_entries is not None and len(self.entries) > self.max_entries)
+                    or (self.max_bytes is not None and self.nbytes > self.max_bytes)):
+                old_key, _ = self.entries.popitem(last=False)
+                self.nbytes -= self.entry_bytes.pop(old_key)
+                self.evictions += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.entry_bytes.clear()
+            self.nbytes = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self.entries),
+            'bytes': self.nbytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
+
+    def __len__(self):
+        return len(self.entries)
@@ -0,0 +1,215 @@
+"""
+Records games and replays them with random access.
+
+A recording holds the deal seed, the action stream and a full-state keyframe every
+N plies. Seeking to a ply restores the nearest keyframe at or before it and replays
+at most N - 1 actions, so any position in a long game renders immediately.
+
+    python replay_viewer.py record game.json --players checkpoints/uno_model_16000.npz random --seed 3
+    python replay_viewer.py view game.json --agent checkpoints/uno_model_16000.npz
+
+Players use the sprt.py specs: .npz/.pt checkpoints, `random`, `rule`, `rule:<n>`.
+"""
+import argparse
+import bisect
+import json
+import time
+
+import numpy as np
+
+from game_logic import UNOGame
+from tables import INDEX_TO_ACTION, NUM_ACTIONS
+from utils import colorize_card_strings
+
+COLOR_NAMES = {'r': 'Red', 'g': 'Green', 'b': 'Blue', 'y': 'Yellow'}
+
+
+def record_game(agents, seed, keyframe_every=25, max_turns=2000, labels=None):
+    """
+    Plays one seeded game with agents[i] in seat i and returns the recording dict.
+    """
+    game = UNOGame(len(agents), seed=seed)
+    state, player = game.init_game()
+    actions = []
+    keyframes = {}
+    while not game.game_over() and len(actions) < max_turns:
+        if len(actions) % keyframe_every == 0:
+            keyframes[len(actions)] = game.snapshot()
+        action = agents[player].select_action(state, state['legal_actions'], game=game)
+        actions.append(int(action))
+        state, player = game.step(action)
+    winner = game.get_winner()
+    return {
+        'seed': seed,
+        'num_players': len(agents),
+        'players': labels or [type(agent).__name__ for agent in agents],
+        'keyframe_every': keyframe_every,
+        'actions': actions,
+        'keyframes': keyframes,
+        'winner': game.players.index(winner) if winner else None,
+    }
+
+
+def save_recording(record, path):
+    with open(path, 'w') as f:
+        json.dump(record, f)
+
+
+def load_recording(path):
+    with open(path) as f:
+        record = json.load(f)
+    record['keyframes'] = {int(ply): snapshot for ply, snapshot in record['keyframes'].items()}
+    return record
+
+
+class GameReplay:
+    """
+    Random access over a recording. The position is kept between seeks, so short
+    forward moves step from where the replay already is.
+    """
+
+    def __init__(self, record):
+        self.record = record
+        self.actions = record['actions']
+        self.keyframe_plies = sorted(record['keyframes'])
+        self.game = None
+        self.ply = None
+
+    def __len__(self):
+        return len(self.actions)
+
+    def keyframe_for(self, ply):
+        return self.keyframe_plies[bisect.bisect_right(self.keyframe_plies, ply) - 1]
+
+    def seek(self, ply):
+        """
+        Moves to the position before action `ply` is played and returns the game.
+        """
+        ply = max(0, min(ply, len(self.actions)))
+        keyframe = self.keyframe_for(ply)
+        if self.game is None or not (keyframe <= self.ply <= ply):
+            self.game = UNOGame.restore(self.record['keyframes'][keyframe])
+            self.ply = keyframe
+        for action in self.actions[self.ply:ply]:
+            self.game.step(action)
+        self.ply = ply
+        return self.game
+
+    def state(self):
+        return self.game.get_state_for_player(self.game.current_player_index)
+
+
+def q_row(agent, state):
+    """
+    The agent's Q-values for the state, indexed by game action id (a canonical
+    schema's outputs are in the relabelled colours).
+    """
+    q_values = agent.q_values([state])[0]
+    if hasattr(q_values, 'detach'):
+        q_values = q_values.detach().cpu().numpy()
+    return np.asarray(q_values)[agent.state_rep.to_model_actions(state, list(range(NUM_ACTIONS)))]
+
+
+def render(replay, agent=None, top=5):
+    game = replay.game
+    ply, player = replay.ply, game.current_player_index
+    labels = replay.record['players']
+    lines = ["=" * 60,
+             f"Ply {ply}/{len(replay)}   {labels[player]} (seat {player}) to move   "
+             f"[keyframe {replay.keyframe_for(ply)}]"]
+    lines.append(f"Top Card: {colorize_card_strings(game.discard_pile[-1].str)}   "
+                 f"Current Color: {COLOR_NAMES.get(game.current_color, game.current_color)}   "
+                 f"Deck: {len(game.deck)}   Discard: {len(game.discard_pile)}")
+    for seat, hand_player in enumerate(game.players):
+        hand = ', '.join(colorize_card_strings(card.str) for card in sorted(hand_player.hand, key=lambda c: c.str))
+        marker = '>' if seat == player else ' '
+        lines.append(f"{marker} {labels[seat]} ({len(hand_player.hand)}): {hand}")
+
+    if ply == len(replay):
+        winner = replay.record['winner']
+        lines.append("Game over: " + (f"{labels[winner]} (seat {winner}) wins" if winner is not None else "truncated"))
+        return '\n'.join(lines)
+
+    played = replay.actions[ply]
+    lines.append(f"Action: {colorize_card_strings(INDEX_TO_ACTION[played])}")
+    if agent is not None:
+        state = replay.state()
+        q_values = q_row(agent, state)
+        legal = sorted(set(state['legal_actions']), key=lambda a: -q_values[a])
+        lines.append("Q-values (legal, best first):")
+        for action in legal[:top]:
+            mark = ' <- played' if action == played else ''
+            lines.append(f"  {q_values[action]:+10.4f}  {colorize_card_strings(INDEX_TO_ACTION[action])}{mark}")
+        if played not in legal[:top]:
+            rank = legal.index(played) + 1
+            lines.append(f"  played action ranked {rank}/{len(legal)} ({q_values[played]:+.4f})")
+    return '\n'.join(lines)
+
+
+HELP = "Enter/n: next   p: previous   +k/-k: move k plies   g <ply>: go to ply   e: end   q: quit"
+
+
+def view(record, agent=None, start=0):
+    replay = GameReplay(record)
+    ply = start
+    while True:
+        began = time.perf_counter()
+        replay.seek(ply)
+        text = render(replay, agent)
+        elapsed = time.perf_counter() - began
+        print(text)
+        print(f"({elapsed * 1000:.1f} ms)  {HELP}")
+        command = input("> ").strip()
+        try:
+            if command in ('', 'n'):
+                ply += 1
+            elif command == 'p':
+                ply -= 1
+            elif command == 'e':
+                ply = len(replay)
+            elif command == 'q':
+                return
+            elif command.startswith(('+', '-')):
+                ply += int(command)
+            elif command.startswith('g'):
+                ply = int(command[1:])
+            else:
+                print(HELP)
+        except ValueError:
+            print(HELP)
+        ply = max(0, min(ply, len(replay)))
+
+
+def main():
+    from sprt import load_player
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    record = commands.add_parser('record', help='play and record a seeded game')
+    record.add_argument('out')
+    record.add_argument('--players', nargs='+', default=['checkpoints/uno_model_16000.pt', 'random'])
+    record.add_argument('--seed', type=int, default=0)
+    record.add_argument('--keyframe-every', type=int, default=25)
+    record.add_argument('--max-turns', type=int, default=2000)
+
+    show = commands.add_parser('view', help='step through a recording')
+    show.add_argument('recording')
+    show.add_argument('--agent', help='checkpoint whose Q-values are shown at each decision')
+    show.add_argument('--ply', type=int, default=0)
+
+    args = parser.parse_args()
+    if args.command == 'record':
+        agents = [load_player(spec, args.seed + seat) for seat, spec in enumerate(args.players)]
+        game = record_game(agents, args.seed, args.keyframe_every, args.max_turns, labels=args.players)
+        save_recording(game, args.out)
+        print(f"recorded {len(game['actions'])} plies, {len(game['keyframes'])} keyframes -> {args.out}")
+    else:
+        agent = load_player(args.agent) if args.agent else None
+        if agent is not None and not hasattr(agent, 'q_values'):
+            parser.error(f"--agent {args.agent} has no Q-values to show; pass a checkpoint")
+        view(load_recording(args.recording), agent, args.ply)
+
+
+if __name__ == '__main__':
+    main()
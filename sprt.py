@@ -0,0 +1,270 @@
+"""
+Sequential probability ratio test (SPRT) match runner for gating checkpoints.
+
+Tests H0: candidate is elo0 Elo stronger than the baseline, against H1: elo1 Elo
+stronger. Worker processes play duplicate deals (each deal twice, seats swapped)
+and stream each pair's result into the test, which scores whole pairs. Every
+worker stops as soon as the log-likelihood ratio crosses an accept or reject bound.
+CheckpointManager.promote and `sweep.py --promote-to` gate promotions with it.
+
+    python sprt.py checkpoints/candidate.npz checkpoints/best.npz --elo1 20 --promote-to checkpoints/best.npz
+
+Players are .npz or .pt checkpoints (DQN, or PPO from ppo.py), `random`, or
+`rule` / `rule:<n>` (training.RuleAgent).
+Exit status is 0 only when H1 is accepted, so the script works as a shell gate.
+"""
+import argparse
+import math
+import multiprocessing as mp
+import os
+import queue
+import shutil
+import sys
+from statistics import NormalDist
+
+# games that reach this many plies are scored as draws
+MAX_TURNS = 2000
+
+
+def elo_to_score(elo):
+    return 1.0 / (1.0 + 10.0 ** (-elo / 400.0))
+
+
+def score_to_elo(score):
+    score = min(max(score, 1e-6), 1 - 1e-6)
+    return -400.0 * math.log10(1.0 / score - 1.0)
+
+
+# pseudo-count added to each pair-score bin, so no outcome is ruled out after a short run
+PRIOR = 1e-3
+PAIR_SCORES = (0.0, 0.25, 0.5, 0.75, 1.0)
+
+
+def constrained_mle(freqs, mean):
+    """
+    The most likely pair-score distribution given the observed frequencies, subject
+    to its expected score being `mean`: p_i = f_i / (1 + lam (x_i - mean)), with lam
+    found by bisection.
+    """
+    def excess(lam):
+        return sum(f * (x - mean) / (1 + lam * (x - mean)) for f, x in zip(freqs, PAIR_SCORES))
+
+    # every denominator stays positive for lam in (-1 / (1 - mean), 1 / mean); excess() decreases in lam
+    lo, hi = -1 / (1 - mean) + 1e-12, 1 / mean - 1e-12
+    for _ in range(100):
+        mid = (lo + hi) / 2
+        if excess(mid) > 0:
+            lo = mid
+        else:
+            hi = mid
+    lam = (lo + hi) / 2
+    return [f / (1 + lam * (x - mean)) for f, x in zip(freqs, PAIR_SCORES)]
+
+
+class SPRT:
+    """
+    Generalized SPRT on duplicate pairs. A deal's two games (1 win, 0.5 draw, 0 loss
+    each) make one trial scoring 0, 1/4, 1/2, 3/4 or 1, so the correlation between
+    the seatings of a deal is kept. The LLR compares the maximum likelihood of the
+    pair-score (pentanomial) distribution with its expected score fixed at the H1
+    value and at the H0 value.
+    """
+
+    def __init__(self, elo0=0.0, elo1=20.0, alpha=0.05, beta=0.05):
+        self.elo0, self.elo1 = elo0, elo1
+        self.alpha, self.beta = alpha, beta
+        self.p0, self.p1 = elo_to_score(elo0), elo_to_score(elo1)
+        self.lower = math.log(beta / (1 - alpha))
+        self.upper = math.log((1 - beta) / alpha)
+        self.llr = 0.0
+        # pair counts by total score: 0, 0.5, 1, 1.5 and 2 points out of 2
+        self.pentanomial = [0] * 5
+        self.wins = self.draws = self.losses = 0
+        self.trace = []
+
+    @property
+    def pairs(self):
+        return sum(self.pentanomial)
+
+    @property
+    def games(self):
+        return 2 * self.pairs
+
+    def update(self, first, second):
+        """
+        Adds one deal: the candidate's scores in its two seatings.
+        """
+        for score in (first, second):
+            if score == 1:
+                self.wins += 1
+            elif score == 0:
+                self.losses += 1
+            else:
+                self.draws += 1
+        self.pentanomial[round(2 * (first + second))] += 1
+        self.llr = self._llr()
+        self.trace.append(self.llr)
+        return self.status()
+
+    def _llr(self):
+        counts = [count + PRIOR for count in self.pentanomial]
+        freqs = [count / sum(counts) for count in counts]
+        h0, h1 = constrained_mle(freqs, self.p0), constrained_mle(freqs, self.p1)
+        return sum(count * math.log(q1 / q0) for count, q0, q1 in zip(self.pentanomial, h0, h1))
+
+    def status(self):
+        if self.llr >= self.upper:
+            return 'accept'
+        if self.llr <= self.lower:
+            return 'reject'
+        return None
+
+    def fixed_sample_size(self):
+        """
+        Independent games a fixed-length test needs for the same alpha and beta (normal approximation).
+        """
+        z = NormalDist().inv_cdf
+        spread = z(1 - self.alpha) * math.sqrt(self.p0 * (1 - self.p0)) + \
+            z(1 - self.beta) * math.sqrt(self.p1 * (1 - self.p1))
+        return math.ceil((spread / (self.p1 - self.p0)) ** 2)
+
+    def elo_estimate(self):
+        if not self.games:
+            return 0.0
+        return score_to_elo((self.wins + 0.5 * self.draws) / self.games)
+
+
+def load_player(spec, seed=0):
+    """
+    Builds a select_action player from a spec string (see module docstring).
+    """
+    from training import RandomAgent, RuleAgent
+    if spec == 'random':
+        return RandomAgent(seed)
+    if spec == 'rule' or spec.startswith('rule:'):
+        return RuleAgent(int(spec.split(':')[1]) if ':' in spec else 0)
+    if spec.endswith('.npz'):
+        from numpy_runtime import NumpyAgent
+        return NumpyAgent(spec)
+    import torch
+    checkpoint = torch.load(spec, map_location='cpu')
+    if isinstance(checkpoint, dict) and 'policy_value_state_dict' in checkpoint:
+        from ppo import PPOAgent
+        agent = PPOAgent()
+        agent.load_checkpoint_state(checkpoint)
+        return agent
+    from distill import load_agent
+    return load_agent(spec)
+
+
+def _worker(worker_id, num_workers, candidate, baseline, seed, max_games, results, stop):
+    from Evaluation import play_game
+    from game_logic import UNOGame
+
+    players = (load_player(candidate, seed + worker_id), load_player(baseline, seed + 10007 + worker_id))
+    for pair in range(worker_id, max_games // 2, num_workers):
+        if stop.is_set():
+            break
+        # both seatings of a deal are played by the same worker and reported together
+        scores = []
+        for seat in (0, 1):
+            seats = players if seat == 0 else players[::-1]
+            winner = play_game(UNOGame(seed=seed + pair), seats, MAX_TURNS)
+            scores.append(0.5 if winner is None else float(winner == seat))
+        results.put((pair, scores))
+    results.put(None)
+
+
+def run_match(candidate, baseline, elo0=0.0, elo1=20.0, alpha=0.05, beta=0.05, workers=None,
+              max_games=20000, seed=0, verbose=True):
+    """
+    Plays candidate against baseline until the SPRT reaches a decision or max_games
+    are played. Returns the finished SPRT with status() None when inconclusive.
+    Raises RuntimeError if a worker dies.
+    """
+    workers = workers or os.cpu_count()
+    test = SPRT(elo0, elo1, alpha, beta)
+    ctx = mp.get_context('spawn')
+    results, stop = ctx.Queue(), ctx.Event()
+    procs = [ctx.Process(target=_worker, args=(i, workers, candidate, baseline, seed, max_games, results, stop),
+                         daemon=True) for i in range(workers)]
+    for proc in procs:
+        proc.start()
+
+    running = workers
+    try:
+        while running:
+            try:
+                item = results.get(timeout=1.0)
+            except queue.Empty:
+                # a worker that raised (e.g. on a bad checkpoint path) never sends its sentinel
+                failed = [proc.exitcode for proc in procs if proc.exitcode not in (None, 0)]
+                if failed:
+                    raise RuntimeError(f"{len(failed)} match worker(s) failed with exit codes {failed}")
+                continue
+            if item is None:
+                running -= 1
+                continue
+            if test.status() is not None:
+                continue  # pairs finishing after the decision are not counted
+            status = test.update(*item[1])
+            if verbose and (test.pairs % 50 == 0 or status):
+                print(f"pairs {test.pairs:6d}  W/D/L {test.wins}/{test.draws}/{test.losses}  "
+                      f"LLR {test.llr:+.3f} [{test.lower:+.3f}, {test.upper:+.3f}]", flush=True)
+            if status is not None:
+                stop.set()
+    finally:
+        stop.set()
+        for proc in procs:
+            proc.join(timeout=10)
+            if proc.is_alive():
+                proc.terminate()
+    return test
+
+
+def promote(candidate, destination):
+    """
+    Copies an accepted candidate over the promoted checkpoint without ever exposing a partial file.
+    """
+    tmp = destination + '.tmp'
+    shutil.copyfile(candidate, tmp)
+    os.replace(tmp, destination)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('candidate')
+    parser.add_argument('baseline')
+    parser.add_argument('--elo0', type=float, default=0.0)
+    parser.add_argument('--elo1', type=float, default=20.0)
+    parser.add_argument('--alpha', type=float, default=0.05)
+    parser.add_argument('--beta', type=float, default=0.05)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--max-games', type=int, default=20000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--trace', help='write the LLR after every deal pair to this CSV file')
+    parser.add_argument('--promote-to', help='copy the candidate here if H1 is accepted')
+    args = parser.parse_args()
+    if args.promote_to and not os.path.isfile(args.candidate):
+        parser.error('--promote-to needs a checkpoint file as the candidate')
+
+    test = run_match(args.candidate, args.baseline, args.elo0, args.elo1, args.alpha, args.beta,
+                     args.workers, args.max_games, args.seed)
+    status = test.status() or 'inconclusive'
+    fixed = test.fixed_sample_size()
+    print(f"{status}: {test.games} games, Elo estimate {test.elo_estimate():+.1f}, "
+          f"fixed-length test needs {fixed} games ({fixed - test.games:+d} saved)")
+
+    if args.trace:
+        with open(args.trace, 'w') as f:
+            f.write('games,llr\n')
+            for pairs, llr in enumerate(test.trace, 1):
+                f.write(f"{2 * pairs},{llr:.6f}\n")
+    if status == 'accept' and args.promote_to:
+        promote(args.candidate, args.promote_to)
+        print(f"promoted {args.candidate} -> {args.promote_to}")
+    sys.exit(0 if status == 'accept' else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,392 @@
+"""
+Streaming game statistics with constant memory, fed from UNOGame listener events.
+
+GameStatsCollector tracks first-player advantage, game lengths, reshuffle frequency
+and per-card play counts and win shares. It keeps only fixed-size estimators, so
+its size does not grow with the number of games. Collectors from worker processes
+merge exactly (histograms, counts, means) or approximately (quantile sketches),
+and round-trip through plain dicts for shard files.
+
+    python stats.py --games 100000 --workers 4 --out stats.json
+"""
+import argparse
+import bisect
+import json
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from tables import CARD_KIND_INDEX, CARD_KINDS, DRAW_ACTION
+
+
+class RunningStat:
+    """
+    Count, mean, variance (Welford), min and max of a stream.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, x):
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (x - self.mean)
+        self.min = min(self.min, x)
+        self.max = max(self.max, x)
+
+    def merge(self, other):
+        # Chan et al. parallel combination of two Welford accumulators
+        if other.count == 0:
+            return self
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.count = count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    @property
+    def variance(self):
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    def to_dict(self):
+        return {'count': self.count, 'mean': self.mean, 'm2': self.m2,
+                'min': self.min if self.count else None, 'max': self.max if self.count else None}
+
+    @classmethod
+    def from_dict(cls, data):
+        stat = cls()
+        stat.count, stat.mean, stat.m2 = data['count'], data['mean'], data['m2']
+        if stat.count:
+            stat.min, stat.max = data['min'], data['max']
+        return stat
+
+
+class Histogram:
+    """
+    Counts over fixed bin edges, plus underflow and overflow bins. Bin i covers
+    [edges[i - 1], edges[i]); histograms merge only with identical edges.
+    """
+
+    def __init__(self, edges):
+        self.edges = list(edges)
+        self.counts = [0] * (len(self.edges) + 1)
+
+    def add(self, x, weight=1):
+        self.counts[bisect.bisect_right(self.edges, x)] += weight
+
+    def merge(self, other):
+        if other.edges != self.edges:
+            raise ValueError("Cannot merge histograms with different bin edges")
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        return self
+
+    def to_dict(self):
+        return {'edges': self.edges, 'counts': self.counts}
+
+    @classmethod
+    def from_dict(cls, data):
+        hist = cls(data['edges'])
+        hist.counts = list(data['counts'])
+        return hist
+
+
+class QuantileSketch:
+    """
+    Merging t-digest: values are buffered, then folded into at most about
+    `compression` weighted centroids under the arcsine scale function, which keeps
+    centroids small near the tails so extreme quantiles stay accurate.
+    """
+
+    def __init__(self, compression=100):
+        self.compression = compression
+        self.means = []
+        self.weights = []
+        self.buffer = []
+        self.count = 0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, x, weight=1):
+        self.buffer.append((x, weight))
+        self.count += weight
+        self.min = min(self.min, x)
+        self.max = max(self.max, x)
+        if len(self.buffer) >= 5 * self.compression:
+            self._compress()
+
+    def _k(self, q):
+        return self.compression / (2 * math.pi) * math.asin(2 * q - 1)
+
+    def _q(self, k):
+        return (math.sin(2 * math.pi * k / self.compression) + 1) / 2
+
+    def _compress(self):
+        items = sorted(list(zip(self.means, self.weights)) + self.buffer)
+        self.buffer = []
+        if not items:
+            return
+        total = sum(weight for _, weight in items)
+        means, weights = [], []
+        mean, weight = items[0]
+        seen = 0.0
+        q_limit = self._q(self._k(0.0) + 1)
+        for x, w in items[1:]:
+            if (seen + weight + w) / total <= q_limit:
+                weight += w
+                mean += (x - mean) * w / weight
+            else:
+                means.append(mean)
+                weights.append(weight)
+                seen += weight
+                q_limit = self._q(self._k(seen / total) + 1)
+                mean, weight = x, w
+        means.append(mean)
+        weights.append(weight)
+        self.means, self.weights = means, weights
+
+    def merge(self, other):
+        self.buffer.extend(zip(other.means, other.weights))
+        self.buffer.extend(other.buffer)
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress()
+        return self
+
+    def quantile(self, q):
+        self._compress()
+        if not self.means:
+            return None
+        target = q * self.count
+        # interpolate between centroid centres, anchored at the exact min and max
+        cumulative = 0.0
+        prev_center, prev_mean = 0.0, self.min
+        for mean, weight in zip(self.means, self.weights):
+            center = cumulative + weight / 2
+            if target < center:
+                span = center - prev_center
+                t = (target - prev_center) / span if span > 0 else 0.0
+                return prev_mean + t * (mean - prev_mean)
+            cumulative += weight
+            prev_center, prev_mean = center, mean
+        span = self.count - prev_center
+        t = (target - prev_center) / span if span > 0 else 1.0
+        return prev_mean + min(t, 1.0) * (self.max - prev_mean)
+
+    def to_dict(self):
+        self._compress()
+        return {'compression': self.compression, 'means': self.means, 'weights': self.weights,
+                'count': self.count, 'min': self.min if self.count else None,
+                'max': self.max if self.count else None}
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls(data['compression'])
+        sketch.means, sketch.weights, sketch.count = list(data['means']), list(data['weights']), data['count']
+        if sketch.count:
+            sketch.min, sketch.max = data['min'], data['max']
+        return sketch
+
+
+# game lengths in plies span a few turns to tens of thousands when decks run dry
+LENGTH_EDGES = [int(round(10 ** (i / 10))) for i in range(10, 46)]
+
+
+class GameStatsCollector:
+    """
+    Listener that aggregates finished games. Attach it to each game; a game is
+    recorded when a step ends it, or by finish(game) when it is abandoned at a
+    turn limit. Only games in progress hold per-game state.
+    """
+
+    def __init__(self, compression=100):
+        self.games = 0
+        self.truncated = 0
+        self.first_player_wins = 0
+        self.length = RunningStat()
+        self.length_hist = Histogram(LENGTH_EDGES)
+        self.length_sketch = QuantileSketch(compression)
+        self.reshuffles = RunningStat()
+        self.games_with_reshuffle = 0
+        self.penalty_draws = RunningStat()
+        # per card kind (see tables.CARD_KINDS): plays overall and by the eventual winner
+        self.card_plays = np.zeros(len(CARD_KINDS), dtype=np.int64)
+        self.winner_card_plays = np.zeros(len(CARD_KINDS), dtype=np.int64)
+        self._live = {}
+
+    def attach(self, game):
+        game.listeners.append(self)
+        self._live[id(game)] = self._new_game(len(game.players))
+        return game
+
+    @staticmethod
+    def _new_game(num_players):
+        return {'plies': 0, 'reshuffles': 0, 'step_draws': 0, 'penalty_draws': 0,
+                'plays': np.zeros((num_players, len(CARD_KINDS)), dtype=np.int64)}
+
+    def __call__(self, event, game, player_index=None, card=None, cards=None, action=None):
+        current = self._live.get(id(game))
+        if current is None:
+            return
+        if event == 'play':
+            current['plays'][player_index, CARD_KIND_INDEX[card.str]] += 1
+        elif event == 'draw':
+            current['step_draws'] += 1
+        elif event == 'reshuffle':
+            current['reshuffles'] += 1
+        elif event == 'step':
+            current['plies'] += 1
+            # draws during a play come from draw 2 / wild draw 4 (or an illegal play's fallback)
+            if action != DRAW_ACTION:
+                current['penalty_draws'] += current['step_draws']
+            current['step_draws'] = 0
+            if game.game_over():
+                self.finish(game)
+
+    def finish(self, game):
+        """
+        Records the game (as truncated if nobody has won) and detaches from it.
+        """
+        current = self._live.pop(id(game), None)
+        if current is None:
+            return
+        if self in game.listeners:
+            game.listeners.remove(self)
+
+        self.games += 1
+        self.length.add(current['plies'])
+        self.length_hist.add(current['plies'])
+        self.length_sketch.add(current['plies'])
+        self.reshuffles.add(current['reshuffles'])
+        self.games_with_reshuffle += current['reshuffles'] > 0
+        self.penalty_draws.add(current['penalty_draws'])
+        self.card_plays += current['plays'].sum(axis=0)
+
+        winner = game.get_winner()
+        if winner is None:
+            self.truncated += 1
+            return
+        winner_index = game.players.index(winner)
+        self.first_player_wins += winner_index == 0
+        self.winner_card_plays += current['plays'][winner_index]
+
+    def merge(self, other):
+        self.games += other.games
+        self.truncated += other.truncated
+        self.first_player_wins += other.first_player_wins
+        self.length.merge(other.length)
+        self.length_hist.merge(other.length_hist)
+        self.length_sketch.merge(other.length_sketch)
+        self.reshuffles.merge(other.reshuffles)
+        self.games_with_reshuffle += other.games_with_reshuffle
+        self.penalty_draws.merge(other.penalty_draws)
+        self.card_plays += other.card_plays
+        self.winner_card_plays += other.winner_card_plays
+        return self
+
+    def to_dict(self):
+        return {
+            'games': self.games, 'truncated': self.truncated, 'first_player_wins': self.first_player_wins,
+            'length': self.length.to_dict(), 'length_hist': self.length_hist.to_dict(),
+            'length_sketch': self.length_sketch.to_dict(), 'reshuffles': self.reshuffles.to_dict(),
+            'games_with_reshuffle': self.games_with_reshuffle, 'penalty_draws': self.penalty_draws.to_dict(),
+            'card_plays': self.card_plays.tolist(), 'winner_card_plays': self.winner_card_plays.tolist(),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        collector = cls(data['length_sketch']['compression'])
+        collector.games, collector.truncated = data['games'], data['truncated']
+        collector.first_player_wins = data['first_player_wins']
+        collector.length = RunningStat.from_dict(data['length'])
+        collector.length_hist = Histogram.from_dict(data['length_hist'])
+        collector.length_sketch = QuantileSketch.from_dict(data['length_sketch'])
+        collector.reshuffles = RunningStat.from_dict(data['reshuffles'])
+        collector.games_with_reshuffle = data['games_with_reshuffle']
+        collector.penalty_draws = RunningStat.from_dict(data['penalty_draws'])
+        collector.card_plays = np.array(data['card_plays'], dtype=np.int64)
+        collector.winner_card_plays = np.array(data['winner_card_plays'], dtype=np.int64)
+        return collector
+
+    def summary(self):
+        decided = self.games - self.truncated
+        plays, winner_plays = self.card_plays.sum(), self.winner_card_plays.sum()
+        baseline = winner_plays / plays if plays else 0.0
+        with np.errstate(divide='ignore', invalid='ignore'):
+            share = np.where(self.card_plays > 0, self.winner_card_plays / self.card_plays, np.nan)
+        return {
+            'games': self.games,
+            'truncated_rate': self.truncated / self.games if self.games else 0.0,
+            'first_player_win_rate': self.first_player_wins / decided if decided else 0.0,
+            'length_mean': self.length.mean,
+            'length_std': math.sqrt(self.length.variance),
+            'length_quantiles': {q: self.length_sketch.quantile(q) for q in (0.5, 0.9, 0.99)},
+            'reshuffles_per_game': self.reshuffles.mean,
+            'reshuffle_game_rate': self.games_with_reshuffle / self.games if self.games else 0.0,
+            'penalty_draws_per_game': self.penalty_draws.mean,
+            # share of a kind's plays made by the eventual winner, relative to all plays
+            'card_win_share': {kind: float(s - baseline) for kind, s in zip(CARD_KINDS, share) if s == s},
+        }
+
+
+def collect_shard(num_games, seed=0, max_turns=2000, policy='random'):
+    """
+    Worker entry point: simulates num_games between two copies of a baseline bot and
+    returns the collector as a dict.
+    """
+    from Evaluation import play_game
+    from game_logic import UNOGame
+    from training import RandomAgent, RuleAgent
+
+    collector = GameStatsCollector()
+    if policy == 'random':
+        players = [RandomAgent(seed), RandomAgent(seed + 1)]
+    else:
+        players = [RuleAgent(), RuleAgent()]
+    for i in range(num_games):
+        game = collector.attach(UNOGame(seed=seed * 1000003 + i))
+        play_game(game, players, max_turns)
+        collector.finish(game)
+    return collector.to_dict()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--games', type=int, default=10000)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--shard-games', type=int, default=1000)
+    parser.add_argument('--policy', choices=['random', 'rule'], default='rule')
+    parser.add_argument('--max-turns', type=int, default=2000)
+    parser.add_argument('--out', help='write the merged collector to this JSON file')
+    args = parser.parse_args()
+
+    shards = [min(args.shard_games, args.games - start) for start in range(0, args.games, args.shard_games)]
+    total = GameStatsCollector()
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        futures = [pool.submit(collect_shard, n, seed, args.max_turns, args.policy) for seed, n in enumerate(shards)]
+        for future in futures:
+            total.merge(GameStatsCollector.from_dict(future.result()))
+
+    summary = total.summary()
+    shares = sorted(summary.pop('card_win_share').items(), key=lambda item: item[1])
+    print(json.dumps(summary, indent=2))
+    print("card kinds most/least played by winners (share vs average):")
+    for kind, share in shares[-5:][::-1] + shares[:5]:
+        print(f"  {kind:12s} {share:+.3f}")
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(total.to_dict(), f)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,214 @@
+"""
+Parallel hyperparameter sweep for DQNAgent with successive-halving early stopping.
+
+Every rung trains the surviving trials up to the rung's episode budget across a
+process pool, evaluates them against the random bot and keeps the best 1/eta.
+Results stream into <out_dir>/results.jsonl and each trial's checkpoints into
+<out_dir>/trial_<id>/ (the latest rung and its best one, via CheckpointManager, plus
+the replay buffer); rerunning the same command resumes from whatever they already hold.
+
+    python sweep.py --out-dir sweeps/run1 --trials 16 --workers 4 --promote-to checkpoints/best.pt
+
+With --promote-to, the best trial's best checkpoint replaces that file only if it
+passes the SPRT gate (sprt.py) against it.
+"""
+import argparse
+import json
+import math
+import os
+import pickle
+import random
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+STATE_SIZE = 19 + 4 + (19 * 7) + 3 + 1 + 1
+ACTION_SIZE = 61
+# an untrained greedy agent can stall a game forever by always drawing from an empty deck
+EVAL_MAX_TURNS = 2000
+# training episodes are truncated at the same length, or after this many turns in a row without a card moving
+STALL_LIMIT = 10
+
+SEARCH_SPACE = {
+    'lr': ('log', 1e-5, 1e-3),
+    'batch_size': ('choice', [32, 64, 128, 256]),
+    'gamma': ('choice', [0.9, 0.95, 0.99, 0.995]),
+    'epsilon_decay': ('choice', [0.99, 0.995, 0.999, 0.9995]),
+    'target_update': ('choice', [5, 10, 50, 100]),
+    'per_alpha': ('uniform', 0.0, 1.0),
+    'per_beta': ('uniform', 0.2, 1.0),
+}
+
+
+def sample_config(rng, space=SEARCH_SPACE):
+    config = {}
+    for name, spec in space.items():
+        kind = spec[0]
+        if kind == 'choice':
+            config[name] = rng.choice(spec[1])
+        elif kind == 'uniform':
+            config[name] = rng.uniform(spec[1], spec[2])
+        elif kind == 'log':
+            config[name] = math.exp(rng.uniform(math.log(spec[1]), math.log(spec[2])))
+        else:
+            raise ValueError(f"Unknown search space kind: {kind}")
+    return config
+
+
+def rung_budgets(min_episodes, max_episodes, eta):
+    budgets = [min_episodes]
+    while budgets[-1] * eta <= max_episodes:
+        budgets.append(budgets[-1] * eta)
+    return budgets
+
+
+def _init_worker(threads):
+    # pin intra-op threads before torch is imported so workers don't oversubscribe the host
+    os.environ['OMP_NUM_THREADS'] = str(threads)
+    os.environ['MKL_NUM_THREADS'] = str(threads)
+    import torch
+    torch.set_num_threads(threads)
+
+
+def run_trial(trial_id, config, episodes, eval_games, out_dir, seed):
+    """
+    Worker entry point: trains one trial up to `episodes` total episodes, resuming from
+    its last saved state, and returns its evaluation result.
+    """
+    import torch
+    from checkpoint import CheckpointManager, atomic_write
+    from game_logic import UNOGame
+    from network import DQNAgent, UnoEnvironment
+    from training import RandomAgent, train_agent
+    from Evaluation import evaluate_agent
+
+    random.seed(seed + trial_id * 1009 + episodes)
+    torch.manual_seed(seed + trial_id)
+    env = UnoEnvironment(max_turns=EVAL_MAX_TURNS, stall_limit=STALL_LIMIT)
+    agent = DQNAgent(STATE_SIZE, ACTION_SIZE, env, device='cpu', **config)
+
+    # the latest rung's state to resume from, plus the trial's best rung by win rate
+    checkpoints = CheckpointManager(os.path.join(out_dir, f"trial_{trial_id}"), keep_last=1, metric='win_rate')
+    done_episodes = checkpoints.latest_step() or 0
+    if done_episodes:
+        agent.load_checkpoint_state(torch.load(checkpoints.latest_path(), map_location='cpu'))
+    # the replay buffer carries over between rungs too, or every rung would start learning from scratch
+    replay_path = os.path.join(out_dir, f"trial_{trial_id}", 'replay.pkl')
+    if done_episodes and os.path.exists(replay_path):
+        with open(replay_path, 'rb') as f:
+            saved = pickle.load(f)
+        if saved['episodes'] == done_episodes:
+            agent.memory = saved['memory']
+
+    train_agent(agent, env, episodes - done_episodes, RandomAgent(seed + trial_id))
+
+    epsilon, agent.epsilon = agent.epsilon, 0.0
+    win_rate, avg_steps, _ = evaluate_agent(UNOGame, agent, RandomAgent(seed), eval_games, verbose=False,
+                                            max_turns=EVAL_MAX_TURNS)
+    agent.epsilon = epsilon
+    atomic_write(replay_path, lambda f: pickle.dump({'episodes': episodes, 'memory': agent.memory}, f,
+                                                    pickle.HIGHEST_PROTOCOL))
+    checkpoints.save(agent, episodes, {'win_rate': win_rate})
+    checkpoints.close()
+    return {'trial': trial_id, 'episodes': episodes, 'win_rate': win_rate, 'avg_steps': avg_steps,
+            'truncation_rate': env.stats()['truncation_rate'],
+            'checkpoint_stall_ms': checkpoints.stats()['mean_stall_ms']}
+
+
+class SweepResults:
+    """
+    Append-only JSONL log of trial configs and rung results, used to resume a sweep.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.configs = {}
+        self.scores = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    if line.strip():
+                        self._absorb(json.loads(line))
+
+    def _absorb(self, record):
+        if record['type'] == 'config':
+            self.configs[record['trial']] = record['config']
+        elif record['type'] == 'result':
+            self.scores[(record['trial'], record['episodes'])] = record['win_rate']
+
+    def append(self, record):
+        with open(self.path, 'a') as f:
+            f.write(json.dumps(record) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        self._absorb(record)
+
+
+def successive_halving(out_dir, trials=16, min_episodes=50, max_episodes=800, eta=2,
+                       workers=4, threads_per_worker=1, eval_games=200, seed=0):
+    """
+    Runs (or resumes) a sweep and returns the surviving trial ids ordered best first.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    results = SweepResults(os.path.join(out_dir, 'results.jsonl'))
+    rng = random.Random(seed)
+    for trial_id in range(trials):
+        config = sample_config(rng)
+        if trial_id not in results.configs:
+            results.append({'type': 'config', 'trial': trial_id, 'config': config})
+
+    survivors = list(range(trials))
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(threads_per_worker,)) as pool:
+        for rung, episodes in enumerate(rung_budgets(min_episodes, max_episodes, eta)):
+            pending = [t for t in survivors if (t, episodes) not in results.scores]
+            futures = {pool.submit(run_trial, t, results.configs[t], episodes, eval_games, out_dir, seed): t
+                       for t in pending}
+            for future in as_completed(futures):
+                result = future.result()
+                results.append(dict(type='result', rung=rung, **result))
+                print(f"rung {rung} trial {result['trial']:3d} episodes {episodes:5d} "
+                      f"win_rate {result['win_rate']:.3f}", flush=True)
+
+            survivors.sort(key=lambda t: results.scores[(t, episodes)], reverse=True)
+            survivors = survivors[:max(1, len(survivors) // eta)]
+
+    return survivors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--out-dir', required=True)
+    parser.add_argument('--trials', type=int, default=16)
+    parser.add_argument('--min-episodes', type=int, default=50)
+    parser.add_argument('--max-episodes', type=int, default=800)
+    parser.add_argument('--eta', type=int, default=2)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--threads-per-worker', type=int, default=1)
+    parser.add_argument('--eval-games', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--promote-to', help='SPRT-gate the best checkpoint against this one and replace it on accept')
+    parser.add_argument('--elo1', type=float, default=20.0, help='Elo gain the gate tests for')
+    args = parser.parse_args()
+
+    best = successive_halving(args.out_dir, args.trials, args.min_episodes, args.max_episodes, args.eta,
+                              args.workers, args.threads_per_worker, args.eval_games, args.seed)
+    results = SweepResults(os.path.join(args.out_dir, 'results.jsonl'))
+    print(f"best trial {best[0]}: {json.dumps(results.configs[best[0]])}")
+    trial_dir = os.path.join(args.out_dir, f"trial_{best[0]}")
+    with open(os.path.join(trial_dir, 'manifest.json')) as f:
+        print(f"best checkpoint: {os.path.join(trial_dir, json.load(f)['best']['path'])}")
+    if args.promote_to:
+        from checkpoint import CheckpointManager
+        checkpoints = CheckpointManager(trial_dir, keep_last=1, metric='win_rate')
+        test = checkpoints.promote(args.promote_to, elo1=args.elo1, workers=args.workers, seed=args.seed,
+                                   verbose=False)
+        checkpoints.close()
+        if test is None:
+            print(f"promoted to {args.promote_to} (nothing there to play against)")
+        else:
+            print(f"SPRT gate {test.status() or 'inconclusive'} after {test.games} games, "
+                  f"Elo estimate {test.elo_estimate():+.1f}"
+                  + (f": promoted to {args.promote_to}" if test.status() == 'accept' else ''))
+
+
+if __name__ == '__main__':
+    main()
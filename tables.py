@@ -0,0 +1,51 @@
+"""
+Precomputed lookup tables shared by the engine, the encoders and the CLIs.
+ACTION_SPACE mirrors action_space.json so nothing has to parse it at runtime.
+"""
+from utils import COLOR_MAP, TRAIT_MAP
+
+ACTION_SPACE = {
+    'r-0': 0, 'r-1': 1, 'r-2': 2, 'r-3': 3, 'r-4': 4, 'r-5': 5, 'r-6': 6, 'r-7': 7,
+    'r-8': 8, 'r-9': 9, 'r-skip': 10, 'r-reverse': 11, 'r-draw_2': 12, 'r-wild': 13, 'r-wild_draw_4': 14,
+    'g-0': 15, 'g-1': 16, 'g-2': 17, 'g-3': 18, 'g-4': 19, 'g-5': 20, 'g-6': 21, 'g-7': 22,
+    'g-8': 23, 'g-9': 24, 'g-skip': 25, 'g-reverse': 26, 'g-draw_2': 27, 'g-wild': 28, 'g-wild_draw_4': 29,
+    'b-0': 30, 'b-1': 31, 'b-2': 32, 'b-3': 33, 'b-4': 34, 'b-5': 35, 'b-6': 36, 'b-7': 37,
+    'b-8': 38, 'b-9': 39, 'b-skip': 40, 'b-reverse': 41, 'b-draw_2': 42, 'b-wild': 43, 'b-wild_draw_4': 44,
+    'y-0': 45, 'y-1': 46, 'y-2': 47, 'y-3': 48, 'y-4': 49, 'y-5': 50, 'y-6': 51, 'y-7': 52,
+    'y-8': 53, 'y-9': 54, 'y-skip': 55, 'y-reverse': 56, 'y-draw_2': 57, 'y-wild': 58, 'y-wild_draw_4': 59,
+    'draw_card': 60,
+}
+
+INDEX_TO_ACTION = {v: k for k, v in ACTION_SPACE.items()}
+
+DRAW_ACTION = ACTION_SPACE['draw_card']
+NUM_ACTIONS = len(ACTION_SPACE)
+
+# action string -> (colour feature index, trait feature index) in the 19-wide card encoding
+CARD_FEATURE_INDEX = {
+    action: (COLOR_MAP[action[0]], 4 + TRAIT_MAP[action[2:]])
+    for action in ACTION_SPACE if action != 'draw_card'
+}
+
+# PLAYABLE[card_id][current_color][top_trait] for every card id (= action id of the card string)
+PLAYABLE = tuple(
+    tuple(
+        tuple(card_id % 15 >= 13 or card_id // 15 == color or card_id % 15 == trait for trait in range(15))
+        for color in range(4)
+    )
+    for card_id in range(DRAW_ACTION)
+)
+
+# action ids for the four colour choices of each wild trait
+WILD_ACTIONS = tuple(ACTION_SPACE[f"{c}-wild"] for c in 'rgby')
+WILD_DRAW_4_ACTIONS = tuple(ACTION_SPACE[f"{c}-wild_draw_4"] for c in 'rgby')
+
+# Count-schema card kinds: the 52 coloured cards plus the two colourless wild traits.
+# Wild cards carry a build colour in their string, which means nothing until played.
+CARD_KINDS = tuple(f"{c}-{t}" for c in 'rgby' for t in list(TRAIT_MAP)[:13]) + ('wild', 'wild_draw_4')
+CARD_KIND_INDEX = {
+    action: CARD_KINDS.index(action[2:] if TRAIT_MAP[action[2:]] >= 13 else action)
+    for action in ACTION_SPACE if action != 'draw_card'
+}
+# copies of each kind in a full deck, used to scale hand counts into [0, 1]
+CARD_KIND_COPIES = tuple(4 if kind.startswith('wild') else 1 if kind.endswith('-0') else 2 for kind in CARD_KINDS)
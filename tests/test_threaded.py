@@ -0,0 +1,78 @@
+"""
+Concurrent self-play must give every seeded game the same result as serial play.
+"""
+import random
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from environment import UnoEnvironment
+from game_logic import UNOGame
+from network import DQNAgent
+from tables import NUM_ACTIONS
+from threaded import run_games, stress
+from training import RandomAgent
+
+DECK_SIZE = 108
+MAX_TURNS = 300
+
+
+@pytest.fixture
+def frequent_switches():
+    # switch threads as often as possible, so racing games interleave mid-step
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    yield
+    sys.setswitchinterval(interval)
+
+
+def play_checked(seed):
+    """
+    Plays the deal `seed` with seeded random moves, checking after every step that
+    no card was lost or duplicated. Returns (actions, winner seat or None).
+    """
+    game = UNOGame(2, seed=seed)
+    state, _ = game.init_game()
+    rng = random.Random(seed)
+    actions = []
+    while not game.game_over() and len(actions) < MAX_TURNS:
+        action = rng.choice(state['legal_actions'])
+        state, _ = game.step(action)
+        actions.append(action)
+        cards = len(game.deck) + len(game.discard_pile) + sum(len(player.hand) for player in game.players)
+        assert cards == DECK_SIZE, f"seed {seed}: {cards} cards after ply {len(actions)}"
+    winner = game.get_winner()
+    return actions, game.players.index(winner) if winner else None
+
+
+def test_concurrent_self_play_matches_serial(frequent_switches):
+    seeds = range(64)
+    serial = [play_checked(seed) for seed in seeds]
+    with ThreadPoolExecutor(8) as pool:
+        concurrent = list(pool.map(play_checked, seeds))
+    assert concurrent == serial
+    assert any(winner is not None for _, winner in serial)
+
+
+def test_concurrent_games_leave_global_random_alone():
+    state = random.getstate()
+    with ThreadPoolExecutor(4) as pool:
+        list(pool.map(play_checked, range(16)))
+    assert random.getstate() == state
+
+
+def test_stress_finds_no_races():
+    assert stress(threads=4, games=16, repeats=1, max_turns=MAX_TURNS) == []
+
+
+def test_exploring_agent_is_reproducible_per_game(frequent_switches):
+    env = UnoEnvironment()
+    agent = DQNAgent(env.state_rep.state_size, NUM_ACTIONS, env, device='cpu', hidden_sizes=(32,))
+    agent.epsilon = 0.3
+    factories = (agent.for_game, RandomAgent)
+    state = random.getstate()
+    serial = run_games(factories, range(16), threads=1, duplicate=True, max_turns=MAX_TURNS)
+    concurrent = run_games(factories, range(16), threads=8, duplicate=True, max_turns=MAX_TURNS)
+    assert concurrent == serial
+    assert random.getstate() == state
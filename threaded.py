@@ -0,0 +1,205 @@
+"""
+Thread-pool self-play and evaluation: many games on threads of one process, all
+sharing one loaded model, with nothing pickled between them.
+
+Every game owns its RNG (UNOGame.rng) and engine tables are immutable, so games
+on different threads share no mutable state except the model's weights. Bots such
+as RandomAgent get a fresh instance per game, and a model a per-game copy
+(for_game) with its own exploration RNG, both seeded from the deal. On free-threaded
+builds (python3.13t, sys._is_gil_enabled() False) games run on all cores. With
+the GIL the mode still works, but is no faster than one thread.
+
+    python threaded.py evaluate checkpoints/uno_model_16000.npz --opponent random --games 400 --threads 8
+    python threaded.py selfplay data/rule_games --players rule rule --games 10000 --threads 8
+    python threaded.py stress --threads 8 --games 200
+
+`stress` replays the same seeded games serially and on many threads, forces
+frequent thread switches, and fails on any difference in actions, winners or
+environment rewards, or if the global RNG was touched.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from memory import format_bytes, rss_bytes
+
+MAX_TURNS = 2000
+
+
+def gil_enabled():
+    return getattr(sys, '_is_gil_enabled', lambda: True)()
+
+
+def player_factory(spec):
+    """
+    Returns seed -> player for an sprt.py spec. A checkpoint is loaded once and its
+    weights shared by every game, each game exploring with its own seeded RNG
+    (for_game); bots are cheap and get their own instance per game.
+    """
+    from sprt import load_player
+    if os.path.isfile(spec):
+        model = load_player(spec)
+        for_game = getattr(model, 'for_game', None)
+        return for_game if for_game is not None else lambda seed: model
+    return lambda seed: load_player(spec, seed)
+
+
+def play(factories, seed, seat=0, max_turns=MAX_TURNS):
+    """
+    Plays the deal `seed` with factories[0]'s player in `seat`. Returns the record:
+    seed, seat, actions, winner (seat or None) and plies.
+    """
+    from offline_data import play_record
+    players = [factory(seed) for factory in factories]
+    if seat:
+        players = players[seat:] + players[:seat]
+    record = play_record(players, seed, max_turns)
+    record['seat'] = seat
+    record['plies'] = len(record['actions'])
+    return record
+
+
+def run_games(factories, seeds, threads=8, duplicate=False, max_turns=MAX_TURNS):
+    """
+    Plays every seed (both seatings with duplicate) on a thread pool. Returns the
+    records in seed order.
+    """
+    tasks = [(seed, seat) for seed in seeds for seat in ((0, 1) if duplicate else (0,))]
+    if threads <= 1:
+        return [play(factories, seed, seat, max_turns) for seed, seat in tasks]
+    with ThreadPoolExecutor(threads) as pool:
+        return list(pool.map(lambda task: play(factories, task[0], task[1], max_turns), tasks))
+
+
+def evaluate(candidate, opponent='random', seeds=range(200), threads=8, duplicate=True, max_turns=MAX_TURNS):
+    """
+    Candidate's results against the opponent (sprt.py specs), summarized as in
+    eval_cache.summarize, plus games/s.
+    """
+    from eval_cache import summarize
+    factories = (player_factory(candidate), player_factory(opponent))
+    start = time.perf_counter()
+    records = run_games(factories, seeds, threads, duplicate, max_turns)
+    elapsed = time.perf_counter() - start
+    summary = summarize({(r['seed'], r['seat']): (r['winner'], r['plies']) for r in records})
+    summary['games_per_sec'] = len(records) / elapsed
+    return summary
+
+
+def self_play(directory, players, num_games, threads=8, games_per_shard=1000, seed=0, max_turns=MAX_TURNS):
+    """
+    Threaded counterpart of offline_data.generate_shards: same shard format, one
+    game per seed, every bot seeded per game.
+    """
+    from offline_data import write_shard
+    os.makedirs(directory, exist_ok=True)
+    factories = [player_factory(spec) for spec in players]
+    paths = []
+    for first in range(0, num_games, games_per_shard):
+        seeds = range(seed + first, seed + min(first + games_per_shard, num_games))
+        records = run_games(factories, seeds, threads, max_turns=max_turns)
+        for record in records:
+            del record['seat'], record['plies']
+        path = os.path.join(directory, f"shard_{first // games_per_shard:05d}.jsonl.gz")
+        write_shard(path, records)
+        paths.append(path)
+    return paths
+
+
+def _env_episode(seed, max_turns):
+    from environment import UnoEnvironment
+    from training import RandomAgent
+
+    env = UnoEnvironment(max_turns=max_turns, stall_limit=10, seed=seed)
+    agent = RandomAgent(seed)
+    state = env.reset(seed=seed)
+    rewards = []
+    done = truncated = False
+    while not (done or truncated):
+        state, reward, done, truncated, _ = env.step(agent.select_action(state, state['legal_actions'], game=env.game))
+        rewards.append(reward)
+    return rewards, done, env.game.current_player_index
+
+
+def stress(threads=8, games=200, repeats=3, model=None, max_turns=300):
+    """
+    Runs the same seeded games serially and `repeats` times on `threads` threads and
+    returns a list of mismatches (empty when the engine is race-free).
+    """
+    factories = (player_factory(model or 'rule'), player_factory('random'))
+    seeds = range(games)
+    failures = []
+
+    global_state = random.getstate()
+    reference = run_games(factories, seeds, threads=1, duplicate=True, max_turns=max_turns)
+    env_reference = [_env_episode(seed, max_turns) for seed in seeds]
+
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)  # switch threads as often as possible to expose interleavings
+    try:
+        for repeat in range(repeats):
+            records = run_games(factories, seeds, threads, duplicate=True, max_turns=max_turns)
+            failures += [f"repeat {repeat}: seed {a['seed']} seat {a['seat']} diverged"
+                         for a, b in zip(reference, records) if a != b]
+            with ThreadPoolExecutor(threads) as pool:
+                episodes = list(pool.map(lambda seed: _env_episode(seed, max_turns), seeds))
+            failures += [f"repeat {repeat}: environment episode {seed} diverged"
+                         for seed, a, b in zip(seeds, env_reference, episodes) if a != b]
+    finally:
+        sys.setswitchinterval(interval)
+    if random.getstate() != global_state:
+        failures.append("seeded games touched the global random module")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    evaluation = commands.add_parser('evaluate', help='rate a player against an opponent on a thread pool')
+    evaluation.add_argument('candidate')
+    evaluation.add_argument('--opponent', default='random')
+    evaluation.add_argument('--games', type=int, default=200, help='deals (played twice, seats swapped)')
+    evaluation.add_argument('--threads', type=int, nargs='+', default=[8],
+                            help='one run per value, to compare scaling')
+    evaluation.add_argument('--max-turns', type=int, default=MAX_TURNS)
+
+    selfplay = commands.add_parser('selfplay', help='write offline_data.py shards from threaded games')
+    selfplay.add_argument('directory')
+    selfplay.add_argument('--players', nargs='+', default=['rule', 'rule'])
+    selfplay.add_argument('--games', type=int, default=10000)
+    selfplay.add_argument('--per-shard', type=int, default=1000)
+    selfplay.add_argument('--threads', type=int, default=8)
+    selfplay.add_argument('--seed', type=int, default=0)
+
+    race = commands.add_parser('stress', help='check threaded games against serial ones')
+    race.add_argument('--threads', type=int, default=8)
+    race.add_argument('--games', type=int, default=200)
+    race.add_argument('--repeats', type=int, default=3)
+    race.add_argument('--model', help='checkpoint shared by every thread (default: the rule bot)')
+
+    args = parser.parse_args()
+    print(f"Python {sys.version.split()[0]}, GIL {'enabled' if gil_enabled() else 'disabled'}, {os.cpu_count()} cores")
+    if args.command == 'evaluate':
+        for threads in args.threads:
+            summary = evaluate(args.candidate, args.opponent, range(args.games), threads, max_turns=args.max_turns)
+            print(f"{threads:3d} threads: win rate {summary['win_rate']:.3f} over {summary['games']} games, "
+                  f"{summary['games_per_sec']:.1f} games/s, RSS {format_bytes(rss_bytes())}")
+    elif args.command == 'selfplay':
+        start = time.perf_counter()
+        paths = self_play(args.directory, args.players, args.games, args.threads, args.per_shard, args.seed)
+        print(f"wrote {args.games} games to {len(paths)} shards in {time.perf_counter() - start:.1f}s")
+    else:
+        failures = stress(args.threads, args.games, args.repeats, args.model)
+        for failure in failures[:20]:
+            print(failure)
+        print(f"{'FAILED' if failures else 'passed'}: {args.games} deals x 2 seats and {args.games} environment "
+              f"episodes, {args.repeats} threaded repeats on {args.threads} threads")
+        sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
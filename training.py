@@ -0,0 +1,129 @@
+import random
+
+from memory import format_bytes, rss_bytes
+from tables import DRAW_ACTION
+
+
+class RandomAgent:
+    """
+    Baseline bot that plays a uniformly random legal action.
+    """
+
+    def __init__(self, seed=None):
+        self.rng = random.Random(seed)
+
+    def select_action(self, state, legal_actions, game=None):
+        return self.rng.choice(legal_actions)
+
+
+class RuleAgent:
+    """
+    Baseline bot that plays its highest-ranked legal card and draws only when nothing
+    is playable. With low_first_at set it plays its lowest card instead once its hand
+    is that small.
+    """
+
+    def __init__(self, low_first_at=0):
+        self.low_first_at = low_first_at
+
+    def select_action(self, state, legal_actions, game=None):
+        playable = [a for a in legal_actions if a != DRAW_ACTION]
+        if not playable:
+            return DRAW_ACTION
+        pick = min if len(state['hand']) <= self.low_first_at else max
+        return pick(playable, key=lambda a: a % 15)
+
+
+def play_training_episode(agent, env, opponent, train_every=1, terminal_only=False):
+    """
+    Plays one game with the learning agent in seat 0 and the opponent in seat 1.
+    The agent's transitions span from one of its decisions to the next, so the
+    opponent's moves are part of the environment. train_every=0 only collects
+    transitions. terminal_only drops the environment's shaping bonus and keeps
+    only the +1/-1 result, as ppo.collect_rollout does. Returns (reward, steps, losses).
+
+    Episodes the environment truncates store their last transition as non-terminal,
+    so the learner still bootstraps from the state where play was cut off.
+    """
+    state = env.reset()
+    player = env.game.current_player_index
+    pending = None
+    total_reward = 0.0
+    steps = 0
+    losses = []
+    done = truncated = False
+
+    while not (done or truncated):
+        legal_actions = state['legal_actions']
+        if player == 0:
+            if pending is not None:
+                prev_state, prev_action, prev_reward = pending
+                agent.memory.push(prev_state, prev_action, prev_reward, state, False)
+            action = agent.select_action(state, legal_actions, game=env.game)
+            next_state, reward, done, truncated, player = env.step(action)
+            if terminal_only and not done:
+                reward = 0.0
+            pending = (state, action, reward)
+            total_reward += reward
+            steps += 1
+            if train_every and steps % train_every == 0:
+                loss = agent.train()
+                if loss is not None:
+                    losses.append(loss)
+        else:
+            action = opponent.select_action(state, legal_actions, game=env.game)
+            next_state, reward, done, truncated, player = env.step(action)
+            if pending is not None and done:
+                prev_state, prev_action, prev_reward = pending
+                pending = (prev_state, prev_action, prev_reward + reward)
+                total_reward += reward
+        state = next_state
+
+    if pending is not None:
+        prev_state, prev_action, prev_reward = pending
+        if not done and player != 0:
+            # cut off during the opponent's turn: bootstrap from the agent's own view
+            state = env.game.get_state_for_player(0)
+        agent.memory.push(prev_state, prev_action, prev_reward, state, done)
+    return total_reward, steps, losses
+
+
+def memory_report(agent):
+    stats = agent.memory.memory_stats()
+    report = (f"replay {stats['transitions']} transitions, {format_bytes(stats['bytes'])} "
+              f"({stats['bytes_per_transition']:.0f} B/transition)")
+    if 'dedup_ratio' in stats:
+        report += (f", {stats['observations']} unique observations (dedup {stats['dedup_ratio']:.2f}x, "
+                   f"{format_bytes(stats['bytes_saved'])} saved)")
+    return report + f", RSS {format_bytes(rss_bytes())}"
+
+
+def train_agent(agent, env, num_episodes, opponent=None, train_every=1, report_every=None,
+                checkpoints=None, checkpoint_every=None, first_episode=0, terminal_only=False):
+    """
+    Trains the agent against the opponent (a RandomAgent by default) for num_episodes games,
+    on the +1/-1 result alone with terminal_only. Prints replay memory usage every report_every episodes. Returns the list of per-episode rewards.
+
+    With a checkpoint.CheckpointManager, queues a checkpoint every checkpoint_every episodes,
+    numbered by episode from first_episode on, with the mean reward since the last one as
+    its metric. Waits for the writes at the end and prints the learner's stall per save.
+    """
+    opponent = opponent if opponent is not None else RandomAgent()
+    rewards = []
+    last_saved = 0
+    for episode in range(num_episodes):
+        reward, _, _ = play_training_episode(agent, env, opponent, train_every, terminal_only)
+        rewards.append(reward)
+        if report_every and (episode + 1) % report_every == 0:
+            print(f"episode {episode + 1}: {memory_report(agent)}", flush=True)
+        if checkpoints is not None and checkpoint_every and (episode + 1) % checkpoint_every == 0:
+            recent = rewards[last_saved:]
+            checkpoints.save(agent, first_episode + episode + 1, {'mean_reward': sum(recent) / len(recent)})
+            last_saved = len(rewards)
+    if checkpoints is not None:
+        checkpoints.wait()
+        stats = checkpoints.stats()
+        if stats['saves']:
+            print(f"checkpoints: {stats['saves']} saves, learner stall {stats['mean_stall_ms']:.1f} ms mean, "
+                  f"{stats['max_stall_ms']:.1f} ms max", flush=True)
+    return rewards
@@ -10,9 +10,9 @@ TRAIT_MAP = {'0': 0, '1': 1, '2': 2, '3': 3, '4': 4, '5': 5, '6': 6, '7': 7,
              '8': 8, '9': 9, 'skip': 10, 'reverse': 11, 'draw_2': 12,
              'wild': 13, 'wild_draw_4': 14}
 
-WILD = ['r-wild', 'g-wild', 'b-wild', 'y-wild']
+WILD = ('r-wild', 'g-wild', 'b-wild', 'y-wild')
 
-WILD_DRAW_4 = ['r-wild_draw_4', 'g-wild_draw_4', 'b-wild_draw_4', 'y-wild_draw_4']
+WILD_DRAW_4 = ('r-wild_draw_4', 'g-wild_draw_4', 'b-wild_draw_4', 'y-wild_draw_4')
 
 def colorize_card_strings(card_str: str) -> str:
     """
@@ -67,6 +67,19 @@ def card_to_str(game, card: UnoCard) -> str:
 
     return card.get_str()
 
+def str_to_card(card_str: str) -> UnoCard:
+    """
+    Rebuilds a UnoCard from its string, the inverse of card_to_str.
+    """
+    color, trait = card_str.split('-', 1)
+    if trait.startswith('wild'):
+        card_type = 'wild'
+    elif trait.isdigit():
+        card_type = 'number'
+    else:
+        card_type = 'action'
+    return UnoCard(card_type, color, trait)
+
 def card_to_action(card: UnoCard, chosen_color: str = None) -> str:
     """
     Converts a UnoCard into its corresponding action string for indexing in action_space.
@@ -96,7 +109,7 @@ def start_card(game) -> None:
             break
         else:
             game.deck.insert(0, card)
-            random.shuffle(game.deck)
+            getattr(game, 'rng', random).shuffle(game.deck)
 
 
     
\ No newline at end of file
@@ -0,0 +1,233 @@
+"""
+Vectorized UnoEnvironment running slices of environments in worker processes.
+
+All traffic goes through preallocated multiprocessing.shared_memory arrays:
+- the parent writes one action per environment and releases each worker's semaphore;
+- the worker steps its slice and writes observations, legal masks, rewards and flags
+  in place, then releases the parent's semaphore.
+Nothing is pickled per step. Every environment auto-resets when an episode ends, so
+obs always holds the next decision, and final_obs keeps the last observation of the
+episode that just ended. players tells whose decision it is (self-play). With an
+opponent ('random' or 'rule') the workers play every seat but 0 themselves, so each
+step is one seat-0 decision per environment.
+
+    with SubprocVectorEnv(num_envs=64, num_workers=4) as env:
+        obs, masks, players = env.reset()
+        while ...:
+            obs, masks, players, rewards, terminated, truncated = env.step(actions)
+
+python benchmark.py vector measures steps/sec across worker counts.
+"""
+import multiprocessing as mp
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from environment import DEFAULT_SCHEMA, UnoEnvironment, make_state_rep
+from tables import NUM_ACTIONS
+
+_STEP, _RESET, _CLOSE = 0, 1, 2
+
+
+def _buffer_specs(num_envs, state_size, num_workers):
+    return {
+        'actions': ((num_envs,), np.int64),
+        'obs': ((num_envs, state_size), np.float32),
+        'masks': ((num_envs, NUM_ACTIONS), np.bool_),
+        'players': ((num_envs,), np.int8),
+        'rewards': ((num_envs,), np.float32),
+        'terminated': ((num_envs,), np.bool_),
+        'truncated': ((num_envs,), np.bool_),
+        'final_obs': ((num_envs, state_size), np.float32),
+        'commands': ((max(num_workers, 1),), np.int8),
+    }
+
+
+class _Slice:
+    """
+    The environments from lo to hi and the code that steps them into the shared arrays.
+    """
+
+    def __init__(self, lo, hi, arrays, schema_version, max_turns, stall_limit, seed, opponent):
+        self.lo, self.hi = lo, hi
+        self.arrays = arrays
+        self.state_rep = make_state_rep(schema_version)
+        self.envs = [UnoEnvironment(schema_version=schema_version, max_turns=max_turns, stall_limit=stall_limit)
+                     for _ in range(lo, hi)]
+        self.seed = seed
+        self.episodes = [0] * (hi - lo)
+        # the decision each environment waits on; canonical schemas read actions relative to it
+        self.states = [None] * (hi - lo)
+        self.opponent = None
+        if opponent is not None:
+            from training import RandomAgent, RuleAgent
+            self.opponent = RandomAgent(None if seed is None else seed + lo) if opponent == 'random' else RuleAgent()
+
+    def _write(self, i, env, state):
+        self.arrays['obs'][i] = self.state_rep.encode(state)
+        mask = self.arrays['masks'][i]
+        mask[:] = False
+        mask[self.state_rep.to_model_actions(state, state['legal_actions'])] = True
+        self.states[i - self.lo] = state
+        self.arrays['players'][i] = env.game.current_player_index
+
+    def _reset(self, i, env):
+        # per-environment episode seeds, so results do not depend on how envs are split across workers
+        episode = self.episodes[i - self.lo]
+        self.episodes[i - self.lo] += 1
+        state = env.reset(seed=None if self.seed is None else self.seed + episode * 1000003 + i)
+        self._write(i, env, state)
+
+    def reset(self):
+        for i, env in zip(range(self.lo, self.hi), self.envs):
+            self._reset(i, env)
+        self.arrays['rewards'][self.lo:self.hi] = 0.0
+        self.arrays['terminated'][self.lo:self.hi] = False
+        self.arrays['truncated'][self.lo:self.hi] = False
+
+    def step(self):
+        actions = self.arrays['actions']
+        for i, env in zip(range(self.lo, self.hi), self.envs):
+            action = self.state_rep.to_game_action(self.states[i - self.lo], int(actions[i]))
+            state, reward, terminated, truncated, player = env.step(action)
+            while self.opponent is not None and player != 0 and not (terminated or truncated):
+                # opponent moves are part of the environment; as in training.py only
+                # the terminal reward of its move is passed on to seat 0
+                action = self.opponent.select_action(state, state['legal_actions'], game=env.game)
+                state, opponent_reward, terminated, truncated, player = env.step(action)
+                if terminated:
+                    reward += opponent_reward
+            self.arrays['rewards'][i] = reward
+            self.arrays['terminated'][i] = terminated
+            self.arrays['truncated'][i] = truncated
+            if terminated or truncated:
+                self.arrays['final_obs'][i] = self.state_rep.encode(
+                    state if player == 0 else env.game.get_state_for_player(0))
+                self._reset(i, env)
+            else:
+                self._write(i, env, state)
+
+
+def _attach(names, specs):
+    blocks = {key: shared_memory.SharedMemory(name=name) for key, name in names.items()}
+    arrays = {key: np.ndarray(specs[key][0], dtype=specs[key][1], buffer=blocks[key].buf) for key in specs}
+    return blocks, arrays
+
+
+def _worker(index, lo, hi, names, specs, config, request, ready):
+    blocks, arrays = _attach(names, specs)
+    envs = _Slice(lo, hi, arrays, *config)
+    commands = arrays['commands']
+    try:
+        while True:
+            request.acquire()
+            command = commands[index]
+            if command == _CLOSE:
+                break
+            if command == _RESET:
+                envs.reset()
+            else:
+                envs.step()
+            ready.release()
+    finally:
+        del arrays, envs, commands
+        for block in blocks.values():
+            block.close()
+
+
+class SubprocVectorEnv:
+    """
+    num_envs environments split evenly across num_workers processes; num_workers=0
+    steps them in this process through the same shared arrays, as a baseline.
+    """
+
+    def __init__(self, num_envs, num_workers=4, schema_version=DEFAULT_SCHEMA, max_turns=None,
+                 stall_limit=None, seed=0, opponent=None):
+        self.num_envs = num_envs
+        self.num_workers = min(num_workers, num_envs)
+        self.state_size = make_state_rep(schema_version).state_size
+        specs = _buffer_specs(num_envs, self.state_size, self.num_workers)
+        self.blocks = {key: shared_memory.SharedMemory(create=True, size=max(int(np.prod(shape)) * np.dtype(dtype).itemsize, 1))
+                       for key, (shape, dtype) in specs.items()}
+        self.arrays = {key: np.ndarray(shape, dtype=dtype, buffer=self.blocks[key].buf)
+                       for key, (shape, dtype) in specs.items()}
+        self.arrays['actions'][:] = 0
+        self.closed = False
+
+        config = (schema_version, max_turns, stall_limit, seed, opponent)
+        bounds = np.linspace(0, num_envs, max(self.num_workers, 1) + 1).astype(int)
+        if self.num_workers == 0:
+            self.local = _Slice(0, num_envs, self.arrays, *config)
+            self.procs = []
+            return
+
+        self.local = None
+        ctx = mp.get_context('spawn')
+        names = {key: block.name for key, block in self.blocks.items()}
+        self.requests = [ctx.Semaphore(0) for _ in range(self.num_workers)]
+        self.ready = ctx.Semaphore(0)
+        self.procs = [ctx.Process(target=_worker, daemon=True,
+                                  args=(w, bounds[w], bounds[w + 1], names, specs, config, self.requests[w], self.ready))
+                      for w in range(self.num_workers)]
+        for proc in self.procs:
+            proc.start()
+
+    def _run(self, command):
+        if self.local is not None:
+            self.local.reset() if command == _RESET else self.local.step()
+            return
+        self.arrays['commands'][:] = command
+        for request in self.requests:
+            request.release()
+        for _ in self.procs:
+            while not self.ready.acquire(timeout=1.0):
+                dead = [proc.exitcode for proc in self.procs if not proc.is_alive()]
+                if dead:
+                    raise RuntimeError(f"vector env worker exited with code {dead[0]}")
+
+    def reset(self):
+        """
+        Starts a fresh episode everywhere. Returns (obs, masks, players) views into shared memory.
+        """
+        self._run(_RESET)
+        return self.arrays['obs'], self.arrays['masks'], self.arrays['players']
+
+    def step(self, actions):
+        """
+        Applies one action per environment. Returns views (valid until the next call) of
+        (obs, masks, players, rewards, terminated, truncated); rewards and flags belong to the
+        step just taken, obs/masks/players to the next decision, after any auto-reset
+        (final_obs holds the pre-reset observation of environments whose episode ended).
+        """
+        self.arrays['actions'][:] = actions
+        self._run(_STEP)
+        a = self.arrays
+        return a['obs'], a['masks'], a['players'], a['rewards'], a['terminated'], a['truncated']
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        if self.procs:
+            self.arrays['commands'][:] = _CLOSE
+            for request in self.requests:
+                request.release()
+            for proc in self.procs:
+                proc.join(timeout=10)
+                if proc.is_alive():
+                    proc.terminate()
+        self.local = None
+        self.arrays = {}
+        for block in self.blocks.values():
+            block.close()
+            block.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __del__(self):
+        if not getattr(self, 'closed', True):
+            self.close()